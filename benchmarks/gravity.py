@@ -0,0 +1,120 @@
+"""
+Benchmark comparing direct summation and Barnes-Hut mutual gravity.
+Usage: python3 -m benchmarks.gravity [-n 1000 10000 100000]
+"""
+from classes.gravity import DirectGravity, BarnesHutGravity
+import numpy as np
+import argparse
+import sys
+import time
+
+
+G = 6.67430e-11
+
+
+def random_disc(count, seed=0):
+    """
+    Create objects spread uniformly on a disc of radius 1e11 m.
+    Returns:
+        positions (numpy.ndarray): (count, 2) array with positions.
+        masses (numpy.ndarray): (count,) array with masses.
+    """
+    generator = np.random.default_rng(seed)
+    radius = 1e11 * np.sqrt(generator.uniform(size=count))
+    angle = generator.uniform(0, 2 * np.pi, size=count)
+    positions = np.column_stack(
+        (radius * np.cos(angle), radius * np.sin(angle))
+    )
+    masses = generator.uniform(1e20, 1e24, size=count)
+    return positions, masses
+
+
+def measure(function):
+    """
+    Run function once and return its result and wall time in seconds.
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def benchmark(count, opening_angle, direct_limit, sample_size, seed=0):
+    """
+    Time both solvers for given number of objects.
+    Above direct_limit objects direct summation is timed only
+    for sample_size objects and its full time is extrapolated.
+    Returns:
+        row (dict): timings and relative error of Barnes-Hut solver.
+    """
+    positions, masses = random_disc(count, seed)
+    tree = BarnesHutGravity(opening_angle=opening_angle)
+    direct = DirectGravity()
+    tree_result, tree_time = measure(
+        lambda: tree.accelerations(positions, masses, G)
+    )
+    if count <= direct_limit:
+        targets = np.arange(count)
+        estimated = False
+    else:
+        generator = np.random.default_rng(seed + 1)
+        targets = generator.choice(count, sample_size, replace=False)
+        estimated = True
+    direct_result, direct_time = measure(
+        lambda: direct.accelerations(positions, masses, G, targets)
+    )
+    direct_time *= count / len(targets)
+    error = np.linalg.norm(tree_result[targets] - direct_result, axis=1)
+    error /= np.linalg.norm(direct_result, axis=1)
+    return {
+        "objects": count,
+        "direct_time": direct_time,
+        "direct_estimated": estimated,
+        "barnes_hut_time": tree_time,
+        "speedup": direct_time / tree_time,
+        "median_error": float(np.median(error)),
+        "max_error": float(error.max()),
+    }
+
+
+def main(arguments):
+    """
+    Run benchmark and print table with results.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--objects", type=int, nargs="+",
+        default=[1000, 10000, 100000],
+        help="Numbers of objects to benchmark"
+    )
+    parser.add_argument(
+        "--opening-angle", type=float, default=0.5,
+        help="Barnes-Hut opening angle"
+    )
+    parser.add_argument(
+        "--direct-limit", type=int, default=20000,
+        help="Above this number direct summation time is extrapolated"
+    )
+    parser.add_argument(
+        "--sample", type=int, default=1000,
+        help="Number of objects timed when direct time is extrapolated"
+    )
+    args = parser.parse_args(arguments)
+    print(
+        f"{'N':>8} {'direct [s]':>12} {'tree [s]':>10} {'speedup':>8} "
+        f"{'median err':>11} {'max err':>9}"
+    )
+    for count in args.objects:
+        row = benchmark(
+            count, args.opening_angle, args.direct_limit, args.sample
+        )
+        mark = "*" if row["direct_estimated"] else " "
+        print(
+            f"{row['objects']:>8} {row['direct_time']:>11.3f}{mark} "
+            f"{row['barnes_hut_time']:>10.3f} {row['speedup']:>8.1f} "
+            f"{row['median_error']:>11.2e} {row['max_error']:>9.2e}"
+        )
+    print("* direct time extrapolated from a sample of objects")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,136 @@
+"""
+Benchmark of integrators: wall time and number of evaluated rows
+of accelerations against relative energy drift.
+Usage: python3 -m benchmarks.integrators [-c state2.json] [--years 20]
+"""
+from classes.system import System
+from classes.integrator import create_integrator
+from classes.profiler import NullProfiler
+from iomodule import load_config
+import argparse
+import sys
+import time
+
+
+YEAR = 365.25 * 24 * 3600
+
+VARIANTS = [
+    ({"integrator": "euler"}, (1, 4, 16)),
+    ({"integrator": "leapfrog"}, (1, 4)),
+    ({"integrator": "verlet"}, (1, 4)),
+    ({"integrator": "rk4"}, (1, 4)),
+    ({"integrator": "rk45", "tolerance": 1e-6}, (1,)),
+    ({"integrator": "rk45", "tolerance": 1e-9}, (1,)),
+    ({"integrator": "block", "accuracy": 0.02}, (1,)),
+    ({"integrator": "block", "accuracy": 0.005}, (1,)),
+]
+
+
+class ForceCounter(NullProfiler):
+    """
+    Profiler counting rows of evaluated accelerations.
+    """
+
+    def __init__(self):
+        """
+        Initialize counter with no rows.
+        """
+        self._rows = 0
+
+    def rows(self):
+        """
+        Get number of evaluated rows.
+        """
+        return self._rows
+
+    def wrap(self, phase, function):
+        def counted(positions, rows=None):
+            self._rows += len(positions if rows is None else rows)
+            return function(positions, rows)
+
+        return counted
+
+
+def run(config, options, divisor, duration):
+    """
+    Integrate objects of the config over given simulated time.
+    Arguments:
+        config (dict): configuration of the simulation.
+        options (dict): fields describing the integrator.
+        divisor (int): time step of the config is divided by it.
+        duration (float): simulated time in seconds.
+    Returns:
+        row (dict): number of steps, wall time, number of evaluated
+            rows of accelerations and energy drift.
+    """
+    system = System(config)
+    engine = system.engine()
+    central_object = system.central_object()
+    integrator = create_integrator(options)
+    dt = system.dt() / divisor
+    gravity = system.gravity()
+
+    def energy():
+        return engine.kinetic_energy() + engine.potential_energy(
+            central_object, system.G(), gravity
+        )
+
+    start_energy = energy()
+    counter = ForceCounter()
+    elapsed = 0.0
+    steps = 0
+    start = time.perf_counter()
+    while elapsed < duration:
+        integrator.clamp(duration - elapsed)
+        elapsed += engine.step(
+            min(dt, duration - elapsed), central_object, system.G(),
+            system.gravity(), integrator, counter,
+        )
+        steps += 1
+    wall_time = time.perf_counter() - start
+    return {
+        "options": options,
+        "dt": dt,
+        "steps": steps,
+        "wall_time": wall_time,
+        "force_rows": counter.rows(),
+        "energy_drift": abs((energy() - start_energy) / start_energy),
+    }
+
+
+def main(arguments):
+    """
+    Run every integrator variant and print table with results.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c", "--config", type=str, default="state2.json",
+        help="Path to the configuration file"
+    )
+    parser.add_argument(
+        "--years", type=float, default=20.0,
+        help="Simulated time in years"
+    )
+    args = parser.parse_args(arguments)
+    config = load_config(args.config)
+    print(
+        f"{'integrator':<22} {'dt [s]':>10} {'steps':>8} "
+        f"{'wall [s]':>9} {'force rows':>11} {'energy drift':>13}"
+    )
+    for options, divisors in VARIANTS:
+        for divisor in divisors:
+            row = run(config, options, divisor, args.years * YEAR)
+            name = options["integrator"]
+            if "tolerance" in options:
+                name += f" tol={options['tolerance']:g}"
+            if "accuracy" in options:
+                name += f" acc={options['accuracy']:g}"
+            print(
+                f"{name:<22} {row['dt']:>10.0f} {row['steps']:>8} "
+                f"{row['wall_time']:>9.3f} {row['force_rows']:>11} "
+                f"{row['energy_drift']:>13.3e}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
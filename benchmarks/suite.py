@@ -0,0 +1,338 @@
+"""
+Benchmark suite timing phases of the simulation on synthetic systems.
+Usage: python3 -m benchmarks.suite [-n 10 1000 100000] [-s 10]
+    [-p 10000000] [-o benchmark.json]
+    [--repeat 3] [--baseline old.json --tolerance 0.25 --noise-floor 0.05]
+Results are written as JSON. With a baseline recorded with the same
+steps, seed, mutual gravity and particles, phases slower than baseline
+by more than tolerance and by more than noise floor seconds
+are reported as regressions and the script exits with status 1.
+"""
+from classes.system import System
+from classes.trajectory_sink import MemorySink
+from errors import MalformedDataError
+import numpy as np
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+COUNTS = [10, 100, 1000, 10000, 100000, 1000000]
+
+PHASES = ["setup", "stepping", "collisions", "io", "rendering"]
+
+RASTER_LIMIT = 10000
+
+NOISE_FLOOR = 0.05
+
+COMPARED_META = ["steps", "seed", "mutual_gravity", "particles"]
+
+
+def circular_orbits(generator, count, central_mass):
+    """
+    Draw positions and velocities of count bodies on circular orbits
+    spread uniformly on a disc around central mass.
+    """
+    radius = 1e11 * np.sqrt(generator.uniform(0.05, 1.0, size=count))
+    angle = generator.uniform(0, 2 * np.pi, size=count)
+    speed = np.sqrt(6.67430e-11 * central_mass / radius)
+    return {
+        "x": radius * np.cos(angle),
+        "y": radius * np.sin(angle),
+        "vx": -speed * np.sin(angle),
+        "vy": speed * np.cos(angle),
+    }
+
+
+def synthetic_config(count, seed=0, mutual_gravity="none", particles=0):
+    """
+    Create configuration with objects on circular orbits spread
+    uniformly on a disc around a Sun-like central object.
+    Arguments:
+        count (int): number of objects.
+        seed (int): seed of the random generator.
+        mutual_gravity (str): "none", "direct" or "barnes_hut".
+        particles (int): number of test particles on the same disc.
+    Returns:
+        config (dict): configuration with columnar objects.
+    """
+    generator = np.random.default_rng(seed)
+    central_mass = 2e30
+    objects = circular_orbits(generator, count, central_mass)
+    objects["mass"] = generator.uniform(1e20, 1e24, size=count)
+    objects["radius"] = generator.uniform(1e5, 1e7, size=count)
+    config = {
+        "central_mass": central_mass,
+        "central_radius": 7e8,
+        "scale": 1e11 / 300,
+        "image_size": [800, 800],
+        "time_step": 3600.0,
+        "mutual_gravity": mutual_gravity,
+        "objects": objects,
+    }
+    if particles:
+        config["particles"] = circular_orbits(
+            generator, particles, central_mass
+        )
+    return config
+
+
+def run_case(config, steps, directory, rows=16):
+    """
+    Run every phase once on given configuration.
+    Arguments:
+        config (dict): configuration of the simulation.
+        steps (int): number of simulated steps.
+        directory (str): directory for files written by the phases.
+        rows (int): rows of trajectories kept for rendering.
+    Returns:
+        timings (dict): wall time of every phase in seconds.
+    """
+    timings = {}
+    start = time.perf_counter()
+    system = System(config)
+    timings["setup"] = time.perf_counter() - start
+
+    sink = MemorySink(capacity=rows, stride=max(steps // rows, 1))
+    start = time.perf_counter()
+    _, collision_report = system.simulate(steps, sink)
+    timings["stepping"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    system.check_collisions()
+    timings["collisions"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    system.save_state(os.path.join(directory, "state.npz"))
+    system.save_collision_report(
+        collision_report, os.path.join(directory, "collision_report.txt")
+    )
+    timings["io"] = time.perf_counter() - start
+
+    count = system.engine().count()
+    start = time.perf_counter()
+    system.create_image(
+        sink,
+        output=os.path.join(directory, "image.png"),
+        headless=True,
+        legend=False,
+        backend="raster" if count > RASTER_LIMIT else None,
+    )
+    timings["rendering"] = time.perf_counter() - start
+    return timings
+
+
+def benchmark(count, steps, seed=0, mutual_gravity="none", repeat=1,
+              memory=True, particles=0):
+    """
+    Time phases for given number of objects.
+    Best time of repeat runs is kept, with spread of the times
+    as estimate of noise. Peak memory is measured
+    in a separate run traced by tracemalloc, so tracing does not
+    change the timings.
+    Returns:
+        row (dict): timings, throughput and peak memory.
+    """
+    config = synthetic_config(count, seed, mutual_gravity, particles)
+    with tempfile.TemporaryDirectory() as directory:
+        runs = [run_case(config, steps, directory) for _ in range(repeat)]
+        best = {
+            phase: min(timings[phase] for timings in runs)
+            for phase in PHASES
+        }
+        spread = {
+            phase: max(timings[phase] for timings in runs) - best[phase]
+            for phase in PHASES
+        }
+        peak = None
+        if memory:
+            tracemalloc.start()
+            run_case(config, steps, directory)
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    stepping = max(best["stepping"], 1e-12)
+    return {
+        "count": count,
+        "particles": particles,
+        "steps": steps,
+        "phases": best,
+        "spread": spread,
+        "steps_per_second": steps / stepping,
+        "body_steps_per_second": (count + particles) * steps / stepping,
+        "peak_memory_mb": peak,
+    }
+
+
+def compare(results, baseline, tolerance=0.25, noise_floor=NOISE_FLOOR):
+    """
+    Find phases slower than in the baseline.
+    A phase regressed only if it is slower both by more than tolerance
+    and by more than noise_floor seconds or spread of its repeated
+    runs, whichever is larger, so short phases do not fail on noise.
+    Arguments:
+        results (dict): results of the suite.
+        baseline (dict): stored results of the suite.
+        tolerance (float): allowed relative slowdown.
+        noise_floor (float): allowed absolute slowdown in seconds.
+    Returns:
+        regressions (list): list of dictionaries with count, phase
+            or "peak_memory_mb", old and new value.
+    Raises:
+        MalformedDataError: if the baseline was recorded with different
+            steps, seed, mutual gravity or particles.
+    """
+    for field in COMPARED_META:
+        new_value = results["meta"].get(field)
+        old_value = baseline.get("meta", {}).get(field)
+        if new_value != old_value:
+            raise MalformedDataError(
+                f"Baseline has {field}={old_value!r}, "
+                f"results have {field}={new_value!r}."
+            )
+    regressions = []
+    old_rows = {row["count"]: row for row in baseline["results"]}
+    for row in results["results"]:
+        old = old_rows.get(row["count"])
+        if old is None:
+            continue
+        for phase in PHASES:
+            new_time = row["phases"][phase]
+            old_time = old["phases"].get(phase)
+            floor = max(
+                noise_floor,
+                row.get("spread", {}).get(phase, 0.0),
+                old.get("spread", {}).get(phase, 0.0),
+            )
+            if old_time is None or new_time - old_time <= floor:
+                continue
+            if new_time > old_time * (1 + tolerance):
+                regressions.append(
+                    {
+                        "count": row["count"],
+                        "phase": phase,
+                        "old": old_time,
+                        "new": new_time,
+                    }
+                )
+        new_peak = row.get("peak_memory_mb")
+        old_peak = old.get("peak_memory_mb")
+        if new_peak is not None and old_peak is not None:
+            if new_peak > old_peak * (1 + tolerance):
+                regressions.append(
+                    {
+                        "count": row["count"],
+                        "phase": "peak_memory_mb",
+                        "old": old_peak,
+                        "new": new_peak,
+                    }
+                )
+    return regressions
+
+
+def main(arguments):
+    """
+    Run the suite, print table with results and save them as JSON.
+    A small case is run first, so imports are not timed.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--counts", type=int, nargs="+", default=COUNTS,
+        help="Numbers of objects"
+    )
+    parser.add_argument(
+        "-s", "--steps", type=int, default=10,
+        help="Number of simulated steps"
+    )
+    parser.add_argument(
+        "-p", "--particles", type=int, default=0,
+        help="Number of test particles added to every case"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mutual-gravity", type=str, default="none",
+        choices=["none", "direct", "barnes_hut"],
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of timed runs, the best one is kept"
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true",
+        help="Skip measuring peak memory"
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, default="benchmark.json",
+        help="File for results"
+    )
+    parser.add_argument(
+        "--baseline", type=str, required=False,
+        help="Results to compare with"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="Allowed relative slowdown against baseline"
+    )
+    parser.add_argument(
+        "--noise-floor", type=float, default=NOISE_FLOOR,
+        help="Allowed absolute slowdown against baseline in seconds"
+    )
+    args = parser.parse_args(arguments)
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "steps": args.steps,
+            "seed": args.seed,
+            "mutual_gravity": args.mutual_gravity,
+            "particles": args.particles,
+        },
+        "results": [],
+    }
+    print(
+        f"{'N':>8} " + " ".join(f"{phase:>10}" for phase in PHASES)
+        + f" {'steps/s':>10} {'bodies*steps/s':>15} {'peak [MiB]':>11}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        run_case(synthetic_config(10, args.seed), 1, directory)
+    for count in args.counts:
+        row = benchmark(
+            count, args.steps, args.seed, args.mutual_gravity,
+            args.repeat, not args.no_memory, args.particles,
+        )
+        results["results"].append(row)
+        peak = row["peak_memory_mb"]
+        print(
+            f"{count:>8} "
+            + " ".join(f"{row['phases'][phase]:>10.4f}" for phase in PHASES)
+            + f" {row['steps_per_second']:>10.1f}"
+            + f" {row['body_steps_per_second']:>15.3e}"
+            + (f" {peak:>11.1f}" if peak is not None else f" {'-':>11}")
+        )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(
+                results, baseline, args.tolerance, args.noise_floor
+            )
+        except MalformedDataError as error:
+            parser.error(f"baseline does not match: {error}")
+        for regression in regressions:
+            print(
+                f"Regresja N={regression['count']} {regression['phase']}: "
+                f"{regression['old']:.4f} -> {regression['new']:.4f}"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,140 @@
+"""
+Benchmark of the force kernel computed on several threads or processes.
+Usage: python3 -m benchmarks.threads [-n 5000 10000]
+    [-t 1 2 4 8] [--mutual-gravity direct] [--processes]
+    [-o threads.json]
+Accelerations of synthetic systems are evaluated by the single-threaded
+path and by pools of threads (or, with --processes, worker processes
+sharing memory) of every size. Speedup is relative to the
+single-threaded path, results of every pool are checked to be
+identical to it. By default direct mutual gravity is timed, its O(N^2)
+kernel dominates the evaluation. With --mutual-gravity none only
+the central field is evaluated, which takes milliseconds even
+for 10^6 objects, too little for a pool to speed up.
+"""
+from benchmarks.suite import synthetic_config
+from classes.system import System
+from classes.executor import ProcessExecutor, ThreadExecutor
+import numpy as np
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def best_time(function, repeat):
+    """
+    Get result of function and the best wall time of repeat calls.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def benchmark(count, threads, mutual_gravity="direct", chunk_size=65536,
+              repeat=3, seed=0, processes=False):
+    """
+    Time one evaluation of accelerations for given number of objects.
+    Returns:
+        row (dict): time of the single-threaded path and time,
+            speedup and identity of results for every thread count.
+    """
+    system = System(synthetic_config(count, seed, mutual_gravity))
+    engine = system.engine()
+    central_bodies = system.central_bodies()
+
+    def evaluate(executor=None):
+        return engine.accelerations(
+            central_bodies, system.G(), system.gravity(),
+            executor=executor,
+        )
+
+    expected, serial = best_time(evaluate, repeat)
+    row = {"count": count, "serial": serial, "threads": []}
+    for workers in threads:
+        if processes:
+            executor = ProcessExecutor(workers, chunk_size)
+            evaluate(executor)
+        else:
+            executor = ThreadExecutor(workers, chunk_size)
+        result, elapsed = best_time(lambda: evaluate(executor), repeat)
+        executor.close()
+        row["threads"].append(
+            {
+                "workers": workers,
+                "time": elapsed,
+                "speedup": serial / elapsed,
+                "identical": bool(np.array_equal(result, expected)),
+            }
+        )
+    return row
+
+
+def main(arguments):
+    """
+    Run the benchmark, print table with speedups and save it as JSON.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--counts", type=int, nargs="+", default=[5000, 10000],
+        help="Numbers of objects"
+    )
+    parser.add_argument(
+        "-t", "--threads", type=int, nargs="+", default=[1, 2, 4, 8],
+        help="Numbers of threads"
+    )
+    parser.add_argument(
+        "--mutual-gravity", type=str, default="direct",
+        choices=["none", "direct", "barnes_hut"],
+        help="Gravity between objects, default: direct"
+    )
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument(
+        "--processes", action="store_true",
+        help="Use worker processes sharing memory instead of threads"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of timed runs, the best one is kept"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-o", "--output", type=str, default="threads.json",
+        help="File for results"
+    )
+    args = parser.parse_args(arguments)
+    results = {
+        "meta": {
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "mutual_gravity": args.mutual_gravity,
+            "chunk_size": args.chunk_size,
+            "backend": "process" if args.processes else "thread",
+        },
+        "results": [],
+    }
+    print(f"{'N':>8} {'serial [s]':>11} " + " ".join(
+        f"{f'{workers} thr.':>14}" for workers in args.threads
+    ))
+    for count in args.counts:
+        row = benchmark(
+            count, args.threads, args.mutual_gravity, args.chunk_size,
+            args.repeat, args.seed, args.processes,
+        )
+        results["results"].append(row)
+        print(f"{count:>8} {row['serial']:>11.4f} " + " ".join(
+            f"{entry['speedup']:>7.2f}x"
+            + ("  same" if entry["identical"] else " DIFF.")
+            for entry in row["threads"]
+        ))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
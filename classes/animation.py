@@ -0,0 +1,274 @@
+from classes.trajectory_sink import TrajectorySink
+from classes.renderer import RasterRenderer
+from errors import MalformedDataError
+import numpy as np
+import os
+
+
+class GifWriter:
+    """
+    Class writing animated GIF frame by frame.
+    Every frame is encoded and written to the file as soon as it is
+    added, so memory does not grow with number of frames.
+    All frames use the palette of the first frame.
+    Attributes:
+        path (str): file of the animation.
+        duration (int): time of a frame in milliseconds.
+        loop (int): number of repetitions, 0 means forever.
+    """
+
+    def __init__(self, path, duration=100, loop=0):
+        """
+        Initialize writer of given file. The file is created
+        with the first frame.
+        """
+        self._path = path
+        self._duration = duration
+        self._loop = loop
+        self._file = None
+        self._palette = None
+        self._frames = 0
+
+    def frames(self):
+        """
+        Get number of written frames.
+        """
+        return self._frames
+
+    def append(self, image):
+        """
+        Encode frame and write it to the file.
+        Arguments:
+            image (numpy.ndarray): (height, width, 3 or 4) array of uint8.
+        """
+        from PIL import Image, GifImagePlugin
+
+        frame = Image.fromarray(np.ascontiguousarray(image)).convert("RGB")
+        if self._file is None:
+            self._palette = frame.quantize(256)
+            frame = self._palette
+            header, _ = GifImagePlugin.getheader(
+                frame,
+                info={
+                    "loop": self._loop,
+                    "duration": self._duration,
+                    "optimize": False,
+                },
+            )
+            self._file = open(self._path, "wb")
+            self._file.write(b"".join(header))
+        else:
+            frame = frame.quantize(palette=self._palette)
+        for data in GifImagePlugin.getdata(frame, duration=self._duration):
+            self._file.write(data)
+        self._frames += 1
+
+    def close(self):
+        """
+        Write end of the animation and close the file.
+        """
+        if self._file is not None:
+            self._file.write(b";")
+            self._file.close()
+            self._file = None
+
+
+class FrameWriter:
+    """
+    Class writing frames as numbered png files in a directory.
+    Attributes:
+        path (str): directory of the frames.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize writer of given directory.
+        """
+        self._path = path
+        self._frames = 0
+
+    def frames(self):
+        """
+        Get number of written frames.
+        """
+        return self._frames
+
+    def append(self, image):
+        """
+        Write frame as next png file.
+        Arguments:
+            image (numpy.ndarray): (height, width, 3 or 4) array of uint8.
+        """
+        import matplotlib.image
+
+        os.makedirs(self._path, exist_ok=True)
+        matplotlib.image.imsave(
+            os.path.join(self._path, f"frame_{self._frames:06d}.png"),
+            np.ascontiguousarray(image),
+        )
+        self._frames += 1
+
+    def close(self):
+        """
+        Nothing is buffered, frames are already written.
+        """
+        pass
+
+
+class Animator(TrajectorySink):
+    """
+    Sink rendering a frame of the animation every stride-th step.
+    One figure is created with the first frame, later frames only
+    update data of its artists. Trails of the objects are kept in
+    a ring buffer of given length, so memory stays constant
+    regardless of length of the simulation.
+    Attributes:
+        scale (float): scale of the simulation.
+        image_size (list): width and height of frames in pixels.
+        writer (GifWriter | FrameWriter): destination of frames.
+        backend (str): "matplotlib" draws objects with trails,
+            "raster" draws accumulated density of positions.
+            default: "matplotlib"
+        trail (int): number of frames in trails of the objects.
+        stride (int): steps between frames.
+    """
+
+    BACKENDS = ("matplotlib", "raster")
+
+    def __init__(self, scale, image_size, writer, backend="matplotlib",
+                 trail=50, stride=10):
+        """
+        Initialize animator writing frames with given writer.
+        Raises:
+            MalformedDataError: if backend is unknown.
+        """
+        super().__init__(stride)
+        if backend not in self.BACKENDS:
+            raise MalformedDataError(f"Unknown animation backend '{backend}'.")
+        self._scale = scale
+        self._image_size = [int(size) for size in image_size]
+        self._writer = writer
+        self._backend = backend
+        self._trail_length = max(int(trail), 1)
+        self._trail = np.empty((0, 0, 2))
+        self._figure = None
+        self._raster = None
+
+    def writer(self):
+        """
+        Get destination of frames.
+        """
+        return self._writer
+
+    def open(self, ids, rows=None):
+        """
+        Allocate trails for objects with given indexes.
+        """
+        super().open(ids, rows)
+        self._trail = np.full(
+            (self._trail_length, len(self._ids), 2), np.nan
+        )
+        if self._backend == "raster":
+            self._raster = RasterRenderer(self._scale, self._image_size)
+
+    def _write(self, step, row):
+        """
+        Render frame with positions after given step.
+        """
+        if self._backend == "raster":
+            self._raster.rasterize(row, step)
+            self._writer.append(self._raster.image())
+            return
+        self._trail[self._offset % self._trail_length] = row
+        if self._figure is None:
+            self._create_figure(row)
+        self._update_figure(step, row)
+        self._figure.canvas.draw()
+        self._writer.append(np.asarray(self._figure.canvas.buffer_rgba()))
+
+    def _create_figure(self, row):
+        """
+        Create figure and artists, with limits fitted to given
+        positions.
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.collections import LineCollection
+        import matplotlib
+
+        width, height = self._image_size
+        self._figure = Figure(figsize=(width / 100, height / 100), dpi=100)
+        FigureCanvasAgg(self._figure)
+        ax = self._figure.add_subplot()
+        finite = row[np.isfinite(row).all(axis=1)]
+        max_range = np.abs(finite).max() if len(finite) else self._scale
+        limit = 1.5 * max(max_range, self._scale) / self._scale
+        ax.set_xlim(-limit, limit)
+        ax.set_ylim(-limit, limit)
+        ax.set_xlabel("Odległość (km) / skala")
+        ax.set_ylabel("Odległość (km) / skala")
+        ax.scatter(0, 0, color="yellow", s=200)
+        colors = matplotlib.colormaps["tab10"].colors
+        self._colors = [
+            colors[number % len(colors)] for number in range(len(self._ids))
+        ]
+        self._lines = LineCollection(
+            [], linestyles="--", alpha=0.7, colors=self._colors
+        )
+        ax.add_collection(self._lines)
+        self._points = ax.scatter(
+            np.zeros(len(self._ids)), np.zeros(len(self._ids)), s=50,
+            c=self._colors,
+        )
+        self._title = ax.set_title("")
+
+    def _update_figure(self, step, row):
+        """
+        Set data of the artists to positions after given step.
+        """
+        count = min(self._offset + 1, self._trail_length)
+        slots = (np.arange(count) + self._offset + 1 - count)
+        trail = self._trail[slots % self._trail_length] / self._scale
+        segments = []
+        for number in range(len(self._ids)):
+            points = trail[:, number]
+            segments.append(points[np.isfinite(points).all(axis=1)])
+        self._lines.set_segments(segments)
+        self._points.set_offsets(np.nan_to_num(row / self._scale, nan=np.inf))
+        self._title.set_text(f"Krok {step}")
+
+    def close(self):
+        """
+        Finish the animation.
+        """
+        self._writer.close()
+
+
+def create_animator(config, scale, image_size):
+    """
+    Create animator described by the config dictionary.
+    Files ending with ".gif" are written as animated GIF,
+    other paths as directories of png frames.
+    Uses fields:
+        path (str): file or directory of the animation.
+            default: "simulation.gif"
+        every (int): steps between frames. default: 10
+        duration (int): time of a frame in milliseconds. default: 100
+        trail (int): number of frames in trails. default: 50
+        backend (str): "matplotlib" or "raster". default: "matplotlib"
+    Returns:
+        animator (Animator): new animator.
+    """
+    path = config.get("path", "simulation.gif")
+    if path.endswith(".gif"):
+        writer = GifWriter(path, duration=config.get("duration", 100))
+    else:
+        writer = FrameWriter(path)
+    return Animator(
+        scale,
+        image_size,
+        writer,
+        backend=config.get("backend", "matplotlib"),
+        trail=config.get("trail", 50),
+        stride=config.get("every", 10),
+    )
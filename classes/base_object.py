@@ -11,6 +11,8 @@ class BaseObject:
         mass (float): mass of the object
     """
 
+    __slots__ = ("_pos_x", "_pos_y", "_mass")
+
     def __init__(self, pos_x, pos_y, mass):
         """
         Initialize the object with given position and mass.
@@ -0,0 +1,507 @@
+from classes.central_object import CentralObject
+from errors import MalformedDataError
+import numpy as np
+
+
+class CentralBodies:
+    """
+    Class keeping massive central bodies attracting the objects.
+    Field of all bodies is calculated in one vectorized pass over
+    the objects for every body. Moving bodies attract each other
+    and are advanced together with the objects, objects do not
+    attract them. Field of static bodies can be sampled on
+    a grid, see AccelerationGrid.
+    Attributes:
+        bodies (list): list of CentralObject.
+        velocities (numpy.ndarray): (K, 2) array with velocities
+            of the bodies. default: zeros
+        moving (bool): bodies move. default: True if there is
+            more than one body.
+    """
+
+    def __init__(self, bodies, velocities=None, moving=None):
+        """
+        Initialize central bodies.
+        Raises:
+            MalformedDataError: if there are no bodies.
+        """
+        if not bodies:
+            raise MalformedDataError("At least one central body is needed.")
+        self._bodies = list(bodies)
+        if velocities is None:
+            velocities = np.zeros((len(self._bodies), 2))
+        self._velocities = np.array(velocities, dtype=np.float64).reshape(
+            -1, 2
+        )
+        if moving is None:
+            moving = len(self._bodies) > 1
+        self._moving = moving
+        self._grid_options = None
+        self._grid = None
+
+    def __getstate__(self):
+        """
+        Get state for pickling, without the grid, which is rebuilt
+        when it is needed.
+        """
+        state = dict(self.__dict__)
+        state["_grid"] = None
+        return state
+
+    def bodies(self):
+        """
+        Get list of central bodies.
+        """
+        return self._bodies
+
+    def count(self):
+        """
+        Get number of central bodies.
+        """
+        return len(self._bodies)
+
+    def moving(self):
+        """
+        Check if the bodies move.
+        """
+        return self._moving
+
+    def positions(self):
+        """
+        Get (K, 2) array with positions of the bodies.
+        """
+        return np.array(
+            [(body.pos_x(), body.pos_y()) for body in self._bodies],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+
+    def velocities(self):
+        """
+        Get (K, 2) array with velocities of the bodies.
+        """
+        return self._velocities
+
+    def masses(self):
+        """
+        Get (K,) array with masses of the bodies.
+        """
+        return np.array([body.mass() for body in self._bodies])
+
+    def radii(self):
+        """
+        Get (K,) array with radii of the bodies.
+        """
+        return np.array([body.radius() for body in self._bodies])
+
+    def set_state(self, positions, velocities):
+        """
+        Set positions and velocities of the bodies.
+        """
+        for body, (x, y) in zip(self._bodies, positions):
+            body.set_pos_x(float(x))
+            body.set_pos_y(float(y))
+        self._velocities = np.array(velocities, dtype=np.float64)
+
+    def set_grid(self, size, extent):
+        """
+        Sample field of static bodies on a grid.
+        Arguments:
+            size (int): number of grid nodes along each axis.
+            extent (float): half of the width of the grid.
+        """
+        self._grid_options = (int(size), float(extent))
+        self._grid = None
+
+    def grid_options(self):
+        """
+        Get size and extent of the grid, None if it is disabled.
+        """
+        return self._grid_options
+
+    def _current_grid(self, G):
+        """
+        Get grid for current masses and positions, build it if needed.
+        """
+        key = (G, tuple(self.masses()), tuple(self.positions().ravel()))
+        if self._grid is None or self._grid.key() != key:
+            size, extent = self._grid_options
+            self._grid = AccelerationGrid(
+                self.positions(), self.masses(), self.radii(), G,
+                extent, size, key,
+            )
+        return self._grid
+
+    def accelerations(self, positions, G, centres=None):
+        """
+        Calculate accelerations caused by the bodies at given positions.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            G (float): gravitational constant.
+            centres (numpy.ndarray): (K, 2) array with positions
+                of the bodies to use instead of current ones.
+        Returns:
+            accelerations (numpy.ndarray): (N, 2) array.
+        """
+        if centres is None and self._grid_options and not self._moving:
+            accelerations, valid = self._current_grid(G).accelerations(
+                positions
+            )
+            if not valid.all():
+                accelerations[~valid] = field(
+                    positions[~valid], self.positions(), self.masses(), G
+                )
+            return accelerations
+        if centres is None:
+            centres = self.positions()
+        return field(positions, centres, self.masses(), G)
+
+    def mutual_accelerations(self, G, centres=None):
+        """
+        Calculate accelerations of the bodies caused by each other.
+        Arguments:
+            G (float): gravitational constant.
+            centres (numpy.ndarray): (K, 2) array with positions
+                of the bodies to use instead of current ones.
+        Returns:
+            accelerations (numpy.ndarray): (K, 2) array.
+        """
+        if centres is None:
+            centres = self.positions()
+        masses = self.masses()
+        accelerations = np.zeros_like(centres)
+        for body in range(len(centres)):
+            others = np.arange(len(centres)) != body
+            accelerations[body] = field(
+                centres[body:body + 1], centres[others], masses[others], G
+            )[0]
+        return accelerations
+
+    def potential(self, positions, G):
+        """
+        Calculate gravitational potential of the bodies per unit mass.
+        Returns:
+            potential (numpy.ndarray): (N,) array.
+        """
+        potential = np.zeros(len(positions))
+        for (x, y), mass in zip(self.positions(), self.masses()):
+            distance = np.hypot(positions[:, 0] - x, positions[:, 1] - y)
+            potential -= G * mass / distance
+        return potential
+
+    def energy(self, G):
+        """
+        Calculate kinetic energy of the bodies and potential energy
+        of their pairs.
+        """
+        masses = self.masses()
+        positions = self.positions()
+        energy = 0.5 * float(
+            np.sum(masses * np.sum(self._velocities**2, axis=1))
+        )
+        for body in range(len(masses) - 1):
+            distance = np.hypot(
+                *(positions[body + 1:] - positions[body]).T
+            )
+            energy -= G * masses[body] * float(
+                np.sum(masses[body + 1:] / distance)
+            )
+        return energy
+
+    def angular_momentum(self, origin=(0.0, 0.0)):
+        """
+        Calculate angular momentum of the bodies about given point.
+        """
+        offsets = self.positions() - np.asarray(origin, dtype=np.float64)
+        return float(np.sum(self.masses() * (
+            offsets[:, 0] * self._velocities[:, 1]
+            - offsets[:, 1] * self._velocities[:, 0]
+        )))
+
+    def hits(self, positions, radii, inclusive=False):
+        """
+        Find central body hit by every object.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            radii (numpy.ndarray): (N,) array with radii of the objects.
+            inclusive (bool): objects exactly touching a body hit it.
+        Returns:
+            hits (numpy.ndarray): (N,) array with number of the body
+                hit by the object, -1 if none. The lowest number is
+                given if several bodies are hit.
+        """
+        hits = np.full(len(positions), -1, dtype=np.int64)
+        for body in range(self.count() - 1, -1, -1):
+            central = self._bodies[body]
+            dx = positions[:, 0] - central.pos_x()
+            dy = positions[:, 1] - central.pos_y()
+            distance = dx * dx + dy * dy
+            limit = (central.radius() + radii) ** 2
+            inside = distance <= limit if inclusive else distance < limit
+            hits[inside] = body
+        return hits
+
+    def swept_hits(self, start, end, radii, start_centres=None):
+        """
+        Find central body hit by every object during a step, also
+        when the object passes through it between the ends of the step.
+        Objects and bodies move along straight segments. Broad phase
+        skips objects whose segment, widened by the radii, has bounding
+        box apart from the one of the body, narrow phase solves for
+        the first moment when distance equals sum of the radii.
+        Arguments:
+            start (numpy.ndarray): (N, 2) array with positions
+                at the beginning of the step.
+            end (numpy.ndarray): (N, 2) array with positions at its end.
+            radii (numpy.ndarray): (N,) array with radii of the objects.
+            start_centres (numpy.ndarray): (K, 2) array with positions
+                of the bodies at the beginning of the step.
+                default: current positions.
+        Returns:
+            hits (numpy.ndarray): (N,) array with number of the body
+                hit by the object, -1 if none. The body hit first
+                is given if several bodies are hit.
+            fractions (numpy.ndarray): (N,) array with part of the step
+                passed before the impact, NaN if there is none.
+        """
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64),
+                                (len(start),))
+        hits = np.full(len(start), -1, dtype=np.int64)
+        fractions = np.full(len(start), np.nan)
+        centres = self.positions()
+        if start_centres is None:
+            start_centres = centres
+        low = np.minimum(start, end) - radii[:, np.newaxis]
+        high = np.maximum(start, end) + radii[:, np.newaxis]
+        for body in range(self.count()):
+            radius = self._bodies[body].radius()
+            first, last = start_centres[body], centres[body]
+            near = np.all(
+                (low <= np.maximum(first, last) + radius)
+                & (high >= np.minimum(first, last) - radius),
+                axis=1,
+            )
+            rows = np.flatnonzero(near)
+            offset = start[rows] - first
+            motion = end[rows] - last - offset
+            a = np.sum(motion * motion, axis=1)
+            b = np.sum(offset * motion, axis=1)
+            c = np.sum(offset * offset, axis=1) - (radius + radii[rows])**2
+            discriminant = b * b - a * c
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fraction = (-b - np.sqrt(discriminant)) / a
+            inside = c <= 0
+            fraction = np.where(inside, 0.0, fraction)
+            hit = inside | (
+                (a > 0) & (discriminant >= 0) & (fraction >= 0)
+                & (fraction <= 1)
+            )
+            earlier = hit & ~(fractions[rows] <= fraction)
+            hits[rows[earlier]] = body
+            fractions[rows[earlier]] = fraction[earlier]
+        return hits, fractions
+
+    def absorb(self, masses, momenta):
+        """
+        Add mass and momentum of absorbed objects to the bodies.
+        Moving bodies change velocity, conserving momentum.
+        Arguments:
+            masses (numpy.ndarray): (K,) array with absorbed masses.
+            momenta (numpy.ndarray): (K, 2) array with absorbed momenta.
+        """
+        for body, (mass, momentum) in enumerate(zip(masses, momenta)):
+            if mass <= 0:
+                continue
+            central = self._bodies[body]
+            total = central.mass() + mass
+            if self._moving:
+                self._velocities[body] = (
+                    central.mass() * self._velocities[body] + momentum
+                ) / total
+            central.set_mass(total)
+
+    def config(self):
+        """
+        Get dictionary describing the bodies in config format.
+        """
+        if self.count() == 1 and not self._moving:
+            body = self._bodies[0]
+            config = {
+                "central_mass": float(body.mass()),
+                "central_radius": float(body.radius()),
+            }
+        else:
+            config = {
+                "central_bodies": [
+                    {
+                        "x": float(body.pos_x()),
+                        "y": float(body.pos_y()),
+                        "vx": float(vx),
+                        "vy": float(vy),
+                        "mass": float(body.mass()),
+                        "radius": float(body.radius()),
+                    }
+                    for body, (vx, vy) in zip(
+                        self._bodies, self._velocities
+                    )
+                ],
+                "central_moving": self._moving,
+            }
+        if self._grid_options is not None:
+            size, extent = self._grid_options
+            config["central_grid"] = {"size": size, "extent": extent}
+        return config
+
+
+class AccelerationGrid:
+    """
+    Class keeping field of static bodies sampled on a regular grid.
+    Accelerations between nodes are interpolated bilinearly.
+    Points outside the grid and in cells near a body, where field
+    changes too fast, are marked as not valid and should be
+    calculated exactly.
+    Attributes:
+        centres (numpy.ndarray): (K, 2) array with positions of bodies.
+        masses (numpy.ndarray): (K,) array with masses of bodies.
+        radii (numpy.ndarray): (K,) array with radii of bodies.
+        G (float): gravitational constant.
+        extent (float): half of the width of the grid, around centre
+            of mass of the bodies.
+        size (int): number of nodes along each axis.
+        key (tuple): values the grid was built for.
+    """
+
+    MARGIN = 4
+
+    def __init__(self, centres, masses, radii, G, extent, size=512,
+                 key=None):
+        """
+        Sample field of the bodies on the nodes of the grid.
+        """
+        self._key = key
+        centre = np.average(centres, axis=0, weights=masses)
+        self._origin = centre - extent
+        self._size = size
+        self._step = 2 * extent / (size - 1)
+        axis = np.arange(size) * self._step
+        x, y = np.meshgrid(
+            self._origin[0] + axis, self._origin[1] + axis, indexing="ij"
+        )
+        nodes = np.column_stack((x.ravel(), y.ravel()))
+        near = np.zeros(len(nodes), dtype=bool)
+        for (cx, cy), radius in zip(centres, radii):
+            near |= np.hypot(nodes[:, 0] - cx, nodes[:, 1] - cy) < (
+                radius + self.MARGIN * self._step
+            )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = field(nodes, centres, masses, G)
+        self._values = values.reshape(size, size, 2)
+        self._near = near.reshape(size, size)
+
+    def key(self):
+        """
+        Get values the grid was built for.
+        """
+        return self._key
+
+    def accelerations(self, positions):
+        """
+        Interpolate accelerations at given positions.
+        Returns:
+            accelerations (numpy.ndarray): (N, 2) array, zeros where
+                not valid.
+            valid (numpy.ndarray): (N,) boolean array, False for points
+                which must be calculated exactly.
+        """
+        cell = (positions - self._origin) / self._step
+        index = np.floor(cell).astype(np.int64)
+        valid = np.all((index >= 0) & (index < self._size - 1), axis=1)
+        index = np.clip(index, 0, self._size - 2)
+        i, j = index[:, 0], index[:, 1]
+        valid &= ~(
+            self._near[i, j] | self._near[i + 1, j]
+            | self._near[i, j + 1] | self._near[i + 1, j + 1]
+        )
+        t = (cell - index)[:, :, None]
+        tx, ty = t[:, 0], t[:, 1]
+        values = self._values
+        accelerations = (
+            (1 - tx) * (1 - ty) * values[i, j]
+            + tx * (1 - ty) * values[i + 1, j]
+            + (1 - tx) * ty * values[i, j + 1]
+            + tx * ty * values[i + 1, j + 1]
+        )
+        accelerations[~valid] = 0.0
+        return accelerations, valid
+
+
+def field(positions, centres, masses, G, chunk_size=65536):
+    """
+    Calculate accelerations caused by point masses at given positions.
+    Positions are processed in chunks small enough to stay in cache,
+    every mass is one vectorized pass over a chunk.
+    Arguments:
+        positions (numpy.ndarray): (N, 2) array with positions.
+        centres (numpy.ndarray): (K, 2) array with positions of masses.
+        masses (numpy.ndarray): (K,) array with masses.
+        G (float): gravitational constant.
+        chunk_size (int): number of positions processed at once.
+    Returns:
+        accelerations (numpy.ndarray): (N, 2) array.
+    """
+    accelerations = np.zeros((len(positions), 2))
+    for start in range(0, len(positions), chunk_size):
+        chunk = positions[start:start + chunk_size]
+        result = accelerations[start:start + chunk_size]
+        for (x, y), mass in zip(centres, masses):
+            dx = x - chunk[:, 0]
+            dy = y - chunk[:, 1]
+            d2 = dx * dx + dy * dy
+            factor = G * mass / (d2 * np.sqrt(d2))
+            result[:, 0] += factor * dx
+            result[:, 1] += factor * dy
+    return accelerations
+
+
+def create_central_bodies(config):
+    """
+    Create central bodies described by the config dictionary.
+    Uses fields:
+        central_bodies (list): dictionaries with x, y, vx, vy, mass
+            and radius of the bodies. default: single body given by
+            central_mass and central_radius at the origin.
+        central_moving (bool): bodies move. default: True if there is
+            more than one body.
+        central_grid (dict): size and extent of the grid sampling
+            field of static bodies. default: None
+    Returns:
+        bodies (CentralBodies): new central bodies.
+    """
+    if "central_bodies" in config:
+        data = config["central_bodies"]
+        bodies = CentralBodies(
+            [
+                CentralObject(
+                    mass=body["mass"],
+                    radius=body["radius"],
+                    pos_x=body.get("x", 0),
+                    pos_y=body.get("y", 0),
+                )
+                for body in data
+            ],
+            [(body.get("vx", 0), body.get("vy", 0)) for body in data],
+            config.get("central_moving"),
+        )
+    else:
+        bodies = CentralBodies(
+            [
+                CentralObject(
+                    mass=config["central_mass"],
+                    radius=config["central_radius"],
+                )
+            ],
+            moving=config.get("central_moving", False),
+        )
+    grid = config.get("central_grid")
+    if grid is not None:
+        bodies.set_grid(grid.get("size", 512), grid["extent"])
+    return bodies
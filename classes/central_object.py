@@ -1,5 +1,6 @@
 from classes.base_object import BaseObject
 from errors import NegativeRadiusError, NegativeMassError
+import numpy as np
 
 
 class CentralObject(BaseObject):
@@ -10,6 +11,8 @@ class CentralObject(BaseObject):
         radius (float): radius of the object.
     """
 
+    __slots__ = ("_radius",)
+
     def __init__(self, mass, radius, pos_x=0, pos_y=0):
         """
         Initialize the object with given mass, radius and position = 0, 0.
@@ -46,3 +49,30 @@ class CentralObject(BaseObject):
         if radius <= 0:
             raise NegativeRadiusError
         self._radius = radius
+
+    def accelerations(self, positions, G):
+        """
+        Calculate accelerations caused by the object at given positions.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            G (float): gravitational constant.
+        Returns:
+            accelerations (numpy.ndarray): (N, 2) array.
+        """
+        dx = self.pos_x() - positions[:, 0]
+        dy = self.pos_y() - positions[:, 1]
+        distance = np.sqrt(dx**2 + dy**2)
+        factor = G * self.mass() / distance**3
+        return np.column_stack((factor * dx, factor * dy))
+
+    def potential(self, positions, G):
+        """
+        Calculate gravitational potential of the object per unit mass
+        at given positions.
+        Returns:
+            potential (numpy.ndarray): (N,) array.
+        """
+        distance = np.hypot(
+            positions[:, 0] - self.pos_x(), positions[:, 1] - self.pos_y()
+        )
+        return -G * self.mass() / distance
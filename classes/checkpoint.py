@@ -0,0 +1,137 @@
+import numpy as np
+import json
+import os
+import time
+
+
+class Checkpointer:
+    """
+    Class deciding when snapshots of a running simulation are saved.
+    A snapshot is saved every given number of steps, every given
+    number of seconds of wall time, or both.
+    Attributes:
+        path (str): file of the snapshot. Files ending with ".json"
+            are written as JSON, others as compact binary npz.
+        every_steps (int): steps between snapshots, None to disable.
+        every_seconds (float): seconds between snapshots, None to disable.
+    """
+
+    def __init__(self, path, every_steps=None, every_seconds=None):
+        """
+        Initialize checkpointer writing to given file.
+        """
+        self._path = path
+        self._every_steps = every_steps
+        self._every_seconds = every_seconds
+        self._last_time = time.monotonic()
+
+    def path(self):
+        """
+        Get file of the snapshot.
+        """
+        return self._path
+
+    def due(self, step):
+        """
+        Check if snapshot should be saved after given number of steps.
+        """
+        if self._every_steps and step % self._every_steps == 0:
+            return True
+        if self._every_seconds is not None:
+            return time.monotonic() - self._last_time >= self._every_seconds
+        return False
+
+    def save(self, meta, arrays):
+        """
+        Save snapshot and restart the wall time counter.
+        """
+        save_checkpoint(self._path, meta, arrays)
+        self._last_time = time.monotonic()
+
+
+def save_checkpoint(path, meta, arrays):
+    """
+    Save snapshot atomically: data is written to a temporary file,
+    which then replaces the previous snapshot.
+    Arguments:
+        path (str): file of the snapshot, JSON if it ends with ".json",
+            numpy npz archive otherwise.
+        meta (dict): JSON serializable values.
+        arrays (dict): dictionary of numpy arrays.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        if path.endswith(".json"):
+            data = {
+                "meta": meta,
+                "arrays": {
+                    name: {
+                        "dtype": str(array.dtype),
+                        "shape": list(array.shape),
+                        "data": array.ravel().tolist(),
+                    }
+                    for name, array in arrays.items()
+                },
+            }
+            f.write(json.dumps(data).encode())
+        else:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """
+    Load snapshot saved by save_checkpoint.
+    Arguments:
+        path (str): file of the snapshot.
+    Returns:
+        meta (dict): JSON values of the snapshot.
+        arrays (dict): dictionary of numpy arrays.
+    Raises:
+        FileNotFoundError: if file does not exist.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File {path} not found")
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            data = json.load(f)
+        arrays = {
+            name: np.array(array["data"], dtype=array["dtype"]).reshape(
+                array["shape"]
+            )
+            for name, array in data["arrays"].items()
+        }
+        return data["meta"], arrays
+    with np.load(path) as archive:
+        meta = json.loads(str(archive["meta"]))
+        arrays = {
+            name: archive[name] for name in archive.files if name != "meta"
+        }
+    return meta, arrays
+
+
+def split_state(prefix, state, meta, arrays):
+    """
+    Put values of state dictionary into meta and arrays of a snapshot.
+    Numpy arrays are stored in arrays, other values in meta.
+    Names are prefixed with given prefix and "/".
+    """
+    for name, value in state.items():
+        if isinstance(value, np.ndarray):
+            arrays[f"{prefix}/{name}"] = value
+        else:
+            meta[f"{prefix}/{name}"] = value
+
+
+def join_state(prefix, meta, arrays):
+    """
+    Collect state dictionary stored by split_state.
+    """
+    state = {}
+    for source in (meta, arrays):
+        for name, value in source.items():
+            if name.startswith(f"{prefix}/"):
+                state[name[len(prefix) + 1:]] = value
+    return state
@@ -0,0 +1,286 @@
+from errors import MalformedDataError
+import json
+
+
+class NullDiagnostics:
+    """
+    Diagnostics doing nothing, used when they are disabled.
+    """
+
+    def enabled(self):
+        """
+        Check if the diagnostics measure anything.
+        """
+        return False
+
+    def config(self):
+        """
+        Get configuration fields describing the diagnostics.
+        """
+        return {}
+
+    def due(self, step):
+        """
+        Check if conserved quantities should be measured after
+        given number of steps.
+        """
+        return False
+
+    def measure(self, system, step):
+        """
+        Measure conserved quantities of the system after given
+        number of steps.
+        """
+        return None
+
+    def records(self):
+        """
+        Get list of measurements.
+        """
+        return []
+
+    def state(self):
+        """
+        Get dictionary with values needed to continue measuring.
+        """
+        return {}
+
+    def set_state(self, state):
+        """
+        Restore values returned by state.
+        """
+        pass
+
+
+class Diagnostics(NullDiagnostics):
+    """
+    Class tracking numerical drift of conserved quantities.
+    Every given number of steps total kinetic and potential energy
+    and angular momentum of the objects are calculated with a few
+    array operations and compared with the baseline, the first
+    measurement after the number of objects last changed. Collisions
+    with central bodies and merges change energy for real, so they
+    start a new baseline. When relative drift of energy, or
+    of angular momentum if its threshold is given, exceeds
+    the threshold, the run either only records it, halves the time
+    step and starts a new baseline, or is stopped.
+    Angular momentum is taken about the first central body, or
+    about the origin with moving bodies, whose momentum is included.
+    It is conserved only with a single body or moving bodies.
+    Potential energy of pairs of objects is included only with
+    mutual gravity and is computed by its solver, so it costs
+    as much as one evaluation of accelerations.
+    Attributes:
+        every (int): number of steps between measurements.
+        threshold (float): largest allowed relative drift of energy.
+            default: None, drift is only recorded.
+        momentum_threshold (float): largest allowed relative drift
+            of angular momentum. default: None
+        action (str): "report", "halve" or "abort", done when drift
+            exceeds a threshold.
+        min_time_step (float): time step is never halved below it,
+            the run is stopped instead. default: None
+    """
+
+    ACTIONS = ("report", "halve", "abort")
+
+    def __init__(self, every=100, threshold=None, momentum_threshold=None,
+                 action="report", min_time_step=None):
+        """
+        Initialize diagnostics with no measurements.
+        Raises:
+            MalformedDataError: if every is not positive or action
+                is unknown.
+        """
+        if every < 1:
+            raise MalformedDataError(
+                "Steps between diagnostics must be positive."
+            )
+        if action not in self.ACTIONS:
+            raise MalformedDataError(f"Unknown drift action '{action}'.")
+        self._every = int(every)
+        self._threshold = threshold
+        self._momentum_threshold = momentum_threshold
+        self._action = action
+        self._min_time_step = min_time_step
+        self._baseline = None
+        self._records = []
+
+    def enabled(self):
+        return True
+
+    def config(self):
+        config = {"every": self._every, "action": self._action}
+        if self._threshold is not None:
+            config["threshold"] = self._threshold
+        if self._momentum_threshold is not None:
+            config["momentum_threshold"] = self._momentum_threshold
+        if self._min_time_step is not None:
+            config["min_time_step"] = self._min_time_step
+        return {"diagnostics": config}
+
+    def due(self, step):
+        return step % self._every == 0
+
+    def quantities(self, system):
+        """
+        Calculate conserved quantities of the system.
+        Returns:
+            quantities (dict): kinetic, potential and total energy
+                and angular momentum.
+        """
+        engine = system.engine()
+        central_bodies = system.central_bodies()
+        G = system.G()
+        kinetic = engine.kinetic_energy()
+        potential = engine.potential_energy(
+            central_bodies, G, system.gravity()
+        )
+        energy = kinetic + potential
+        if central_bodies.moving():
+            energy += central_bodies.energy(G)
+            momentum = (
+                engine.angular_momentum()
+                + central_bodies.angular_momentum()
+            )
+        else:
+            centre = system.central_object()
+            momentum = engine.angular_momentum(
+                (centre.pos_x(), centre.pos_y())
+            )
+        return {
+            "kinetic": kinetic,
+            "potential": potential,
+            "energy": energy,
+            "angular_momentum": momentum,
+        }
+
+    def measure(self, system, step):
+        """
+        Measure conserved quantities and their drift from the baseline.
+        Arguments:
+            system (System): measured system.
+            step (int): number of finished steps.
+        Returns:
+            record (dict): step, time, time step, number of objects,
+                quantities, relative drifts and action taken: None,
+                "halve" or "abort".
+        """
+        record = {
+            "step": step,
+            "time": system.time(),
+            "time_step": system.dt(),
+            "objects": system.engine().count(),
+        }
+        record.update(self.quantities(system))
+        baseline = self._baseline
+        if baseline is None or baseline["objects"] != record["objects"]:
+            baseline = self._baseline = dict(record)
+        record["energy_drift"] = drift(record["energy"], baseline["energy"])
+        record["momentum_drift"] = drift(
+            record["angular_momentum"], baseline["angular_momentum"]
+        )
+        record["action"] = None
+        if self._exceeded(record) and self._action != "report":
+            record["action"] = self._action
+            limit = self._min_time_step
+            if self._action == "halve" and limit is not None and (
+                system.dt() / 2 < limit
+            ):
+                record["action"] = "abort"
+            if record["action"] == "halve":
+                self._baseline = None
+        self._records.append(record)
+        return record
+
+    def _exceeded(self, record):
+        """
+        Check if drift of the record exceeds a threshold.
+        """
+        if self._threshold is not None and (
+            record["energy_drift"] > self._threshold
+        ):
+            return True
+        return self._momentum_threshold is not None and (
+            record["momentum_drift"] > self._momentum_threshold
+        )
+
+    def records(self):
+        return self._records
+
+    def summary(self):
+        """
+        Get largest drifts, final time step and number of halvings.
+        """
+        records = self._records
+        return {
+            "measurements": len(records),
+            "max_energy_drift": max(
+                (record["energy_drift"] for record in records), default=0.0
+            ),
+            "max_momentum_drift": max(
+                (record["momentum_drift"] for record in records),
+                default=0.0,
+            ),
+            "halved": sum(record["action"] == "halve" for record in records),
+            "aborted": any(record["action"] == "abort" for record in records),
+            "time_step": records[-1]["time_step"] if records else None,
+        }
+
+    def save(self, filename):
+        """
+        Save configuration, summary and time series of measurements
+        to JSON file.
+        """
+        with open(filename, "w") as f:
+            json.dump(
+                {
+                    "config": self.config()["diagnostics"],
+                    "summary": self.summary(),
+                    "records": self._records,
+                },
+                f,
+                indent=4,
+            )
+
+    def state(self):
+        return {"baseline": self._baseline, "records": self._records}
+
+    def set_state(self, state):
+        self._baseline = state.get("baseline")
+        self._records = list(state.get("records", []))
+
+
+def drift(value, baseline):
+    """
+    Calculate relative drift of value from baseline, absolute
+    if baseline is zero.
+    """
+    if baseline == 0:
+        return abs(value)
+    return abs(value - baseline) / abs(baseline)
+
+
+def create_diagnostics(config):
+    """
+    Create diagnostics described by the config dictionary.
+    Uses fields:
+        every (int): steps between measurements. default: 100
+        threshold (float): largest relative drift of energy.
+        momentum_threshold (float): largest relative drift
+            of angular momentum.
+        action (str): "report", "halve" or "abort". default: "report"
+        min_time_step (float): smallest time step after halving.
+    Returns:
+        diagnostics (Diagnostics | NullDiagnostics): NullDiagnostics
+            if config is empty.
+    """
+    if not config:
+        return NullDiagnostics()
+    return Diagnostics(
+        config.get("every", 100),
+        config.get("threshold"),
+        config.get("momentum_threshold"),
+        config.get("action", "report"),
+        config.get("min_time_step"),
+    )
@@ -0,0 +1,598 @@
+from classes.integrator import SemiImplicitEuler
+from classes.central_bodies import CentralBodies
+import numpy as np
+
+
+class Engine:
+    """
+    Class keeping objects of the simulation as a structure of arrays.
+    Positions, velocities and masses of all objects are stored
+    in contiguous numpy arrays, so every object is advanced
+    in one batched operation per step.
+    Attributes:
+        positions (numpy.ndarray): (N, 2) array with x and y coordinates.
+        velocities (numpy.ndarray): (N, 2) array with velocities.
+        masses (numpy.ndarray): (N,) array with masses.
+        radii (numpy.ndarray): (N,) array with radii, NaN if unknown.
+        ids (numpy.ndarray): (N,) array with indexes of the objects,
+            given when the engine was created. They do not change
+            when other objects are removed.
+    """
+
+    def __init__(self, positions, velocities, masses, radii=None,
+                 ids=None):
+        """
+        Initialize the engine with given arrays.
+        Arrays are copied into contiguous float64 arrays.
+        """
+        self._positions = np.array(
+            positions, dtype=np.float64
+        ).reshape(-1, 2)
+        self._velocities = np.array(
+            velocities, dtype=np.float64
+        ).reshape(-1, 2)
+        self._masses = np.array(masses, dtype=np.float64).reshape(-1)
+        if radii is None:
+            radii = np.full(len(self._masses), np.nan)
+        self._radii = np.array(radii, dtype=np.float64).reshape(-1)
+        if ids is None:
+            ids = np.arange(len(self._masses))
+        self._ids = np.array(ids, dtype=np.int64).reshape(-1)
+        self._version = 0
+
+    @classmethod
+    def from_objects(cls, objects):
+        """
+        Create engine from the list of objects.
+        Arguments:
+            objects (list): list of Object instances.
+        Returns:
+            engine (Engine): engine with copied state of the objects.
+        """
+        return cls(
+            positions=[(obj.pos_x(), obj.pos_y()) for obj in objects],
+            velocities=[
+                (obj.velocity_x(), obj.velocity_y()) for obj in objects
+            ],
+            masses=[obj.mass() for obj in objects],
+            radii=[
+                np.nan if obj.radius() is None else obj.radius()
+                for obj in objects
+            ],
+        )
+
+    def version(self):
+        """
+        Get number of changes of the rows, increased when objects
+        are removed.
+        """
+        return self._version
+
+    def row(self, index):
+        """
+        Find row of the object with given index.
+        Raises:
+            KeyError: if there is no such object.
+        """
+        ids = self._ids
+        row = int(np.searchsorted(ids, index))
+        if row < len(ids) and ids[row] == index:
+            return row
+        rows = np.flatnonzero(ids == index)
+        if not len(rows):
+            raise KeyError(f"Object {index} is not in the engine")
+        return int(rows[0])
+
+    def count(self):
+        """
+        Get number of objects in the engine.
+        """
+        return len(self._masses)
+
+    def positions(self):
+        """
+        Get (N, 2) array with positions of the objects.
+        """
+        return self._positions
+
+    def velocities(self):
+        """
+        Get (N, 2) array with velocities of the objects.
+        """
+        return self._velocities
+
+    def masses(self):
+        """
+        Get (N,) array with masses of the objects.
+        """
+        return self._masses
+
+    def radii(self):
+        """
+        Get (N,) array with radii of the objects, NaN if unknown.
+        """
+        return self._radii
+
+    def ids(self):
+        """
+        Get (N,) array with indexes of the objects.
+        """
+        return self._ids
+
+    def distances_to(self, obj):
+        """
+        Calculate distances between every object and given object.
+        Arguments:
+            obj (BaseObject): object to calculate distances to.
+        Returns:
+            distances (numpy.ndarray): (N,) array with distances.
+        """
+        dx = self._positions[:, 0] - obj.pos_x()
+        dy = self._positions[:, 1] - obj.pos_y()
+        return np.sqrt(dx**2 + dy**2)
+
+    def central_accelerations(self, central_object, G, positions=None,
+                              centres=None, executor=None):
+        """
+        Calculate accelerations of all objects caused by central object.
+        Arguments:
+            central_object (CentralObject | CentralBodies): attracting
+                object or bodies.
+            G (float): gravitational constant.
+            positions (numpy.ndarray): (N, 2) array with positions to use
+                instead of current positions of the objects.
+            centres (numpy.ndarray): (K, 2) array with positions
+                of central bodies to use instead of current ones.
+            executor (SerialExecutor | ThreadExecutor): computes chunks
+                of rows. default: None, all rows at once.
+        Returns:
+            accelerations (numpy.ndarray): (N, 2) array with accelerations.
+        """
+        if positions is None:
+            positions = self._positions
+        return central_field(central_object, positions, G, centres, executor)
+
+    def accelerations(self, central_object, G, gravity=None,
+                      positions=None, centres=None, executor=None):
+        """
+        Calculate total accelerations of all objects.
+        Arguments:
+            central_object (CentralObject | CentralBodies): attracting
+                object or bodies.
+            G (float): gravitational constant.
+            gravity (DirectGravity | BarnesHutGravity): solver of mutual
+                gravity of the objects. default: None, objects attract
+                only central object.
+            positions (numpy.ndarray): (N, 2) array with positions to use
+                instead of current positions of the objects.
+            centres (numpy.ndarray): (K, 2) array with positions
+                of central bodies to use instead of current ones.
+            executor (SerialExecutor | ThreadExecutor | ProcessExecutor):
+                evaluates the kernels. default: None
+        Returns:
+            accelerations (numpy.ndarray): (N, 2) array with accelerations.
+        """
+        if positions is None:
+            positions = self._positions
+        return self._forces(
+            positions, central_object, G, gravity, centres, executor
+        )
+
+    def _forces(self, positions, central_object, G, gravity, centres,
+                executor, targets=None):
+        """
+        Evaluate forces with given executor, or in the calling thread
+        without one. Rows after the objects are test particles.
+        Forces of selected targets are split into chunks by
+        the executor in the calling process.
+        """
+        arguments = (
+            positions, self._masses, self.count(), central_object, G,
+            gravity, centres,
+        )
+        if targets is not None:
+            return forces(*arguments, executor, targets=targets)
+        if executor is None:
+            return forces(*arguments)
+        return executor.forces(*arguments)
+
+    def step(self, dt, central_object, G, gravity=None, integrator=None,
+             profiler=None, particles=None, executor=None):
+        """
+        Advance all objects by one step of the integrator.
+        Arguments:
+            dt (float): time step.
+            central_object (CentralObject | CentralBodies): attracting
+                object or bodies.
+            G (float): gravitational constant.
+            gravity (DirectGravity | BarnesHutGravity): solver of mutual
+                gravity of the objects. default: None
+            integrator (Integrator): numerical method.
+                default: semi-implicit Euler.
+            profiler (Profiler): measures evaluations of accelerations
+                as "force" phase. default: None
+            particles (ParticleBlock): test particles advanced together
+                with the objects. default: None
+            executor (SerialExecutor | ThreadExecutor): computes
+                accelerations in chunks, possibly on several threads.
+                default: None
+        Returns:
+            dt (float): length of the step that was taken, differs
+                from given dt for adaptive integrators.
+        """
+        if integrator is None:
+            integrator = SemiImplicitEuler()
+        moving = isinstance(central_object, CentralBodies) and (
+            central_object.moving()
+        )
+        if moving or (particles is not None and particles.count()):
+            return self._step_together(
+                dt, central_object, G, gravity, integrator, profiler,
+                moving, particles, executor,
+            )
+
+        def acceleration(positions, rows=None):
+            return self._forces(
+                positions, central_object, G, gravity, None, executor, rows
+            )
+
+        if profiler is not None:
+            acceleration = profiler.wrap("force", acceleration)
+        self._positions, self._velocities, dt = integrator.step(
+            self._positions, self._velocities, dt, acceleration
+        )
+        return dt
+
+    def _step_together(self, dt, central_object, G, gravity, integrator,
+                       profiler, moving, particles, executor):
+        """
+        Advance moving central bodies, the objects and test particles
+        together, as one system of the integrator, so every evaluation
+        of accelerations sees positions of the bodies and the objects
+        from the same stage of the step. Rows of the system are bodies,
+        then objects, then particles, see forces.
+        """
+        bodies = central_object.count() if moving else 0
+        count = self.count()
+        blocks = [(self._positions, self._velocities)]
+        if moving:
+            blocks.insert(
+                0, (central_object.positions(), central_object.velocities())
+            )
+        if particles is not None and particles.count():
+            blocks.append((particles.positions(), particles.velocities()))
+        blocks = [block for block in blocks if len(block[0])] or blocks
+        if len(blocks) == 1:
+            positions, velocities = blocks[0]
+        else:
+            positions = np.concatenate([block[0] for block in blocks])
+            velocities = np.concatenate([block[1] for block in blocks])
+
+        def acceleration(positions, rows=None):
+            centres = positions[:bodies] if moving else None
+            if rows is not None:
+                own = rows >= bodies
+                result = np.empty((len(rows), 2))
+                result[own] = self._forces(
+                    positions[bodies:], central_object, G, gravity, centres,
+                    executor, rows[own] - bodies,
+                )
+                if moving and not own.all():
+                    result[~own] = central_object.mutual_accelerations(
+                        G, centres
+                    )[rows[~own]]
+                return result
+            result = self._forces(
+                positions[bodies:], central_object, G, gravity, centres,
+                executor,
+            )
+            if moving:
+                result = np.concatenate(
+                    (central_object.mutual_accelerations(G, centres), result)
+                )
+            return result
+
+        if profiler is not None:
+            acceleration = profiler.wrap("force", acceleration)
+        positions, velocities, dt = integrator.step(
+            positions, velocities, dt, acceleration
+        )
+        if moving:
+            central_object.set_state(
+                positions[:bodies], velocities[:bodies]
+            )
+        self._positions = positions[bodies:bodies + count]
+        self._velocities = velocities[bodies:bodies + count]
+        if particles is not None and particles.count():
+            particles.set_state(
+                positions[bodies + count:], velocities[bodies + count:]
+            )
+        return dt
+
+    def kinetic_energy(self):
+        """
+        Calculate total kinetic energy of the objects.
+        """
+        return 0.5 * float(np.sum(self._masses * np.sum(
+            self._velocities**2, axis=1
+        )))
+
+    def angular_momentum(self, origin=(0.0, 0.0)):
+        """
+        Calculate total angular momentum of the objects about
+        given point.
+        """
+        x = self._positions[:, 0] - origin[0]
+        y = self._positions[:, 1] - origin[1]
+        return float(np.sum(self._masses * (
+            x * self._velocities[:, 1] - y * self._velocities[:, 0]
+        )))
+
+    def potential_energy(self, central_object, G, gravity=None):
+        """
+        Calculate total potential energy of the objects.
+        Arguments:
+            central_object (CentralObject | CentralBodies): attracting
+                object or bodies.
+            G (float): gravitational constant.
+            gravity (DirectGravity | BarnesHutGravity): solver of mutual
+                gravity, if given potential energy of every pair
+                of objects is included, computed by the solver.
+        Returns:
+            energy (float): potential energy.
+        """
+        energy = float(np.sum(
+            self._masses * central_object.potential(self._positions, G)
+        ))
+        if gravity is not None:
+            energy += gravity.potential_energy(
+                self._positions, self._masses, G
+            )
+        return energy
+
+    def remove(self, mask):
+        """
+        Remove objects selected by boolean mask.
+        Arguments:
+            mask (numpy.ndarray): (N,) boolean array, True for objects
+                to remove.
+        """
+        keep = ~np.asarray(mask, dtype=bool)
+        self._positions = self._positions[keep]
+        self._velocities = self._velocities[keep]
+        self._masses = self._masses[keep]
+        self._radii = self._radii[keep]
+        self._ids = self._ids[keep]
+        self._version += 1
+
+    def merge(self, first, second, absorbed=None):
+        """
+        Merge groups of colliding objects.
+        Pairs are joined into connected components, so chains and
+        clusters of any size are merged at once. Every group becomes
+        its object with the lowest row, with summed mass, momentum
+        conserving velocity, centre of mass position and, if all
+        radii are known, summed volume. Groups with an object hitting
+        a central body are removed whole and their mass and momentum
+        are given to the body. Arrays are compacted once.
+        Arguments:
+            first (numpy.ndarray): rows of first objects of the pairs.
+            second (numpy.ndarray): rows of second objects of the pairs.
+            absorbed (numpy.ndarray): (N,) array with number of central
+                body hit by every object, -1 if none. default: None
+        Returns:
+            merged (numpy.ndarray): indexes of objects which received
+                mass of other objects.
+            absorbed_masses (numpy.ndarray): (K,) array with mass
+                of removed groups given to every central body.
+            absorbed_momenta (numpy.ndarray): (K, 2) array with their
+                momentum.
+        """
+        count = self.count()
+        rows = np.arange(count)
+        labels = connected_components(count, first, second)
+        bodies = 0
+        absorbed_rows = np.zeros(count, dtype=bool)
+        targets = np.empty(0, dtype=np.int64)
+        if absorbed is not None and count:
+            absorbed = np.asarray(absorbed, dtype=np.int64)
+            bodies = int(absorbed.max()) + 1
+            hitting = absorbed >= 0
+            group_target = np.full(count, bodies, dtype=np.int64)
+            np.minimum.at(group_target, labels[hitting], absorbed[hitting])
+            targets = group_target[labels]
+            absorbed_rows = targets < bodies
+            targets = targets[absorbed_rows]
+        absorbed_masses = np.bincount(
+            targets, self._masses[absorbed_rows], bodies
+        )
+        absorbed_momenta = np.column_stack(
+            [
+                np.bincount(
+                    targets,
+                    self._masses[absorbed_rows]
+                    * self._velocities[absorbed_rows, axis],
+                    bodies,
+                )
+                for axis in range(2)
+            ]
+        ).reshape(-1, 2)
+
+        sizes = np.bincount(labels, minlength=count)
+        roots = np.flatnonzero(
+            (labels == rows) & (sizes > 1) & ~absorbed_rows
+        )
+        if len(roots):
+            masses = self._masses
+            total = np.bincount(labels, masses, count)[roots]
+            for array in (self._positions, self._velocities):
+                for axis in range(2):
+                    array[roots, axis] = np.bincount(
+                        labels, masses * array[:, axis], count
+                    )[roots] / total
+            unknown = np.bincount(labels, np.isnan(self._radii), count)
+            volume = np.bincount(
+                labels, np.nan_to_num(self._radii) ** 3, count
+            )
+            self._radii[roots] = np.where(
+                unknown[roots] > 0, np.nan, np.cbrt(volume[roots])
+            )
+            self._masses[roots] = total
+        merged = self._ids[roots].copy()
+        self.remove(absorbed_rows | (labels != rows))
+        return merged, absorbed_masses, absorbed_momenta
+
+
+def central_field(central_object, positions, G, centres=None,
+                  executor=None):
+    """
+    Calculate accelerations caused by central object at given positions.
+    Arguments:
+        central_object (CentralObject | CentralBodies): attracting
+            object or bodies.
+        positions (numpy.ndarray): (N, 2) array with positions.
+        G (float): gravitational constant.
+        centres (numpy.ndarray): (K, 2) array with positions of central
+            bodies to use instead of current ones.
+        executor (SerialExecutor | ThreadExecutor): computes chunks
+            of rows. default: None, all rows at once.
+    Returns:
+        accelerations (numpy.ndarray): (N, 2) array.
+    """
+    arguments = (G,) if centres is None else (G, centres)
+    if executor is None:
+        return central_object.accelerations(positions, *arguments)
+    # Caches of central bodies, like the field grid, are built
+    # here once instead of in every thread.
+    central_object.accelerations(positions[:0], *arguments)
+    return executor.rows(
+        len(positions),
+        lambda start, stop: central_object.accelerations(
+            positions[start:stop], *arguments
+        ),
+    )
+
+
+def forces(positions, masses, count, central_object, G, gravity=None,
+           centres=None, executor=None, rows=None, targets=None):
+    """
+    Calculate accelerations of objects and test particles.
+    Everything is attracted by central object. With mutual gravity,
+    objects attract each other and test particles, which attract
+    nothing. Every row depends only on positions, never on other
+    rows computed with it, so any split of rows gives the same result.
+    Arguments:
+        positions (numpy.ndarray): (N, 2) array with positions
+            of count objects followed by test particles.
+        masses (numpy.ndarray): (count,) array with masses of objects.
+        count (int): number of objects.
+        central_object (CentralObject | CentralBodies): attracting
+            object or bodies.
+        G (float): gravitational constant.
+        gravity (DirectGravity | BarnesHutGravity): solver of mutual
+            gravity of the objects. default: None
+        centres (numpy.ndarray): (K, 2) array with positions of central
+            bodies to use instead of current ones.
+        executor (SerialExecutor | ThreadExecutor): computes chunks
+            of rows of every kernel. default: None
+        rows (tuple): start and stop of rows to calculate.
+            default: all rows.
+        targets (numpy.ndarray): indexes of rows to calculate, used
+            instead of rows. default: None
+    Returns:
+        accelerations (numpy.ndarray): (stop - start, 2) array,
+            or (len(targets), 2) array.
+    """
+    if targets is not None:
+        return _target_forces(
+            positions, masses, count, central_object, G, gravity, centres,
+            executor, np.asarray(targets, dtype=np.int64),
+        )
+    start, stop = rows if rows is not None else (0, len(positions))
+    result = central_field(
+        central_object, positions[start:stop], G, centres, executor
+    )
+    if gravity is None or not count:
+        return result
+    objects = positions[:count]
+    if count > 1 and start < count:
+        targets = None
+        if rows is not None:
+            targets = np.arange(start, min(stop, count))
+        result[:min(stop, count) - start] += gravity.accelerations(
+            objects, masses, G, targets, executor=executor
+        )
+    if stop > count:
+        first = max(start, count)
+        result[first - start:] += gravity.field(
+            positions[first:stop], objects, masses, G, executor
+        )
+    return result
+
+
+def _target_forces(positions, masses, count, central_object, G, gravity,
+                   centres, executor, targets):
+    """
+    Calculate accelerations of given rows, see forces. Objects
+    among them are attracted by all objects, test particles
+    by the objects.
+    """
+    result = central_field(
+        central_object, positions[targets], G, centres, executor
+    )
+    if gravity is None or not count:
+        return result
+    objects = positions[:count]
+    own = targets < count
+    if count > 1 and own.any():
+        result[own] += gravity.accelerations(
+            objects, masses, G, targets[own], executor=executor
+        )
+    if not own.all():
+        result[~own] += gravity.field(
+            positions[targets[~own]], objects, masses, G, executor
+        )
+    return result
+
+
+def connected_components(count, first, second):
+    """
+    Find connected components of a graph given by list of edges.
+    Nodes of the edges are joined with vectorized union-find:
+    every root is hooked to the lowest root it is connected to,
+    then paths are shortened by pointer jumping, until both ends
+    of every edge have the same root.
+    Arguments:
+        count (int): number of nodes.
+        first (numpy.ndarray): first nodes of the edges.
+        second (numpy.ndarray): second nodes of the edges.
+    Returns:
+        labels (numpy.ndarray): (count,) array with the lowest node
+            of the component of every node.
+    """
+    labels = np.arange(count)
+    first = np.asarray(first, dtype=np.int64)
+    second = np.asarray(second, dtype=np.int64)
+    if not len(first):
+        return labels
+    nodes, edges = np.unique(
+        np.concatenate((first, second)), return_inverse=True
+    )
+    first, second = edges[:len(first)], edges[len(first):]
+    parent = np.arange(len(nodes))
+    while True:
+        root_first = parent[first]
+        root_second = parent[second]
+        different = root_first != root_second
+        if not different.any():
+            break
+        low = np.minimum(root_first, root_second)[different]
+        high = np.maximum(root_first, root_second)[different]
+        np.minimum.at(parent, high, low)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    labels[nodes] = nodes[parent]
+    return labels
@@ -0,0 +1,118 @@
+from errors import MalformedDataError
+import json
+import sys
+import time
+
+
+class EventLog:
+    """
+    Class collecting structured events of the simulation.
+    Every event is written as a single JSON line with its level,
+    name and fields. Events above chosen level are skipped before
+    they are formatted, so disabled log costs one comparison.
+    Attributes:
+        level (str): "off", "info", "debug" or "trace". default: "off"
+        path (str): file the events are appended to,
+            None means standard error.
+        rate_limit (int): maximal number of events written per second,
+            None means no limit. Dropped events are counted and
+            reported with a single "suppressed" event.
+    """
+
+    LEVELS = {"off": 0, "info": 1, "debug": 2, "trace": 3}
+
+    def __init__(self, level="off", path=None, rate_limit=None):
+        """
+        Initialize the log with given level, destination and rate limit.
+        Raises:
+            MalformedDataError: if level is unknown.
+        """
+        if level not in self.LEVELS:
+            raise MalformedDataError(f"Unknown log level '{level}'.")
+        self._level = level
+        self._threshold = self.LEVELS[level]
+        self._path = path
+        self._rate_limit = rate_limit
+        self._file = None
+        self._window = None
+        self._written = 0
+        self._suppressed = 0
+
+    def level(self):
+        """
+        Get level of the log.
+        """
+        return self._level
+
+    def enabled(self, level):
+        """
+        Check if events of given level are written.
+        """
+        return self.LEVELS[level] <= self._threshold
+
+    def log(self, level, event, **fields):
+        """
+        Write event with given level, name and fields.
+        Arguments:
+            level (str): "info", "debug" or "trace".
+            event (str): name of the event.
+            fields: values describing the event, must be JSON serializable.
+        """
+        if self.LEVELS[level] > self._threshold:
+            return
+        if self._rate_limit is not None:
+            now = time.monotonic()
+            if self._window is None or now - self._window >= 1.0:
+                self._window = now
+                self._written = 0
+                if self._suppressed:
+                    suppressed = self._suppressed
+                    self._suppressed = 0
+                    self._write("info", "suppressed", {"count": suppressed})
+            if self._written >= self._rate_limit:
+                self._suppressed += 1
+                return
+            self._written += 1
+        self._write(level, event, fields)
+
+    def _write(self, level, event, fields):
+        """
+        Format event as JSON line and write it.
+        """
+        if self._file is None:
+            if self._path is None:
+                self._file = sys.stderr
+            else:
+                self._file = open(self._path, "a")
+        record = {"level": level, "event": event}
+        record.update(fields)
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        """
+        Report suppressed events and close the log file.
+        """
+        if self._suppressed:
+            self._write("info", "suppressed", {"count": self._suppressed})
+            self._suppressed = 0
+        if self._file is not None and self._path is not None:
+            self._file.close()
+        self._file = None
+
+
+def create_event_log(config):
+    """
+    Create event log described by the config dictionary.
+    Uses fields:
+        level (str): "off", "info", "debug" or "trace". default: "off"
+        path (str): file for the events. default: standard error.
+        rate_limit (int): maximal number of events per second.
+            default: None
+    Returns:
+        log (EventLog): new log.
+    """
+    return EventLog(
+        level=config.get("level", "off"),
+        path=config.get("path"),
+        rate_limit=config.get("rate_limit"),
+    )
@@ -0,0 +1,448 @@
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+from classes.engine import forces
+from classes.spatial_hash import colliding_pairs
+from errors import MalformedDataError
+import multiprocessing
+import numpy as np
+import pickle
+import threading
+import time
+import weakref
+
+
+class SerialExecutor:
+    """
+    Class computing rows of force arrays chunk by chunk
+    in the calling thread. Used as the single-threaded path
+    and as reference for ThreadExecutor.
+    Attributes:
+        chunk_size (int): number of rows computed at once.
+    """
+
+    def __init__(self, chunk_size=65536):
+        """
+        Initialize executor with given chunk size.
+        Raises:
+            MalformedDataError: if chunk size is not positive.
+        """
+        if chunk_size < 1:
+            raise MalformedDataError("Chunk size must be positive.")
+        self._chunk_size = int(chunk_size)
+
+    def workers(self):
+        """
+        Get number of threads computing the chunks.
+        """
+        return 1
+
+    def chunk_size(self):
+        """
+        Get number of rows computed at once.
+        """
+        return self._chunk_size
+
+    def config(self):
+        """
+        Get configuration fields describing the executor.
+        """
+        return {
+            "parallel": {
+                "workers": self.workers(),
+                "chunk_size": self._chunk_size,
+            }
+        }
+
+    def chunks(self, count, chunk_size=None):
+        """
+        Split rows [0, count) into (start, stop) chunks.
+        Chunks depend only on count and chunk size, never on number
+        of workers, so results do not depend on it either.
+        """
+        size = chunk_size or self._chunk_size
+        return [
+            (start, min(start + size, count))
+            for start in range(0, count, size)
+        ]
+
+    def rows(self, count, function, chunk_size=None):
+        """
+        Compute (count, 2) array chunk by chunk.
+        Arguments:
+            count (int): number of rows.
+            function (callable): returns (stop - start, 2) array with
+                rows [start, stop) for given start and stop. Every row
+                must depend only on its own inputs.
+            chunk_size (int): rows of a chunk, overrides chunk_size
+                of the executor, e.g. to limit pairwise arrays.
+        Returns:
+            result (numpy.ndarray): (count, 2) array.
+        """
+        result = np.empty((count, 2))
+        for start, stop in self.chunks(count, chunk_size):
+            result[start:stop] = function(start, stop)
+        return result
+
+    def forces(self, positions, masses, count, central_object, G,
+               gravity=None, centres=None):
+        """
+        Calculate accelerations of objects and test particles,
+        see engine.forces, with every kernel split into chunks.
+        """
+        return forces(
+            positions, masses, count, central_object, G, gravity, centres,
+            self,
+        )
+
+    def colliding_pairs(self, positions, radii):
+        """
+        Find every pair of objects closer than sum of their radii,
+        see spatial_hash.colliding_pairs.
+        """
+        return colliding_pairs(positions, radii)
+
+    def close(self):
+        """
+        Release threads or processes of the executor.
+        """
+        pass
+
+
+class ThreadExecutor(SerialExecutor):
+    """
+    Class computing chunks of rows of force arrays on a thread pool.
+    Large NumPy operations release the GIL, so chunks of one
+    evaluation run on several cores at once. Every chunk writes
+    its own rows of the result, so results are the same
+    as with SerialExecutor for any number of workers.
+    Attributes:
+        workers (int): number of threads.
+        chunk_size (int): number of rows computed at once.
+    """
+
+    def __init__(self, workers, chunk_size=65536):
+        """
+        Initialize executor with given number of threads. Threads
+        are started with the first evaluation.
+        Raises:
+            MalformedDataError: if number of workers or chunk size
+                is not positive.
+        """
+        super().__init__(chunk_size)
+        if workers < 1:
+            raise MalformedDataError("Number of workers must be positive.")
+        self._workers = int(workers)
+        self._pool = None
+
+    def workers(self):
+        return self._workers
+
+    def rows(self, count, function, chunk_size=None):
+        chunks = self.chunks(count, chunk_size)
+        if len(chunks) < 2:
+            return super().rows(count, function, chunk_size)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self._workers)
+        result = np.empty((count, 2))
+
+        def compute(chunk):
+            start, stop = chunk
+            result[start:stop] = function(start, stop)
+
+        for _ in self._pool.map(compute, chunks):
+            pass
+        return result
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class ProcessExecutor(SerialExecutor):
+    """
+    Class splitting objects of the simulation across worker processes.
+    Positions, masses, radii and results are kept in shared memory,
+    so workers read the state of the whole system without copying it.
+    Every worker owns a contiguous partition of rows, evaluates forces
+    or collision candidates for it and sends back its reply, which
+    is read before all processes meet at a barrier, so large lists
+    of candidates cannot block a worker in a full pipe. Central bodies
+    and gravity solver are sent to workers only when they change. Every row
+    is computed as in the calling process, so results are the same
+    as single-process ones.
+    Attributes:
+        workers (int): number of processes.
+        chunk_size (int): number of rows computed at once by a worker.
+        timeout (float): seconds to wait for replies of the workers.
+    """
+
+    def __init__(self, workers, chunk_size=65536, timeout=600.0):
+        """
+        Initialize executor with given number of processes. Processes
+        and shared memory are created with the first evaluation.
+        Raises:
+            MalformedDataError: if number of workers or chunk size
+                is not positive.
+        """
+        super().__init__(chunk_size)
+        if workers < 1:
+            raise MalformedDataError("Number of workers must be positive.")
+        self._workers = int(workers)
+        self._timeout = timeout
+        self._capacity = 0
+        self._memory = {}
+        self._arrays = {}
+        self._processes = []
+        self._connections = []
+        self._barrier = None
+        self._sent = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+
+    def workers(self):
+        return self._workers
+
+    def config(self):
+        config = super().config()
+        config["parallel"]["backend"] = "process"
+        return config
+
+    def partitions(self, count):
+        """
+        Split rows [0, count) into one (start, stop) range per worker.
+        """
+        bounds = [count * worker // self._workers
+                  for worker in range(self._workers + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _start(self, capacity):
+        """
+        Create shared arrays for given number of rows and start
+        workers attached to them. Running workers are stopped first.
+        """
+        self.close()
+        capacity = max(int(capacity), 1)
+        shapes = {
+            "positions": (capacity, 2),
+            "masses": (capacity,),
+            "radii": (capacity,),
+            "result": (capacity, 2),
+        }
+        for name, shape in shapes.items():
+            memory = shared_memory.SharedMemory(
+                create=True, size=8 * int(np.prod(shape))
+            )
+            self._memory[name] = memory
+            self._arrays[name] = np.ndarray(
+                shape, dtype=np.float64, buffer=memory.buf
+            )
+        names = {name: memory.name for name, memory in self._memory.items()}
+        context = multiprocessing.get_context()
+        self._barrier = context.Barrier(self._workers + 1)
+        for worker in range(self._workers):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_work,
+                args=(names, shapes, self._barrier, child, self._chunk_size),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._processes.append(process)
+            self._connections.append(parent)
+        self._capacity = capacity
+        self._sent = None
+        self._finalizer = weakref.finalize(
+            self, _release, self._processes, self._connections,
+            list(self._memory.values()),
+        )
+
+    def _run(self, command, rows, parameters=None):
+        """
+        Send command to every worker with its partition of rows,
+        read their replies and wait for all of them at the barrier.
+        Returns:
+            replies (list): value sent back by every worker.
+        Raises:
+            RuntimeError: if a worker failed or did not answer in time.
+        """
+        payload = None
+        if parameters is not None:
+            payload = pickle.dumps(parameters)
+            if payload == self._sent:
+                payload = None
+            else:
+                self._sent = payload
+        for connection, partition in zip(
+            self._connections, self.partitions(rows)
+        ):
+            connection.send((command, rows, partition, payload))
+        deadline = time.monotonic() + self._timeout
+        replies = []
+        try:
+            for connection in self._connections:
+                if not connection.poll(max(deadline - time.monotonic(), 0)):
+                    raise threading.BrokenBarrierError
+                replies.append(connection.recv())
+            self._barrier.wait(max(deadline - time.monotonic(), 0))
+        except threading.BrokenBarrierError:
+            self.close()
+            raise RuntimeError("Worker process did not finish in time")
+        except (EOFError, OSError) as error:
+            self.close()
+            raise RuntimeError("Worker process failed") from error
+        for reply in replies:
+            if isinstance(reply, Exception):
+                self._sent = None
+                raise RuntimeError("Worker process failed") from reply
+        return replies
+
+    def forces(self, positions, masses, count, central_object, G,
+               gravity=None, centres=None):
+        """
+        Calculate accelerations of objects and test particles,
+        see engine.forces, with rows split between the workers.
+        """
+        with self._lock:
+            rows = len(positions)
+            if rows > self._capacity or not self._processes:
+                self._start(rows)
+            self._arrays["positions"][:rows] = positions
+            self._arrays["masses"][:count] = masses
+            self._run(
+                "forces", rows, (count, central_object, G, gravity, centres)
+            )
+            return self._arrays["result"][:rows].copy()
+
+    def colliding_pairs(self, positions, radii):
+        """
+        Find every pair of objects closer than sum of their radii,
+        collecting candidates found by every worker for pairs whose
+        first object is in its partition.
+        """
+        with self._lock:
+            rows = len(positions)
+            if rows < 2:
+                return []
+            if rows > self._capacity or not self._processes:
+                self._start(rows)
+            self._arrays["positions"][:rows] = positions
+            self._arrays["radii"][:rows] = radii
+            replies = self._run("collide", rows)
+        return sorted(pair for reply in replies for pair in reply)
+
+    def close(self):
+        """
+        Stop the workers and free shared memory. It also happens
+        when the executor is garbage collected.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._processes = []
+        self._connections = []
+        self._memory = {}
+        self._arrays = {}
+        self._capacity = 0
+
+
+def _release(processes, connections, memory):
+    """
+    Stop worker processes and free shared memory of ProcessExecutor.
+    """
+    for connection in connections:
+        try:
+            connection.send(None)
+        except OSError:
+            pass
+    for process in processes:
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
+    for connection in connections:
+        connection.close()
+    for block in memory:
+        block.close()
+        block.unlink()
+
+
+def _work(names, shapes, barrier, connection, chunk_size):
+    """
+    Main loop of a worker process of ProcessExecutor.
+    Every command gives a partition of rows and, if they changed,
+    pickled parameters of the evaluation. Results are written
+    to shared memory or sent back, then the worker waits at the barrier
+    until the parent has read all replies. Errors are sent back
+    instead of results.
+    """
+    memory = {
+        name: shared_memory.SharedMemory(name=memory_name)
+        for name, memory_name in names.items()
+    }
+    arrays = {
+        name: np.ndarray(shapes[name], dtype=np.float64, buffer=block.buf)
+        for name, block in memory.items()
+    }
+    executor = SerialExecutor(chunk_size)
+    parameters = None
+    try:
+        while True:
+            command = connection.recv()
+            if command is None:
+                break
+            kind, rows, (start, stop), payload = command
+            if payload is not None:
+                parameters = pickle.loads(payload)
+            reply = None
+            try:
+                if kind == "forces":
+                    count, central_object, G, gravity, centres = parameters
+                    arrays["result"][start:stop] = forces(
+                        arrays["positions"][:rows],
+                        arrays["masses"][:count], count, central_object,
+                        G, gravity, centres, executor, (start, stop),
+                    )
+                else:
+                    reply = colliding_pairs(
+                        arrays["positions"][:rows], arrays["radii"][:rows],
+                        (start, stop),
+                    )
+            except Exception as error:
+                reply = error
+            connection.send(reply)
+            barrier.wait()
+    except EOFError:
+        pass
+    finally:
+        arrays = None
+        for block in memory.values():
+            block.close()
+
+
+def create_executor(config):
+    """
+    Create executor described by the config dictionary.
+    Uses fields:
+        workers (int): number of threads, 1 computes forces
+            in the calling thread. default: 1
+        chunk_size (int): number of rows computed at once.
+            default: 65536
+        backend (str): "thread" or "process", see ProcessExecutor.
+            default: "thread"
+    Returns:
+        executor (SerialExecutor | ThreadExecutor | ProcessExecutor):
+            new executor.
+    Raises:
+        MalformedDataError: if backend is unknown.
+    """
+    workers = config.get("workers", 1)
+    chunk_size = config.get("chunk_size", 65536)
+    backend = config.get("backend", "thread")
+    if backend == "process":
+        return ProcessExecutor(workers, chunk_size)
+    if backend != "thread":
+        raise MalformedDataError(f"Unknown parallel backend '{backend}'.")
+    if workers == 1:
+        return SerialExecutor(chunk_size)
+    return ThreadExecutor(workers, chunk_size)
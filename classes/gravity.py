@@ -0,0 +1,258 @@
+from classes.quad_tree import QuadTree
+from classes.executor import SerialExecutor
+from errors import MalformedDataError
+import numpy as np
+
+
+class DirectGravity:
+    """
+    Class calculating mutual gravity of the objects by direct summation.
+    Every pair of objects is taken into account, so the cost is O(N^2).
+    Exact, used for small systems and for validating the tree solver.
+    Attributes:
+        softening (float): softening length added to distances.
+        chunk_size (int): number of objects processed at once,
+            limits memory used by pairwise arrays.
+    """
+
+    def __init__(self, softening=0.0, chunk_size=1024):
+        """
+        Initialize the solver with given softening and chunk size.
+        """
+        self._softening = softening
+        self._chunk_size = chunk_size
+
+    def softening(self):
+        """
+        Get softening length.
+        """
+        return self._softening
+
+    def config(self):
+        """
+        Get configuration fields describing the solver.
+        """
+        return {"mutual_gravity": "direct", "softening": self._softening}
+
+    def accelerations(self, positions, masses, G, targets=None,
+                      executor=None):
+        """
+        Calculate accelerations of the objects caused by all other objects.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            masses (numpy.ndarray): (N,) array with masses.
+            G (float): gravitational constant.
+            targets (numpy.ndarray): indexes of objects to calculate
+                accelerations for. default: all objects.
+            executor (SerialExecutor | ThreadExecutor): computes chunks
+                of chunk_size targets. default: serial.
+        Returns:
+            accelerations (numpy.ndarray): (len(targets), 2) array.
+        """
+        if targets is None:
+            targets = np.arange(len(masses))
+        targets = np.asarray(targets, dtype=np.int64)
+        eps2 = self._softening**2
+        x = positions[:, 0]
+        y = positions[:, 1]
+
+        def chunk(start, stop):
+            rows = targets[start:stop]
+            dx = x[np.newaxis, :] - x[rows, np.newaxis]
+            dy = y[np.newaxis, :] - y[rows, np.newaxis]
+            d2 = dx**2 + dy**2 + eps2
+            with np.errstate(invalid="ignore", divide="ignore"):
+                factor = np.where(d2 > 0, masses / (d2 * np.sqrt(d2)), 0.0)
+            return G * np.column_stack(
+                ((dx * factor).sum(axis=1), (dy * factor).sum(axis=1))
+            )
+
+        if executor is None:
+            executor = SerialExecutor()
+        return executor.rows(len(targets), chunk, self._chunk_size)
+
+    def field(self, points, positions, masses, G, executor=None):
+        """
+        Calculate accelerations at given points caused by the objects,
+        used for test particles which feel gravity but exert none.
+        Points are processed in chunks holding about chunk_size^2
+        pairs, so many points and few objects take few chunks.
+        Arguments:
+            points (numpy.ndarray): (M, 2) array with positions.
+            positions (numpy.ndarray): (N, 2) array with positions
+                of the objects.
+            masses (numpy.ndarray): (N,) array with masses.
+            G (float): gravitational constant.
+            executor (SerialExecutor | ThreadExecutor): computes
+                the chunks. default: serial.
+        Returns:
+            accelerations (numpy.ndarray): (M, 2) array.
+        """
+        eps2 = self._softening**2
+
+        def chunk(start, stop):
+            dx = positions[:, 0] - points[start:stop, 0, np.newaxis]
+            dy = positions[:, 1] - points[start:stop, 1, np.newaxis]
+            d2 = dx**2 + dy**2 + eps2
+            with np.errstate(invalid="ignore", divide="ignore"):
+                factor = np.where(d2 > 0, masses / (d2 * np.sqrt(d2)), 0.0)
+            return G * np.column_stack(
+                ((dx * factor).sum(axis=1), (dy * factor).sum(axis=1))
+            )
+
+        if executor is None:
+            executor = SerialExecutor()
+        size = max(self._chunk_size**2 // max(len(masses), 1), 1)
+        return executor.rows(len(points), chunk, size)
+
+    def potential_energy(self, positions, masses, G):
+        """
+        Calculate potential energy of every pair of the objects,
+        summed over chunks of chunk_size objects.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            masses (numpy.ndarray): (N,) array with masses.
+            G (float): gravitational constant.
+        Returns:
+            energy (float): potential energy of the pairs.
+        """
+        eps2 = self._softening**2
+        x = positions[:, 0]
+        y = positions[:, 1]
+        energy = 0.0
+        for start in range(0, len(masses), self._chunk_size):
+            stop = min(start + self._chunk_size, len(masses))
+            dx = x[np.newaxis, :] - x[start:stop, np.newaxis]
+            dy = y[np.newaxis, :] - y[start:stop, np.newaxis]
+            d2 = dx**2 + dy**2 + eps2
+            d2[np.arange(stop - start), np.arange(start, stop)] = 0.0
+            with np.errstate(invalid="ignore", divide="ignore"):
+                inverse = np.where(d2 > 0, 1.0 / np.sqrt(d2), 0.0)
+            energy += float(masses[start:stop] @ (inverse @ masses))
+        return -0.5 * G * energy
+
+
+class BarnesHutGravity:
+    """
+    Class calculating mutual gravity of the objects with Barnes-Hut tree.
+    Distant groups of objects are replaced by their center of mass,
+    so the cost is O(N log N).
+    Attributes:
+        opening_angle (float): Barnes-Hut opening angle (theta).
+        softening (float): softening length added to distances.
+    """
+
+    def __init__(self, opening_angle=0.5, softening=0.0):
+        """
+        Initialize the solver with given opening angle and softening.
+        """
+        self._opening_angle = opening_angle
+        self._softening = softening
+
+    def opening_angle(self):
+        """
+        Get Barnes-Hut opening angle.
+        """
+        return self._opening_angle
+
+    def softening(self):
+        """
+        Get softening length.
+        """
+        return self._softening
+
+    def config(self):
+        """
+        Get configuration fields describing the solver.
+        """
+        return {
+            "mutual_gravity": "barnes_hut",
+            "opening_angle": self._opening_angle,
+            "softening": self._softening,
+        }
+
+    def accelerations(self, positions, masses, G, targets=None,
+                      executor=None):
+        """
+        Calculate accelerations of the objects caused by all other objects.
+        The tree is rebuilt on every call.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            masses (numpy.ndarray): (N,) array with masses.
+            G (float): gravitational constant.
+            targets (numpy.ndarray): indexes of objects to calculate
+                accelerations for. default: all objects.
+            executor (SerialExecutor | ThreadExecutor): walks batches
+                of the tree. default: serial.
+        Returns:
+            accelerations (numpy.ndarray): (len(targets), 2) array.
+        """
+        tree = QuadTree(positions, masses)
+        return tree.accelerations(
+            G, self._opening_angle, self._softening, targets, executor
+        )
+
+    def field(self, points, positions, masses, G, executor=None):
+        """
+        Calculate accelerations at given points caused by the objects,
+        used for test particles which feel gravity but exert none.
+        Arguments:
+            points (numpy.ndarray): (M, 2) array with positions.
+            positions (numpy.ndarray): (N, 2) array with positions
+                of the objects.
+            masses (numpy.ndarray): (N,) array with masses.
+            G (float): gravitational constant.
+            executor (SerialExecutor | ThreadExecutor): walks batches
+                of the tree. default: serial.
+        Returns:
+            accelerations (numpy.ndarray): (M, 2) array.
+        """
+        tree = QuadTree(positions, masses)
+        return tree.field(
+            points, G, self._opening_angle, self._softening, executor
+        )
+
+    def potential_energy(self, positions, masses, G):
+        """
+        Calculate potential energy of every pair of the objects
+        from monopoles of the tree nodes, see QuadTree.potentials.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            masses (numpy.ndarray): (N,) array with masses.
+            G (float): gravitational constant.
+        Returns:
+            energy (float): potential energy of the pairs.
+        """
+        tree = QuadTree(positions, masses)
+        potentials = tree.potentials(
+            G, self._opening_angle, self._softening
+        )
+        return 0.5 * float(np.sum(masses * potentials))
+
+
+def create_gravity(config):
+    """
+    Create mutual gravity solver described by the config dictionary.
+    Uses fields:
+        mutual_gravity (str): "direct", "barnes_hut" or "none".
+            default: "none", objects attract only central object.
+        opening_angle (float): opening angle of Barnes-Hut solver.
+            default: 0.5
+        softening (float): softening length. default: 0
+    Returns:
+        gravity (DirectGravity | BarnesHutGravity | None): solver.
+    Raises:
+        MalformedDataError: if mutual_gravity has unknown value.
+    """
+    mode = config.get("mutual_gravity") or "none"
+    softening = config.get("softening", 0.0)
+    if mode == "none":
+        return None
+    if mode == "direct":
+        return DirectGravity(softening=softening)
+    if mode == "barnes_hut":
+        return BarnesHutGravity(
+            opening_angle=config.get("opening_angle", 0.5),
+            softening=softening,
+        )
+    raise MalformedDataError(f"Unknown mutual gravity mode '{mode}'.")
@@ -0,0 +1,481 @@
+from errors import MalformedDataError
+import numpy as np
+
+
+class Integrator:
+    """
+    Base class for numerical integrators of equations of motion.
+    Integrator advances arrays of positions and velocities by one step,
+    using function returning accelerations for given positions.
+    """
+
+    name = None
+
+    def step(self, positions, velocities, dt, acceleration):
+        """
+        Advance positions and velocities by one step.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions.
+            velocities (numpy.ndarray): (N, 2) array with velocities.
+            dt (float): time step.
+            acceleration (function): returns (N, 2) array with
+                accelerations for given (N, 2) array with positions.
+                Given also index array of rows, it returns
+                accelerations of these rows only.
+        Returns:
+            positions (numpy.ndarray): new positions.
+            velocities (numpy.ndarray): new velocities.
+            dt (float): length of the step that was taken.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        Forget values cached between steps, used after objects
+        were removed or merged.
+        """
+        pass
+
+    def clamp(self, dt):
+        """
+        Make the next step no longer than dt. Only adaptive
+        integrators choose their own steps, others take given dt.
+        """
+        pass
+
+    def halve(self):
+        """
+        Halve steps chosen by the integrator itself, used when
+        the time step of the system is halved. Integrators taking
+        given dt need nothing.
+        """
+        pass
+
+    def state(self):
+        """
+        Get dictionary with values needed to continue integration.
+        """
+        return {}
+
+    def set_state(self, state):
+        """
+        Restore values returned by state().
+        """
+        pass
+
+    def config(self):
+        """
+        Get configuration fields describing the integrator.
+        """
+        return {"integrator": self.name}
+
+
+class SemiImplicitEuler(Integrator):
+    """
+    Semi-implicit (symplectic) Euler method, first order.
+    Velocity is updated first, then position with the new velocity.
+    """
+
+    name = "euler"
+
+    def step(self, positions, velocities, dt, acceleration):
+        velocities = velocities + acceleration(positions) * dt
+        positions = positions + velocities * dt
+        return positions, velocities, dt
+
+
+class VelocityVerlet(Integrator):
+    """
+    Velocity Verlet method, symplectic and second order.
+    Acceleration at the end of a step is kept for the next one,
+    so there is one evaluation of accelerations per step.
+    """
+
+    name = "verlet"
+
+    def __init__(self):
+        """
+        Initialize integrator without cached acceleration.
+        """
+        self._acceleration = None
+
+    def step(self, positions, velocities, dt, acceleration):
+        start = self._acceleration
+        if start is None or start.shape != positions.shape:
+            start = acceleration(positions)
+        positions = positions + velocities * dt + 0.5 * start * dt**2
+        end = acceleration(positions)
+        velocities = velocities + 0.5 * (start + end) * dt
+        self._acceleration = end
+        return positions, velocities, dt
+
+    def reset(self):
+        self._acceleration = None
+
+    def state(self):
+        if self._acceleration is None:
+            return {}
+        return {"acceleration": self._acceleration}
+
+    def set_state(self, state):
+        self._acceleration = state.get("acceleration")
+
+
+class Leapfrog(Integrator):
+    """
+    Leapfrog method in drift-kick-drift form, symplectic and second order.
+    """
+
+    name = "leapfrog"
+
+    def step(self, positions, velocities, dt, acceleration):
+        middle = positions + 0.5 * velocities * dt
+        velocities = velocities + acceleration(middle) * dt
+        positions = middle + 0.5 * velocities * dt
+        return positions, velocities, dt
+
+
+class RungeKutta4(Integrator):
+    """
+    Classic fourth order Runge-Kutta method.
+    """
+
+    name = "rk4"
+
+    def step(self, positions, velocities, dt, acceleration):
+        k1_x = velocities
+        k1_v = acceleration(positions)
+        k2_x = velocities + 0.5 * dt * k1_v
+        k2_v = acceleration(positions + 0.5 * dt * k1_x)
+        k3_x = velocities + 0.5 * dt * k2_v
+        k3_v = acceleration(positions + 0.5 * dt * k2_x)
+        k4_x = velocities + dt * k3_v
+        k4_v = acceleration(positions + dt * k3_x)
+        positions = positions + dt / 6 * (k1_x + 2 * k2_x + 2 * k3_x + k4_x)
+        velocities = velocities + dt / 6 * (
+            k1_v + 2 * k2_v + 2 * k3_v + k4_v
+        )
+        return positions, velocities, dt
+
+
+class RungeKutta45(Integrator):
+    """
+    Adaptive Dormand-Prince 5(4) Runge-Kutta method.
+    Every step is estimated with fifth and embedded fourth order
+    formulas, their difference controls length of the next step.
+    Steps with too large error are repeated with shorter time step.
+    Steps with infinite or undefined error, e.g. after a close
+    encounter, are repeated with the shortest allowed factor.
+    Attributes:
+        tolerance (float): allowed relative error of a single step.
+        absolute_tolerance (float): allowed absolute error of a step.
+        max_dt (float): upper limit of time step, None if unlimited.
+    """
+
+    name = "rk45"
+    MAX_REJECTIONS = 50
+
+    A = (
+        (),
+        (1 / 5,),
+        (3 / 40, 9 / 40),
+        (44 / 45, -56 / 15, 32 / 9),
+        (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+        (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+        (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+    )
+    B = (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0)
+    E = (
+        71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525,
+        -1 / 40,
+    )
+
+    def __init__(self, tolerance=1e-8, absolute_tolerance=0.0, max_dt=None):
+        """
+        Initialize integrator with given tolerances.
+        """
+        self._tolerance = tolerance
+        self._absolute_tolerance = absolute_tolerance
+        self._max_dt = max_dt
+        self._dt = None
+        self._taken = None
+
+    def tolerance(self):
+        """
+        Get allowed relative error of a single step.
+        """
+        return self._tolerance
+
+    def next_dt(self):
+        """
+        Get length of the next step, None before the first step.
+        """
+        return self._dt
+
+    def clamp(self, dt):
+        if self._dt is not None:
+            self._dt = min(self._dt, dt)
+
+    def halve(self):
+        """
+        Limit steps to half of the last accepted one, so they
+        do not grow back when the error allows it.
+        """
+        if self._taken is None:
+            return
+        self._max_dt = self._taken / 2
+        self._dt = min(self._dt, self._max_dt)
+
+    def step(self, positions, velocities, dt, acceleration):
+        """
+        Advance positions and velocities by one accepted step.
+        Given dt is used only as length of the first step.
+        Raises:
+            RuntimeError: if MAX_REJECTIONS trial steps in a row
+                were rejected.
+        """
+        if self._dt is not None:
+            dt = self._dt
+        state = np.concatenate((positions, velocities), axis=1)
+        count = len(positions)
+        for _ in range(self.MAX_REJECTIONS):
+            stages = []
+            for coefficients in self.A:
+                trial = state.copy()
+                with np.errstate(invalid="ignore", over="ignore"):
+                    for weight, stage in zip(coefficients, stages):
+                        if weight:
+                            trial += dt * weight * stage
+                stages.append(
+                    np.concatenate(
+                        (trial[:, 2:], acceleration(trial[:, :2])), axis=1
+                    )
+                )
+            with np.errstate(invalid="ignore", over="ignore", divide="ignore"):
+                new_state = state + dt * sum(
+                    weight * stage for weight, stage in zip(self.B, stages)
+                    if weight
+                )
+                error = dt * sum(
+                    weight * stage for weight, stage in zip(self.E, stages)
+                    if weight
+                )
+                scale = self._absolute_tolerance + self._tolerance * (
+                    np.maximum(np.abs(state), np.abs(new_state))
+                )
+                ratio = np.where(error == 0, 0.0, error / scale)
+                norm = float(np.sqrt(np.mean(ratio**2))) if count else 0.0
+            if not np.isfinite(norm):
+                dt *= 0.2
+                continue
+            factor = 0.9 * norm ** -0.2 if norm > 0 else 5.0
+            factor = min(5.0, max(0.2, factor))
+            if norm <= 1:
+                self._taken = dt
+                self._dt = dt * factor
+                if self._max_dt is not None:
+                    self._dt = min(self._dt, self._max_dt)
+                return (
+                    new_state[:, :2].copy(), new_state[:, 2:].copy(), dt
+                )
+            dt *= factor
+        raise RuntimeError("Step of rk45 integrator was rejected too often")
+
+    def state(self):
+        if self._dt is None:
+            return {}
+        return {"dt": self._dt}
+
+    def set_state(self, state):
+        self._dt = state.get("dt")
+
+    def config(self):
+        config = {
+            "integrator": self.name,
+            "tolerance": self._tolerance,
+            "absolute_tolerance": self._absolute_tolerance,
+        }
+        if self._max_dt is not None:
+            config["max_time_step"] = self._max_dt
+        return config
+
+
+class BlockTimeSteps(Integrator):
+    """
+    Hierarchical block time steps in kick-drift-kick leapfrog form.
+    Every row gets its own time step dt / 2^level, the longest one
+    not exceeding accuracy * |v| / |a|, the time in which acceleration
+    turns velocity by about accuracy radians. Rows close to a central
+    body get short steps, far and slow ones keep the whole dt.
+    All rows drift together by the shortest step in use, which costs
+    a few array operations, but accelerations are evaluated only for
+    rows at the end of their own step, so the number of evaluated
+    rows per step dt is the sum of 2^level over rows, instead of
+    number of rows times 2^(largest level). Levels are chosen again
+    after every step dt, when all rows are synchronized. Acceleration
+    at the end of a step is kept for the next one, like in velocity
+    Verlet, which is the same method when every row is on level 0.
+    Function giving accelerations is also called with index array
+    of rows as second argument, and returns accelerations of these
+    rows only.
+    Attributes:
+        max_level (int): largest level, the shortest step is
+            dt / 2^max_level.
+        accuracy (float): fraction of |v| / |a| allowed as time step.
+    """
+
+    name = "block"
+
+    def __init__(self, max_level=8, accuracy=0.02):
+        """
+        Initialize integrator without cached acceleration.
+        Raises:
+            MalformedDataError: if max level is negative or accuracy
+                is not positive.
+        """
+        if max_level < 0:
+            raise MalformedDataError("Largest level must not be negative.")
+        if accuracy <= 0:
+            raise MalformedDataError("Accuracy must be positive.")
+        self._max_level = int(max_level)
+        self._accuracy = accuracy
+        self._acceleration = None
+        self._levels = None
+        self._evaluations = 0
+
+    def levels(self):
+        """
+        Get (N,) array with levels of the rows in the last step,
+        None before the first step.
+        """
+        return self._levels
+
+    def evaluations(self):
+        """
+        Get number of rows whose accelerations were evaluated.
+        """
+        return self._evaluations
+
+    def choose_levels(self, velocities, accelerations, dt):
+        """
+        Choose level of every row for given time step.
+        Rows at rest with nonzero acceleration get the largest level,
+        rows without acceleration level 0.
+        Returns:
+            levels (numpy.ndarray): (N,) integer array.
+        """
+        speed = np.sqrt(np.sum(velocities**2, axis=1))
+        magnitude = np.sqrt(np.sum(accelerations**2, axis=1))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = dt * magnitude / (self._accuracy * speed)
+        ratio = np.nan_to_num(ratio, nan=1.0, posinf=np.inf)
+        levels = np.ceil(np.log2(np.clip(ratio, 1.0, 2.0**self._max_level)))
+        return levels.astype(np.int64)
+
+    def step(self, positions, velocities, dt, acceleration):
+        accelerations = self._acceleration
+        if accelerations is None or accelerations.shape != positions.shape:
+            accelerations = acceleration(positions)
+            self._evaluations += len(positions)
+        levels = self.choose_levels(velocities, accelerations, dt)
+        top = int(levels.max()) if len(levels) else 0
+        # Rows sorted from the largest level, rows of the levels
+        # kicked at a substep are a prefix of the order.
+        order = np.argsort(-levels, kind="stable")
+        counts = np.bincount(levels, minlength=top + 1)
+        prefix = np.cumsum(counts[::-1])[::-1]
+        steps = (dt / 2.0**levels)[:, np.newaxis]
+        substep = dt / 2**top
+        positions = positions.copy()
+        velocities = velocities.copy()
+        accelerations = accelerations.copy()
+        for number in range(2**top):
+            rows = order[:prefix[_lowest_level(number, top)]]
+            velocities[rows] += 0.5 * steps[rows] * accelerations[rows]
+            positions += velocities * substep
+            rows = order[:prefix[_lowest_level(number + 1, top)]]
+            if len(rows) == len(positions):
+                accelerations = acceleration(positions)
+            else:
+                accelerations[rows] = acceleration(positions, rows)
+            self._evaluations += len(rows)
+            velocities[rows] += 0.5 * steps[rows] * accelerations[rows]
+        self._acceleration = accelerations
+        self._levels = levels
+        return positions, velocities, dt
+
+    def reset(self):
+        self._acceleration = None
+
+    def state(self):
+        if self._acceleration is None:
+            return {}
+        return {"acceleration": self._acceleration}
+
+    def set_state(self, state):
+        self._acceleration = state.get("acceleration")
+
+    def config(self):
+        return {
+            "integrator": self.name,
+            "max_level": self._max_level,
+            "accuracy": self._accuracy,
+        }
+
+
+def _lowest_level(number, top):
+    """
+    Get the lowest level whose steps start or end at given substep,
+    when the largest level has 2^top substeps.
+    """
+    if number == 0:
+        return 0
+    trailing = (number & -number).bit_length() - 1
+    return max(top - trailing, 0)
+
+
+INTEGRATORS = {
+    integrator.name: integrator
+    for integrator in (
+        SemiImplicitEuler, VelocityVerlet, Leapfrog, RungeKutta4,
+        RungeKutta45, BlockTimeSteps,
+    )
+}
+
+
+def create_integrator(config):
+    """
+    Create integrator described by the config dictionary.
+    Uses fields:
+        integrator (str): "euler", "verlet", "leapfrog", "rk4", "rk45"
+            or "block". default: "euler"
+        tolerance (float): relative error tolerance of rk45.
+            default: 1e-8
+        absolute_tolerance (float): absolute error tolerance of rk45.
+            default: 0
+        max_time_step (float): upper limit of rk45 time step.
+            default: None
+        max_level (int): largest level of block time steps.
+            default: 8
+        accuracy (float): fraction of |v| / |a| used as time step
+            by block time steps. default: 0.02
+    Returns:
+        integrator (Integrator): new integrator.
+    Raises:
+        MalformedDataError: if integrator has unknown value.
+    """
+    name = config.get("integrator", "euler")
+    if name not in INTEGRATORS:
+        raise MalformedDataError(f"Unknown integrator '{name}'.")
+    if name == "rk45":
+        return RungeKutta45(
+            tolerance=config.get("tolerance", 1e-8),
+            absolute_tolerance=config.get("absolute_tolerance", 0.0),
+            max_dt=config.get("max_time_step"),
+        )
+    if name == "block":
+        return BlockTimeSteps(
+            max_level=config.get("max_level", 8),
+            accuracy=config.get("accuracy", 0.02),
+        )
+    return INTEGRATORS[name]()
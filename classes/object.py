@@ -1,4 +1,6 @@
 from classes.base_object import BaseObject
+from errors import NegativeRadiusError
+import math
 
 
 class Object(BaseObject):
@@ -8,15 +10,23 @@ class Object(BaseObject):
     Attributes:
         velocity_x (float): velocity in x axis.
         velocity_y (float): velocity in y axis.
+        radius (float): radius used to detect collisions, None if unknown.
     """
-    def __init__(self, pos_x, pos_y, mass, velocity_x=0, velocity_y=0):
+
+    __slots__ = ("_velocity_x", "_velocity_y", "_radius")
+
+    def __init__(self, pos_x, pos_y, mass, velocity_x=0, velocity_y=0,
+                 radius=None):
         """
         Initialize the object with given mass, position and velocity,
-        default velocity = 0, 0.
+        default velocity = 0, 0. Radius is optional.
+        Raises:
+            NegativeRadiusError: if radius is given and less or equal to 0.
         """
         super().__init__(pos_x, pos_y, mass)
         self._velocity_x = velocity_x
         self._velocity_y = velocity_y
+        self.set_radius(radius)
 
     def velocity_x(self):
         """
@@ -43,3 +53,97 @@ class Object(BaseObject):
         Value for velocity can be negative or positive.
         """
         self._velocity_y = velocity
+
+    def radius(self):
+        """
+        Return radius of the object, None if it was not given.
+        """
+        return self._radius
+
+    def set_radius(self, radius):
+        """
+        Set radius of the object. None means radius is unknown.
+        Raises:
+            NegativeRadiusError: if radius is less or equal to 0.
+        """
+        if radius is not None and radius <= 0:
+            raise NegativeRadiusError
+        self._radius = radius
+
+
+class ObjectView(Object):
+    """
+    Object whose values are kept in a row of the engine.
+    Getters and setters read and write arrays of the engine,
+    so a view costs only a few references and stays valid while
+    the engine advances or removes other objects.
+    Attributes:
+        engine (Engine): engine keeping the values.
+        index (int): index of the object in the engine.
+    """
+
+    __slots__ = ("_engine", "_index", "_row", "_version")
+
+    def __init__(self, engine, index):
+        """
+        Initialize view of the object with given index.
+        """
+        self._engine = engine
+        self._index = index
+        self._row = None
+        self._version = None
+
+    def index(self):
+        """
+        Get index of the object in the engine.
+        """
+        return self._index
+
+    def _locate(self):
+        """
+        Get row of the object, found again only after the engine
+        removed some objects.
+        """
+        version = self._engine.version()
+        if self._version != version:
+            self._row = self._engine.row(self._index)
+            self._version = version
+        return self._row
+
+    def pos_x(self):
+        return float(self._engine.positions()[self._locate(), 0])
+
+    def set_pos_x(self, value):
+        self._engine.positions()[self._locate(), 0] = value
+
+    def pos_y(self):
+        return float(self._engine.positions()[self._locate(), 1])
+
+    def set_pos_y(self, value):
+        self._engine.positions()[self._locate(), 1] = value
+
+    def mass(self):
+        return float(self._engine.masses()[self._locate()])
+
+    def velocity_x(self):
+        return float(self._engine.velocities()[self._locate(), 0])
+
+    def set_vel_x(self, velocity):
+        self._engine.velocities()[self._locate(), 0] = velocity
+
+    def velocity_y(self):
+        return float(self._engine.velocities()[self._locate(), 1])
+
+    def set_vel_y(self, velocity):
+        self._engine.velocities()[self._locate(), 1] = velocity
+
+    def radius(self):
+        radius = float(self._engine.radii()[self._locate()])
+        return None if math.isnan(radius) else radius
+
+    def set_radius(self, radius):
+        if radius is not None and radius <= 0:
+            raise NegativeRadiusError
+        self._engine.radii()[self._locate()] = (
+            math.nan if radius is None else radius
+        )
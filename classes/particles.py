@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class ParticleBlock:
+    """
+    Class keeping test particles of the simulation as arrays.
+    Test particles feel gravity of central bodies and, if mutual
+    gravity is enabled, of the objects, but exert none. They have
+    no mass and no radius, so they are never checked for collisions
+    with each other or with the objects, and are only removed when
+    they hit a central body. Without Object instances, validation
+    or collision bookkeeping, millions of them are advanced
+    with a few array operations per step.
+    Attributes:
+        positions (numpy.ndarray): (P, 2) array with x and y coordinates.
+        velocities (numpy.ndarray): (P, 2) array with velocities.
+        ids (numpy.ndarray): (P,) array with indexes of the particles,
+            given when the block was created.
+    """
+
+    def __init__(self, positions, velocities, ids=None):
+        """
+        Initialize the block with given arrays.
+        Arrays are copied into contiguous float64 arrays.
+        """
+        self._positions = np.array(
+            positions, dtype=np.float64
+        ).reshape(-1, 2)
+        self._velocities = np.array(
+            velocities, dtype=np.float64
+        ).reshape(-1, 2)
+        if ids is None:
+            ids = np.arange(len(self._positions))
+        self._ids = np.array(ids, dtype=np.int64).reshape(-1)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Create block from validated columns, see
+        iomodule.validate_particles.
+        """
+        return cls(
+            np.column_stack((columns["x"], columns["y"])),
+            np.column_stack((columns["vx"], columns["vy"])),
+        )
+
+    def count(self):
+        """
+        Get number of particles in the block.
+        """
+        return len(self._positions)
+
+    def positions(self):
+        """
+        Get (P, 2) array with positions of the particles.
+        """
+        return self._positions
+
+    def velocities(self):
+        """
+        Get (P, 2) array with velocities of the particles.
+        """
+        return self._velocities
+
+    def ids(self):
+        """
+        Get (P,) array with indexes of the particles.
+        """
+        return self._ids
+
+    def set_state(self, positions, velocities):
+        """
+        Set positions and velocities of the particles.
+        """
+        self._positions = positions
+        self._velocities = velocities
+
+    def remove(self, mask):
+        """
+        Remove particles selected by boolean mask.
+        Arguments:
+            mask (numpy.ndarray): (P,) boolean array, True for particles
+                to remove.
+        """
+        keep = ~np.asarray(mask, dtype=bool)
+        self._positions = self._positions[keep]
+        self._velocities = self._velocities[keep]
+        self._ids = self._ids[keep]
+
+    def columns(self):
+        """
+        Get copies of the arrays as dictionary of columns.
+        """
+        return {
+            "x": self._positions[:, 0].copy(),
+            "y": self._positions[:, 1].copy(),
+            "vx": self._velocities[:, 0].copy(),
+            "vy": self._velocities[:, 1].copy(),
+        }
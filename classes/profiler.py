@@ -0,0 +1,285 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+
+class NullProfiler:
+    """
+    Profiler doing nothing, used when profiling is disabled.
+    Every method returns immediately, so instrumented simulation
+    pays only for a few empty calls per step.
+    """
+
+    def enabled(self):
+        """
+        Check if the profiler collects anything.
+        """
+        return False
+
+    def begin_step(self, step, bodies):
+        """
+        Mark beginning of given step with given number of objects.
+        """
+        pass
+
+    def end_step(self):
+        """
+        Mark end of the current step.
+        """
+        pass
+
+    def start(self, phase):
+        """
+        Mark beginning of given phase of the step.
+        """
+        pass
+
+    def stop(self, phase):
+        """
+        Mark end of given phase of the step.
+        """
+        pass
+
+    def wrap(self, phase, function):
+        """
+        Get function whose every call is timed as given phase.
+        """
+        return function
+
+    def finish(self):
+        """
+        Stop collecting at the end of the simulation.
+        """
+        pass
+
+
+class Profiler(NullProfiler):
+    """
+    Class measuring time of phases of simulation steps.
+    Phases may be nested, time of a phase does not include time
+    of phases started inside it. Cumulative and last step times
+    are kept for every phase. Hooks are called before and after
+    every phase. For steps [a, b) of the window, the run can be
+    captured with cProfile and tracemalloc.
+    Attributes:
+        window (tuple): first and past-the-last step of the capture
+            window, None to disable capture.
+        cprofile (bool): capture window with cProfile.
+        memory (bool): capture window with tracemalloc.
+    """
+
+    PHASES = ("force", "integrate", "collide", "merge", "record", "log")
+
+    def __init__(self, window=None, cprofile=True, memory=False):
+        """
+        Initialize profiler with empty counters.
+        Raises:
+            ValueError: if window is empty.
+        """
+        if window is not None and window[0] >= window[1]:
+            raise ValueError("Profiling window must contain steps")
+        self._window = window
+        self._use_cprofile = cprofile
+        self._use_memory = memory
+        self._totals = {phase: 0.0 for phase in self.PHASES}
+        self._calls = {phase: 0 for phase in self.PHASES}
+        self._current = {}
+        self._last = {}
+        self._stack = []
+        self._before = []
+        self._after = []
+        self._step = None
+        self._steps = 0
+        self._body_steps = 0
+        self._bodies = 0
+        self._wall_time = 0.0
+        self._step_start = None
+        self._cprofile = None
+        self._capturing = False
+        self._memory_top = []
+        self._memory_peak = None
+
+    def enabled(self):
+        return True
+
+    def add_hook(self, before=None, after=None):
+        """
+        Add functions called around every phase.
+        Arguments:
+            before (callable): called with phase and step before it.
+            after (callable): called with phase, step and time
+                of the phase in seconds after it.
+        """
+        if before is not None:
+            self._before.append(before)
+        if after is not None:
+            self._after.append(after)
+
+    def begin_step(self, step, bodies):
+        self._step = step
+        self._bodies = bodies
+        self._current = {}
+        if self._window is not None:
+            if step == self._window[0]:
+                self._start_capture()
+            elif step >= self._window[1]:
+                self._stop_capture()
+        self._step_start = time.perf_counter()
+
+    def end_step(self):
+        self._wall_time += time.perf_counter() - self._step_start
+        self._steps += 1
+        self._body_steps += self._bodies
+        self._last = self._current
+
+    def start(self, phase):
+        for hook in self._before:
+            hook(phase, self._step)
+        self._stack.append([phase, time.perf_counter(), 0.0])
+
+    def stop(self, phase):
+        _, begin, children = self._stack.pop()
+        elapsed = time.perf_counter() - begin
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        own = elapsed - children
+        self._totals[phase] = self._totals.get(phase, 0.0) + own
+        self._calls[phase] = self._calls.get(phase, 0) + 1
+        self._current[phase] = self._current.get(phase, 0.0) + own
+        for hook in self._after:
+            hook(phase, self._step, own)
+
+    def wrap(self, phase, function):
+        def timed(*arguments):
+            self.start(phase)
+            try:
+                return function(*arguments)
+            finally:
+                self.stop(phase)
+
+        return timed
+
+    def finish(self):
+        self._stop_capture()
+
+    def _start_capture(self):
+        """
+        Start cProfile and tracemalloc capture of the window.
+        """
+        if self._capturing:
+            return
+        self._capturing = True
+        if self._use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if self._use_memory:
+            tracemalloc.start()
+
+    def _stop_capture(self):
+        """
+        Stop capture of the window and keep its results.
+        """
+        if not self._capturing:
+            return
+        self._capturing = False
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._use_memory:
+            snapshot = tracemalloc.take_snapshot()
+            self._memory_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._memory_top = [
+                str(statistic)
+                for statistic in snapshot.statistics("lineno")[:10]
+            ]
+
+    def totals(self):
+        """
+        Get dictionary with cumulative time of every phase in seconds.
+        """
+        return dict(self._totals)
+
+    def calls(self):
+        """
+        Get dictionary with number of calls of every phase.
+        """
+        return dict(self._calls)
+
+    def last_step(self):
+        """
+        Get dictionary with time of phases of the last finished step.
+        """
+        return dict(self._last)
+
+    def steps(self):
+        """
+        Get number of finished steps.
+        """
+        return self._steps
+
+    def throughput(self):
+        """
+        Get steps per second and object steps per second
+        of finished steps.
+        """
+        if self._wall_time <= 0:
+            return 0.0, 0.0
+        return (
+            self._steps / self._wall_time,
+            self._body_steps / self._wall_time,
+        )
+
+    def stats(self):
+        """
+        Get JSON serializable dictionary with all counters.
+        """
+        steps_per_second, body_steps_per_second = self.throughput()
+        return {
+            "steps": self._steps,
+            "wall_time": self._wall_time,
+            "steps_per_second": steps_per_second,
+            "body_steps_per_second": body_steps_per_second,
+            "totals": self.totals(),
+            "calls": self.calls(),
+            "last_step": self.last_step(),
+            "window": list(self._window) if self._window else None,
+            "memory_peak": self._memory_peak,
+            "memory_top": self._memory_top,
+        }
+
+    def summary(self):
+        """
+        Get table with time of every phase and its share in time
+        of all phases.
+        """
+        measured = sum(self._totals.values()) or 1.0
+        lines = [
+            f"{'phase':<10} {'total [s]':>10} {'calls':>8} "
+            f"{'mean [ms]':>10} {'share':>7}"
+        ]
+        for phase, total in self._totals.items():
+            calls = self._calls[phase]
+            mean = 1e3 * total / calls if calls else 0.0
+            lines.append(
+                f"{phase:<10} {total:>10.4f} {calls:>8} {mean:>10.4f} "
+                f"{total / measured:>7.1%}"
+            )
+        steps_per_second, body_steps_per_second = self.throughput()
+        lines.append(
+            f"{self._steps} steps in {self._wall_time:.4f} s, "
+            f"{steps_per_second:.1f} steps/s, "
+            f"{body_steps_per_second:.3e} bodies*steps/s"
+        )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Save counters as JSON file. Statistics of cProfile capture,
+        if there was one, are saved next to it with ".prof" extension.
+        """
+        with open(path, "w") as f:
+            json.dump(self.stats(), f, indent=4)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(f"{os.path.splitext(path)[0]}.prof")
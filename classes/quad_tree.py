@@ -0,0 +1,314 @@
+from classes.executor import SerialExecutor
+import numpy as np
+
+
+class QuadTree:
+    """
+    Class representing 2D quadtree (Barnes-Hut tree) of the objects.
+    Objects are sorted along Morton (Z-order) curve, so every node
+    of the tree is a contiguous range of the sorted objects.
+    Nodes are stored level by level in numpy arrays, which allows
+    to build and walk the tree with batched operations.
+    Attributes:
+        positions (numpy.ndarray): (N, 2) array with positions.
+        masses (numpy.ndarray): (N,) array with masses.
+        max_depth (int): maximal number of levels below the root.
+        batch_size (int): number of objects walking the tree at once.
+    """
+
+    def __init__(self, positions, masses, max_depth=20, batch_size=16384):
+        """
+        Build the tree for given positions and masses.
+        Trees are walked for batch_size objects at once, which limits
+        memory used by lists of visited nodes.
+        """
+        self._positions = np.asarray(positions, dtype=np.float64)
+        self._masses = np.asarray(masses, dtype=np.float64)
+        self._max_depth = max_depth
+        self._batch_size = batch_size
+        self._build()
+
+    def _build(self):
+        """
+        Compute Morton codes of the objects and node arrays of every level.
+        Building stops at the first level where every node holds
+        at most one object.
+        """
+        positions = self._positions
+        lower = positions.min(axis=0) if len(positions) else np.zeros(2)
+        upper = positions.max(axis=0) if len(positions) else np.ones(2)
+        size = float((upper - lower).max())
+        if size <= 0:
+            size = 1.0
+        self._lower = lower
+        self._size = size
+
+        codes = self._morton(positions)
+        self._codes = codes
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        sorted_masses = self._masses[order]
+        weighted_x = sorted_masses * positions[order, 0]
+        weighted_y = sorted_masses * positions[order, 1]
+
+        self._levels = []
+        for level in range(self._max_depth + 1):
+            shift = np.uint64(2 * (self._max_depth - level))
+            keys = sorted_codes >> shift
+            boundary = np.ones(len(keys), dtype=bool)
+            boundary[1:] = keys[1:] != keys[:-1]
+            starts = np.flatnonzero(boundary)
+            counts = np.diff(np.append(starts, len(keys)))
+            mass = np.add.reduceat(sorted_masses, starts)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                com_x = np.add.reduceat(weighted_x, starts) / mass
+                com_y = np.add.reduceat(weighted_y, starts) / mass
+            self._levels.append(
+                {
+                    "keys": keys[starts],
+                    "starts": starts,
+                    "counts": counts,
+                    "mass": mass,
+                    "com_x": com_x,
+                    "com_y": com_y,
+                }
+            )
+            if counts.max() <= 1:
+                break
+
+        for parent, child in zip(self._levels, self._levels[1:]):
+            parent["child_first"] = np.searchsorted(
+                child["starts"], parent["starts"]
+            )
+            parent["child_last"] = np.searchsorted(
+                child["starts"], parent["starts"] + parent["counts"]
+            )
+
+    def _morton(self, positions):
+        """
+        Compute Morton codes of cells of the deepest level containing
+        given positions. Positions outside of the tree get codes
+        of the nearest border cells.
+        """
+        cells = 1 << self._max_depth
+        grid = np.floor(
+            (positions - self._lower) / self._size * cells
+        ).astype(np.int64)
+        grid = np.clip(grid, 0, cells - 1).astype(np.uint64)
+        return self._spread_bits(grid[:, 0]) | (
+            self._spread_bits(grid[:, 1]) << np.uint64(1)
+        )
+
+    @staticmethod
+    def _spread_bits(values):
+        """
+        Insert zero bit after every bit of given 32-bit integers.
+        """
+        values = values.astype(np.uint64)
+        for shift, mask in (
+            (16, 0x0000FFFF0000FFFF),
+            (8, 0x00FF00FF00FF00FF),
+            (4, 0x0F0F0F0F0F0F0F0F),
+            (2, 0x3333333333333333),
+            (1, 0x5555555555555555),
+        ):
+            values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+        return values
+
+    def depth(self):
+        """
+        Get number of levels of the tree below the root.
+        """
+        return len(self._levels) - 1
+
+    def accelerations(self, G, opening_angle=0.5, softening=0.0,
+                      targets=None, executor=None):
+        """
+        Calculate gravitational accelerations of the objects of the tree.
+        A node is used as a single point mass if its size divided
+        by distance to its center of mass is less than opening angle,
+        otherwise its children are visited.
+        Arguments:
+            G (float): gravitational constant.
+            opening_angle (float): Barnes-Hut opening angle (theta).
+                0 gives exact direct summation.
+            softening (float): softening length added to distances.
+            targets (numpy.ndarray): indexes of objects to calculate
+                accelerations for. default: all objects.
+            executor (SerialExecutor | ThreadExecutor): walks batches
+                of objects. default: serial.
+        Returns:
+            accelerations (numpy.ndarray): (len(targets), 2) array.
+        """
+        if targets is None:
+            targets = np.arange(len(self._masses))
+        targets = np.asarray(targets, dtype=np.int64)
+        if len(self._masses) == 0:
+            return np.zeros((len(targets), 2))
+
+        def batch(start, stop):
+            rows = targets[start:stop]
+            return self._walk(
+                self._positions[rows], self._codes[rows],
+                self._masses[rows], G, opening_angle, softening,
+            )
+
+        if executor is None:
+            executor = SerialExecutor()
+        return executor.rows(len(targets), batch, self._batch_size)
+
+    def field(self, points, G, opening_angle=0.5, softening=0.0,
+              executor=None):
+        """
+        Calculate gravitational accelerations at given points caused
+        by the objects of the tree. Nodes containing a point are
+        opened, but, as points are not objects of the tree, never
+        skipped.
+        Arguments:
+            points (numpy.ndarray): (M, 2) array with positions.
+            G (float): gravitational constant.
+            opening_angle (float): Barnes-Hut opening angle (theta).
+            softening (float): softening length added to distances.
+            executor (SerialExecutor | ThreadExecutor): walks batches
+                of points. default: serial.
+        Returns:
+            accelerations (numpy.ndarray): (M, 2) array.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(self._masses) == 0:
+            return np.zeros((len(points), 2))
+
+        def batch(start, stop):
+            rows = points[start:stop]
+            return self._walk(
+                rows, self._morton(rows), None, G, opening_angle, softening
+            )
+
+        if executor is None:
+            executor = SerialExecutor()
+        return executor.rows(len(points), batch, self._batch_size)
+
+    def potentials(self, G, opening_angle=0.5, softening=0.0):
+        """
+        Calculate gravitational potential of every object of the tree
+        caused by all other objects, with nodes accepted as point
+        masses as in accelerations.
+        Arguments:
+            G (float): gravitational constant.
+            opening_angle (float): Barnes-Hut opening angle (theta).
+                0 gives exact direct summation.
+            softening (float): softening length added to distances.
+        Returns:
+            potentials (numpy.ndarray): (N,) array with potential
+                energy per unit mass.
+        """
+        count = len(self._masses)
+        result = np.empty(count)
+        for start in range(0, count, self._batch_size):
+            rows = np.arange(start, min(start + self._batch_size, count))
+            result[rows] = self._walk(
+                self._positions[rows], self._codes[rows],
+                self._masses[rows], G, opening_angle, softening, True,
+            )[:, 2]
+        return result
+
+    def _walk(self, targets, target_codes, own, G, opening_angle,
+              softening, potential=False):
+        """
+        Walk the tree for a batch of points and sum their accelerations.
+        Points with masses own are objects of the tree, which skip
+        their own leaves, points without them are outside of it.
+        With potential, their potentials are summed in third column.
+        """
+        result = np.zeros((len(targets), 3 if potential else 2))
+        target_x = targets[:, 0]
+        target_y = targets[:, 1]
+        theta2 = opening_angle**2
+        eps2 = softening**2
+        last_level = len(self._levels) - 1
+
+        bodies = np.arange(len(targets))
+        nodes = np.zeros(len(targets), dtype=np.int64)
+        for level, data in enumerate(self._levels):
+            if len(bodies) == 0:
+                break
+            shift = np.uint64(2 * (self._max_depth - level))
+            contains = (target_codes[bodies] >> shift) == data["keys"][nodes]
+            mass = data["mass"][nodes]
+            com_x = data["com_x"][nodes]
+            com_y = data["com_y"][nodes]
+
+            if level == last_level:
+                accept = np.ones(len(bodies), dtype=bool)
+                own_mass = own[bodies] * contains if own is not None else 0
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    rest = mass - own_mass
+                    com_x = np.where(
+                        contains,
+                        (mass * com_x - own_mass * target_x[bodies]) / rest,
+                        com_x,
+                    )
+                    com_y = np.where(
+                        contains,
+                        (mass * com_y - own_mass * target_y[bodies]) / rest,
+                        com_y,
+                    )
+                mass = rest
+                accept &= mass > 0
+                opened = np.zeros(len(bodies), dtype=bool)
+            else:
+                size = self._size / (1 << level)
+                dx = com_x - target_x[bodies]
+                dy = com_y - target_y[bodies]
+                far = size * size < theta2 * (dx**2 + dy**2)
+                leaf = data["counts"][nodes] == 1
+                accept = ~contains & (leaf | far)
+                opened = ~accept
+                if own is not None:
+                    opened &= ~(contains & leaf)
+
+            if accept.any():
+                self._accumulate(
+                    result,
+                    bodies[accept],
+                    com_x[accept] - target_x[bodies[accept]],
+                    com_y[accept] - target_y[bodies[accept]],
+                    G * mass[accept],
+                    eps2,
+                )
+
+            bodies, nodes = self._open(
+                data, bodies[opened], nodes[opened]
+            )
+        return result
+
+    @staticmethod
+    def _accumulate(result, bodies, dx, dy, gm, eps2):
+        """
+        Add accelerations coming from point masses to result rows,
+        and potentials if result has third column.
+        """
+        d2 = dx**2 + dy**2 + eps2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            factor = np.where(d2 > 0, gm / (d2 * np.sqrt(d2)), 0.0)
+        count = len(result)
+        result[:, 0] += np.bincount(bodies, factor * dx, minlength=count)
+        result[:, 1] += np.bincount(bodies, factor * dy, minlength=count)
+        if result.shape[1] > 2:
+            result[:, 2] -= np.bincount(
+                bodies, factor * d2, minlength=count
+            )
+
+    @staticmethod
+    def _open(data, bodies, nodes):
+        """
+        Replace every (body, node) pair with pairs of body and children.
+        """
+        if len(bodies) == 0:
+            return bodies, nodes
+        first = data["child_first"][nodes]
+        number = data["child_last"][nodes] - first
+        total = int(number.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(number) - number,
+                                               number)
+        return np.repeat(bodies, number), np.repeat(first, number) + offsets
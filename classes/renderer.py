@@ -0,0 +1,440 @@
+from classes.trajectory_sink import TrajectorySink
+from errors import MalformedDataError
+import numpy as np
+
+
+def decimate(x, y, buckets):
+    """
+    Reduce number of points of a trajectory, keeping its shape.
+    Points are split into given number of consecutive buckets and
+    from every bucket only the first and the last point and points
+    with minimal and maximal x and y are kept, in original order.
+    Arguments:
+        x (numpy.ndarray): x coordinates.
+        y (numpy.ndarray): y coordinates.
+        buckets (int): number of buckets, e.g. width of the image
+            in pixels.
+    Returns:
+        x (numpy.ndarray): x coordinates of kept points.
+        y (numpy.ndarray): y coordinates of kept points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    count = len(x)
+    if buckets < 1 or count <= 6 * buckets:
+        return x, y
+    length = -(-count // buckets)
+    rows = -(-count // length)
+    padded_x = np.full(rows * length, np.nan)
+    padded_y = np.full(rows * length, np.nan)
+    padded_x[:count] = x
+    padded_y[:count] = y
+    padded_x = padded_x.reshape(rows, length)
+    padded_y = padded_y.reshape(rows, length)
+    starts = np.arange(rows) * length
+    ends = np.minimum(starts + length, count) - 1
+    keep = np.concatenate(
+        (
+            starts,
+            ends,
+            starts + np.nanargmin(padded_x, axis=1),
+            starts + np.nanargmax(padded_x, axis=1),
+            starts + np.nanargmin(padded_y, axis=1),
+            starts + np.nanargmax(padded_y, axis=1),
+        )
+    )
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+class Renderer:
+    """
+    Class drawing trajectories of the objects with matplotlib.
+    All trajectories are drawn as a single LineCollection, after
+    decimation to the width of the image.
+    Attributes:
+        scale (float): scale of the simulation.
+        image_size (list): width and height of the image in pixels.
+        output (str): file the image is saved to.
+        headless (bool): draw without display, with Agg canvas,
+            and do not show the image.
+        legend (bool): draw the legend.
+        decimate (bool): reduce number of drawn points.
+    """
+
+    LEGEND_LIMIT = 20
+
+    def __init__(self, scale, image_size, output="simulation_result.png",
+                 headless=False, legend=True, decimate=True):
+        """
+        Initialize renderer with given options.
+        """
+        self._scale = scale
+        self._image_size = image_size
+        self._output = output
+        self._headless = headless
+        self._legend = legend
+        self._decimate = decimate
+
+    def output(self):
+        """
+        Get file the image is saved to.
+        """
+        return self._output
+
+    def headless(self):
+        """
+        Check if renderer works without display.
+        """
+        return self._headless
+
+    def _figure(self):
+        """
+        Create figure, with pyplot or with Agg canvas in headless mode.
+        """
+        if self._headless:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            figure = Figure(figsize=(8, 8))
+            FigureCanvasAgg(figure)
+            return figure
+        import matplotlib.pyplot as plt
+
+        return plt.figure(figsize=(8, 8))
+
+    def render(self, trajectories, positions, centres=None):
+        """
+        Draw trajectories and current positions of the objects,
+        save the image and, unless headless, show it.
+        Arguments:
+            trajectories (dict): dictionary with x and y coordinates
+                of the objects.
+            positions (numpy.ndarray): (N, 2) array with current
+                positions of the objects.
+            centres (numpy.ndarray): (K, 2) array with positions
+                of central bodies. default: origin
+        """
+        from matplotlib.collections import LineCollection
+        from matplotlib.lines import Line2D
+        import matplotlib
+
+        scale = self._scale
+        figure = self._figure()
+        ax = figure.add_subplot()
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        if len(positions):
+            max_range = np.abs(positions).max()
+        else:
+            max_range = max(
+                (
+                    np.abs(trajectory["x"]).max()
+                    for trajectory in trajectories.values()
+                    if len(trajectory["x"])
+                ),
+                default=1.0,
+            )
+        ax.set_xlim(-1.5 * max_range / scale, 1.5 * max_range / scale)
+        ax.set_ylim(-1.5 * max_range / scale, 1.5 * max_range / scale)
+
+        if centres is None:
+            centres = np.zeros((1, 2))
+        centres = np.asarray(centres, dtype=np.float64).reshape(-1, 2)
+        ax.scatter(
+            centres[:, 0] / scale, centres[:, 1] / scale, color="yellow",
+            s=200, label="Obiekt centralny",
+        )
+
+        colors = matplotlib.colormaps["tab10"].colors
+        buckets = int(self._image_size[0]) if self._decimate else 0
+        segments = []
+        segment_colors = []
+        handles = []
+        labelled = len(trajectories) <= self.LEGEND_LIMIT
+        for number, (i, trajectory) in enumerate(trajectories.items()):
+            x, y = decimate(trajectory["x"], trajectory["y"], buckets)
+            color = colors[number % len(colors)]
+            if len(x):
+                segments.append(np.column_stack((x, y)) / scale)
+                segment_colors.append(color)
+            if labelled:
+                handles.append(
+                    Line2D(
+                        [], [], linestyle="--", alpha=0.7, color=color,
+                        label=f"Trajektoria {i + 1}",
+                    )
+                )
+        ax.add_collection(
+            LineCollection(
+                segments, colors=segment_colors, linestyles="--", alpha=0.7,
+                label=None if labelled else "Trajektorie",
+            )
+        )
+
+        if len(positions):
+            object_colors = [
+                colors[number % len(colors)]
+                for number in range(len(positions))
+            ]
+            ax.scatter(
+                positions[:, 0] / scale, positions[:, 1] / scale, s=50,
+                c=object_colors, label="Obiekty",
+            )
+
+        ax.set_title("Symulacja ruchu grawitacyjnego")
+        ax.set_xlabel("Odległość (km) / skala")
+        ax.set_ylabel("Odległość (km) / skala")
+        if self._legend:
+            existing, _ = ax.get_legend_handles_labels()
+            ax.legend(handles=existing + handles)
+
+        figure.savefig(self._output)
+        if not self._headless:
+            import matplotlib.pyplot as plt
+
+            plt.show()
+            plt.close(figure)
+
+
+class RasterRenderer(TrajectorySink):
+    """
+    Class drawing trajectories straight into a numpy pixel buffer
+    of image_size, without matplotlib artists. Pixel of a point is
+    its position divided by scale, with the central object in the
+    middle of the image. As a trajectory sink it accumulates
+    positions while the simulation runs, so trajectories are
+    never stored.
+    Attributes:
+        scale (float): scale of the simulation.
+        image_size (list): width and height of the image in pixels.
+        mode (str): "count" colours pixels by number of points,
+            "age" by the last step a point was seen. default: "count"
+        output (str): file the image is saved to.
+        colormap (str): name of matplotlib colormap.
+        stride (int): only steps divisible by stride are drawn.
+    """
+
+    MODES = ("count", "age")
+
+    def __init__(self, scale, image_size, mode="count",
+                 output="simulation_result.png", colormap="inferno",
+                 stride=1):
+        """
+        Initialize renderer with empty buffer.
+        Raises:
+            MalformedDataError: if mode is unknown.
+        """
+        super().__init__(stride)
+        if mode not in self.MODES:
+            raise MalformedDataError(f"Unknown raster mode '{mode}'.")
+        self._scale = scale
+        self._width, self._height = (int(size) for size in image_size)
+        self._mode = mode
+        self._output = output
+        self._colormap = colormap
+        dtype = np.int64 if mode == "count" else np.float64
+        initial = 0 if mode == "count" else -np.inf
+        self._buffer = np.full(self._width * self._height, initial, dtype)
+
+    def output(self):
+        """
+        Get file the image is saved to.
+        """
+        return self._output
+
+    def buffer(self):
+        """
+        Get (height, width) array with hit counts or last steps
+        of the pixels.
+        """
+        return self._buffer.reshape(self._height, self._width)
+
+    def _pixels(self, positions):
+        """
+        Get indexes of pixels of points in flattened buffer.
+        Returns:
+            pixels (numpy.ndarray): indexes of pixels of points inside
+                the image.
+            inside (numpy.ndarray): mask of points inside the image.
+        """
+        column = np.floor(positions[:, 0] / self._scale + self._width / 2)
+        row = np.floor(self._height / 2 - positions[:, 1] / self._scale)
+        inside = (
+            (column >= 0) & (column < self._width)
+            & (row >= 0) & (row < self._height)
+        )
+        pixels = (
+            row[inside].astype(np.int64) * self._width
+            + column[inside].astype(np.int64)
+        )
+        return pixels, inside
+
+    def _count(self, pixels):
+        """
+        Increase hit counts of given pixels. Few points are added
+        in place, many with a single bincount over the whole buffer.
+        """
+        if len(pixels) * 8 < self._buffer.size:
+            np.add.at(self._buffer, pixels, 1)
+        else:
+            self._buffer += np.bincount(pixels, minlength=self._buffer.size)
+
+    def rasterize(self, positions, step=0):
+        """
+        Add points to the buffer. Points outside the image are skipped.
+        Arguments:
+            positions (numpy.ndarray): (N, 2) array with positions,
+                NaN rows are skipped.
+            step (int): step of the points, used in "age" mode.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        pixels, _ = self._pixels(positions)
+        if self._mode == "count":
+            self._count(pixels)
+        else:
+            self._buffer[pixels] = step
+
+    def rasterize_trajectory(self, x, y, steps=None):
+        """
+        Add whole trajectory to the buffer.
+        Arguments:
+            x (numpy.ndarray): x coordinates.
+            y (numpy.ndarray): y coordinates.
+            steps (numpy.ndarray): step of every point, used in "age"
+                mode. default: index of the point.
+        """
+        positions = np.column_stack(
+            (np.asarray(x, np.float64), np.asarray(y, np.float64))
+        )
+        pixels, inside = self._pixels(positions)
+        if self._mode == "count":
+            self._count(pixels)
+            return
+        if steps is None:
+            steps = np.arange(len(positions))
+        steps = np.asarray(steps, dtype=np.float64)[inside]
+        np.maximum.at(self._buffer, pixels, steps)
+
+    def _write(self, step, row):
+        """
+        Draw positions of the objects after given step.
+        """
+        self.rasterize(row, step)
+
+    def image(self):
+        """
+        Get RGBA image of the buffer.
+        Returns:
+            image (numpy.ndarray): (height, width, 4) array of uint8.
+        """
+        import matplotlib
+
+        buffer = self.buffer()
+        if self._mode == "count":
+            values = np.log1p(buffer.astype(np.float64))
+            visited = buffer > 0
+        else:
+            visited = np.isfinite(buffer)
+            values = np.where(visited, buffer, 0.0)
+        normalized = np.zeros(buffer.shape)
+        if visited.any():
+            low = values[visited].min()
+            high = values[visited].max()
+            normalized[visited] = (
+                (values[visited] - low) / (high - low) if high > low else 1.0
+            )
+        colormap = matplotlib.colormaps[self._colormap]
+        image = colormap(normalized, bytes=True)
+        image[~visited] = (0, 0, 0, 255)
+        return image
+
+    def save(self, output=None):
+        """
+        Save image of the buffer as png file.
+        Arguments:
+            output (str): file of the image, default: output of renderer.
+        """
+        import matplotlib.image
+
+        matplotlib.image.imsave(output or self._output, self.image())
+
+    def render(self, trajectories, positions, centres=None):
+        """
+        Draw trajectories and current positions of the objects
+        and save the image.
+        Arguments:
+            trajectories (dict): dictionary with x and y coordinates
+                of the objects.
+            positions (numpy.ndarray): (N, 2) array with current
+                positions of the objects.
+            centres (numpy.ndarray): positions of central bodies,
+                not drawn in the density image.
+        """
+        lengths = [
+            len(trajectory["x"]) for trajectory in trajectories.values()
+        ]
+        if lengths:
+            self.rasterize_trajectory(
+                np.concatenate([t["x"] for t in trajectories.values()]),
+                np.concatenate([t["y"] for t in trajectories.values()]),
+                np.concatenate([np.arange(length) for length in lengths]),
+            )
+        self.rasterize(positions, max(lengths, default=0))
+        self.save()
+
+    def state(self):
+        """
+        Get dictionary with values needed to continue drawing.
+        """
+        state = super().state()
+        state["buffer"] = self._buffer.copy()
+        return state
+
+    def set_state(self, state):
+        """
+        Restore values returned by state().
+        """
+        super().set_state(state)
+        self._buffer = np.array(state["buffer"], dtype=self._buffer.dtype)
+
+
+def create_renderer(config, scale, image_size, stride=1):
+    """
+    Create renderer described by the config dictionary.
+    Uses fields:
+        backend (str): "matplotlib" or "raster". default: "matplotlib"
+        output (str): file of the image. default: "simulation_result.png"
+        headless (bool): draw without display. default: False
+        legend (bool): draw the legend. default: True
+        decimate (bool): reduce number of drawn points. default: True
+        mode (str): "count" or "age", for raster backend.
+            default: "count"
+        colormap (str): colormap of raster backend. default: "inferno"
+    Arguments:
+        stride (int): recording stride of raster backend used as sink.
+    Returns:
+        renderer (Renderer | RasterRenderer): new renderer.
+    Raises:
+        MalformedDataError: if backend has unknown value.
+    """
+    backend = config.get("backend", "matplotlib")
+    output = config.get("output", "simulation_result.png")
+    if backend == "raster":
+        return RasterRenderer(
+            scale,
+            image_size,
+            mode=config.get("mode", "count"),
+            output=output,
+            colormap=config.get("colormap", "inferno"),
+            stride=stride,
+        )
+    if backend != "matplotlib":
+        raise MalformedDataError(f"Unknown render backend '{backend}'.")
+    return Renderer(
+        scale,
+        image_size,
+        output=output,
+        headless=config.get("headless", False),
+        legend=config.get("legend", True),
+        decimate=config.get("decimate", True),
+    )
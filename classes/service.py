@@ -0,0 +1,323 @@
+from classes.system import System
+from concurrent.futures import ThreadPoolExecutor
+from errors import MalformedDataError, NegativeMassError, NegativeRadiusError
+import asyncio
+import threading
+
+
+class AsyncSimulation:
+    """
+    Class running System.run from asyncio code.
+    Every chunk of steps between progress reports is computed
+    in an executor, so the event loop stays free and several
+    simulations can run on one loop. Cancellation is cooperative:
+    the run stops after the chunk being computed.
+    Attributes:
+        system (System): simulated system.
+        steps (int): number of steps to simulate.
+        every (int): steps between progress reports.
+        sink (TrajectorySink): destination of trajectories.
+            default: created by the system.
+        energy (bool): include total energy in progress reports.
+    """
+
+    STATES = ("pending", "running", "done", "cancelled", "failed")
+
+    def __init__(self, system, steps, every=100, sink=None, energy=True):
+        """
+        Initialize simulation, nothing is computed before updates
+        or run is awaited.
+        """
+        self._system = system
+        self._steps = steps
+        self._every = max(int(every), 1)
+        self._sink = sink
+        self._energy = energy
+        self._cancelled = threading.Event()
+        self._state = "pending"
+        self._progress = None
+        self._result = None
+        self._error = None
+
+    def system(self):
+        """
+        Get simulated system.
+        """
+        return self._system
+
+    def state(self):
+        """
+        Get state of the simulation, one of STATES.
+        """
+        return self._state
+
+    def progress(self):
+        """
+        Get the last progress report, None before the first one.
+        """
+        return self._progress
+
+    def result(self):
+        """
+        Get trajectories and collision report of a finished run,
+        None if it did not finish.
+        """
+        return self._result
+
+    def error(self):
+        """
+        Get exception which stopped a failed run.
+        """
+        return self._error
+
+    def cancel(self):
+        """
+        Ask the run to stop after the chunk being computed.
+        """
+        self._cancelled.set()
+
+    def status(self):
+        """
+        Get JSON serializable dictionary with state, progress
+        and error of the simulation.
+        """
+        status = {"state": self._state, "progress": self._progress}
+        if self._error is not None:
+            status["error"] = str(self._error)
+        return status
+
+    def _advance(self, run):
+        """
+        Compute steps up to the next progress report.
+        Returns:
+            done (bool): run has ended.
+            value (dict | tuple): progress report, or result
+                of a finished run, None if it was cancelled.
+        """
+        if self._cancelled.is_set():
+            run.close()
+            return True, None
+        try:
+            return False, next(run)
+        except StopIteration as stop:
+            return True, stop.value
+
+    async def updates(self, executor=None):
+        """
+        Run the simulation, yielding progress reports.
+        Arguments:
+            executor (concurrent.futures.Executor): computes chunks
+                of steps. default: default executor of the loop.
+        Yields:
+            progress (dict): report of System.run.
+        """
+        loop = asyncio.get_running_loop()
+        run = self._system.run(
+            self._steps, self._sink, every=self._every, energy=self._energy
+        )
+        self._state = "running"
+        while True:
+            future = loop.run_in_executor(executor, self._advance, run)
+            try:
+                done, value = await future
+            except asyncio.CancelledError:
+                self.cancel()
+                self._state = "cancelled"
+                future.add_done_callback(lambda _: run.close())
+                raise
+            except Exception as error:
+                self._state = "failed"
+                self._error = error
+                raise
+            if done:
+                break
+            self._progress = value
+            yield value
+        if value is None:
+            self._state = "cancelled"
+        else:
+            self._state = "done"
+            self._result = value
+
+    async def run(self, executor=None):
+        """
+        Run the simulation to the end.
+        Returns:
+            trajectories (dict): trajectories read from the sink.
+            collision_report (list): collision report.
+            Both are None if the run was cancelled.
+        """
+        async for _ in self.updates(executor):
+            pass
+        return self._result or (None, None)
+
+
+class SimulationService:
+    """
+    Class keeping simulation jobs running on one event loop.
+    Jobs are submitted as configurations and polled by number.
+    Chunks of steps of all jobs are computed by a shared thread pool.
+    Attributes:
+        workers (int): number of threads computing steps.
+    """
+
+    def __init__(self, workers=2):
+        """
+        Initialize service with no jobs.
+        """
+        self._executor = ThreadPoolExecutor(workers)
+        self._jobs = {}
+        self._tasks = {}
+
+    def jobs(self):
+        """
+        Get dictionary mapping numbers of jobs to their simulations.
+        """
+        return self._jobs
+
+    def submit(self, config, steps, every=100, energy=True,
+               listener=None):
+        """
+        Start simulation of given configuration on the running loop.
+        Arguments:
+            config (dict): configuration of the simulation.
+            steps (int): number of steps.
+            every (int): steps between progress reports.
+            energy (bool): include total energy in progress reports.
+            listener (callable): called with number of the job
+                and every progress report. default: None
+        Returns:
+            job (int): number of the job.
+        """
+        job = len(self._jobs) + 1
+        simulation = AsyncSimulation(System(config), steps, every,
+                                     energy=energy)
+        self._jobs[job] = simulation
+
+        async def work():
+            async for progress in simulation.updates(self._executor):
+                if listener is not None:
+                    listener(job, progress)
+
+        task = asyncio.get_running_loop().create_task(work())
+        task.add_done_callback(self._finished)
+        self._tasks[job] = task
+        return job
+
+    def _finished(self, task):
+        """
+        Retrieve exception of a finished task, it is kept
+        by its simulation.
+        """
+        if not task.cancelled():
+            task.exception()
+
+    def simulation(self, job):
+        """
+        Get simulation of given job.
+        Raises:
+            MalformedDataError: if there is no such job.
+        """
+        if job not in self._jobs:
+            raise MalformedDataError(f"Unknown job {job}.")
+        return self._jobs[job]
+
+    def status(self, job):
+        """
+        Get status of given job, see AsyncSimulation.status.
+        """
+        return self.simulation(job).status()
+
+    def cancel(self, job):
+        """
+        Ask given job to stop.
+        """
+        self.simulation(job).cancel()
+
+    async def wait(self, job):
+        """
+        Wait until given job ends.
+        """
+        self.simulation(job)
+        await asyncio.gather(self._tasks[job], return_exceptions=True)
+
+    def result(self, job):
+        """
+        Get collision report and final state of given job.
+        Returns:
+            result (dict): status, and for finished jobs collision
+                report and state of the system in "system" field.
+        """
+        simulation = self.simulation(job)
+        result = simulation.status()
+        if simulation.result() is not None:
+            result["collision_report"] = [
+                line if isinstance(line, str) else list(line)
+                for line in simulation.result()[1]
+            ]
+            result["system"] = simulation.system().state()
+        return result
+
+    async def handle(self, request, listener=None):
+        """
+        Execute request given as dictionary with "command" field.
+        Commands:
+            submit: start job with "config" (dictionary or path
+                to a file), "steps", optional "every" and "energy".
+            status, cancel, wait, result: act on "job".
+            list: get status of every job.
+        Arguments:
+            request (dict): request.
+            listener (callable): receives progress of submitted jobs.
+        Returns:
+            reply (dict): JSON serializable reply, with "error" field
+                if the request failed.
+        """
+        from iomodule import load_config
+
+        try:
+            command = request.get("command")
+            if command == "submit":
+                config = request["config"]
+                if isinstance(config, str):
+                    config = load_config(config)
+                job = self.submit(
+                    config, int(request["steps"]),
+                    request.get("every", 100), request.get("energy", True),
+                    listener,
+                )
+                return {"job": job}
+            if command == "list":
+                return {
+                    "jobs": {
+                        str(job): simulation.status()
+                        for job, simulation in self._jobs.items()
+                    }
+                }
+            job = request.get("job")
+            if command == "status":
+                return dict(self.status(job), job=job)
+            if command == "cancel":
+                self.cancel(job)
+                return {"job": job, "cancelling": True}
+            if command == "wait":
+                await self.wait(job)
+                return dict(self.status(job), job=job)
+            if command == "result":
+                return dict(self.result(job), job=job)
+            raise MalformedDataError(f"Unknown command '{command}'.")
+        except (KeyError, TypeError, ValueError) as error:
+            return {"error": f"Malformed request: {error}"}
+        except (
+            MalformedDataError, NegativeMassError, NegativeRadiusError,
+            FileNotFoundError,
+        ) as error:
+            return {"error": str(error)}
+
+    def close(self):
+        """
+        Cancel running jobs and stop the threads.
+        """
+        for simulation in self._jobs.values():
+            simulation.cancel()
+        self._executor.shutdown(wait=True)
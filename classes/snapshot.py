@@ -0,0 +1,93 @@
+class StepSnapshot:
+    """
+    Class describing state of the system after one step, given
+    by System.iter_steps. Arrays are not copied, they are the arrays
+    of the engine and of the test particles, so a snapshot costs
+    the same for any number of objects. They are valid until
+    the next step, consumers keeping them longer must copy them.
+    Attributes:
+        step (int): number of finished steps.
+        time (float): simulated time.
+        ids (numpy.ndarray): (N,) array with indexes of the objects.
+        positions (numpy.ndarray): (N, 2) array with positions.
+        velocities (numpy.ndarray): (N, 2) array with velocities.
+        particle_ids (numpy.ndarray): (P,) array with indexes
+            of test particles.
+        particle_positions (numpy.ndarray): (P, 2) array with positions
+            of test particles.
+        collisions (list): collision report entries added in the step.
+    """
+
+    __slots__ = (
+        "_step", "_time", "_ids", "_positions", "_velocities",
+        "_particle_ids", "_particle_positions", "_collisions",
+    )
+
+    def __init__(self, step, time, engine, particles, collisions):
+        """
+        Initialize snapshot with arrays of the engine and the particles.
+        """
+        self._step = step
+        self._time = time
+        self._ids = engine.ids()
+        self._positions = engine.positions()
+        self._velocities = engine.velocities()
+        self._particle_ids = particles.ids()
+        self._particle_positions = particles.positions()
+        self._collisions = collisions
+
+    def step(self):
+        """
+        Get number of finished steps.
+        """
+        return self._step
+
+    def time(self):
+        """
+        Get simulated time.
+        """
+        return self._time
+
+    def count(self):
+        """
+        Get number of objects.
+        """
+        return len(self._ids)
+
+    def ids(self):
+        """
+        Get (N,) array with indexes of the objects.
+        """
+        return self._ids
+
+    def positions(self):
+        """
+        Get (N, 2) array with positions of the objects.
+        """
+        return self._positions
+
+    def velocities(self):
+        """
+        Get (N, 2) array with velocities of the objects.
+        """
+        return self._velocities
+
+    def particle_ids(self):
+        """
+        Get (P,) array with indexes of test particles.
+        """
+        return self._particle_ids
+
+    def particle_positions(self):
+        """
+        Get (P, 2) array with positions of test particles.
+        """
+        return self._particle_positions
+
+    def collisions(self):
+        """
+        Get collision report entries added in the step: strings
+        for hits of central bodies and tuples of indexes for objects
+        merged at the end of the run.
+        """
+        return self._collisions
@@ -0,0 +1,212 @@
+import numpy as np
+
+
+class SpatialHash:
+    """
+    Class representing uniform grid of square cells with objects.
+    Objects are sorted by their cell, so every occupied cell is
+    a contiguous range of the sorted objects. Objects closer than
+    cell size are always in the same or in neighbouring cells.
+    Attributes:
+        positions (numpy.ndarray): (N, 2) array with positions.
+        cell_size (float): side of a single cell.
+    """
+
+    NEIGHBOURS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+    def __init__(self, positions, cell_size):
+        """
+        Put objects with given positions into cells of given size.
+        """
+        self._positions = np.asarray(positions, dtype=np.float64)
+        self._cell_size = cell_size
+        self._build()
+
+    def _build(self):
+        """
+        Sort objects by cell and find ranges of occupied cells.
+        Cell coordinates are replaced by their ranks, so cell keys
+        fit in int64 even for extreme coordinates.
+        """
+        cells = np.floor(self._positions / self._cell_size).astype(np.int64)
+        self._ranks_x = np.unique(
+            np.concatenate((cells[:, 0] - 1, cells[:, 0], cells[:, 0] + 1))
+        )
+        self._ranks_y = np.unique(
+            np.concatenate((cells[:, 1] - 1, cells[:, 1], cells[:, 1] + 1))
+        )
+        keys = self._key(cells[:, 0], cells[:, 1])
+        self._order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self._order]
+        boundary = np.ones(len(sorted_keys), dtype=bool)
+        boundary[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        self._starts = np.flatnonzero(boundary)
+        self._counts = np.diff(np.append(self._starts, len(sorted_keys)))
+        self._keys = sorted_keys[self._starts]
+        self._cells = cells[self._order[self._starts]]
+
+    def _key(self, cell_x, cell_y):
+        """
+        Get unique integer key of cells with given coordinates.
+        """
+        rank_x = np.searchsorted(self._ranks_x, cell_x)
+        rank_y = np.searchsorted(self._ranks_y, cell_y)
+        return rank_x * len(self._ranks_y) + rank_y
+
+    def cell_size(self):
+        """
+        Get side of a single cell.
+        """
+        return self._cell_size
+
+    def candidate_pairs(self):
+        """
+        Find pairs of objects lying in the same or neighbouring cells.
+        Every pair is reported once.
+        Returns:
+            pairs (numpy.ndarray): (M, 2) array with indexes of objects.
+        """
+        if len(self._keys) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        pairs = [self._pairs_inside_cells()]
+        for offset_x, offset_y in self.NEIGHBOURS:
+            keys = self._key(
+                self._cells[:, 0] + offset_x, self._cells[:, 1] + offset_y
+            )
+            found = np.searchsorted(self._keys, keys)
+            found = np.minimum(found, len(self._keys) - 1)
+            exists = self._keys[found] == keys
+            pairs.append(
+                self._pairs_between_cells(
+                    np.flatnonzero(exists), found[exists]
+                )
+            )
+        pairs = np.concatenate(pairs)
+        return self._order[pairs]
+
+    def _pairs_inside_cells(self):
+        """
+        Find pairs of sorted objects sharing a cell.
+        """
+        crowded = self._counts > 1
+        starts = self._starts[crowded]
+        counts = self._counts[crowded]
+        members = np.repeat(starts, counts) + self._ranges(counts)
+        partners = np.repeat(starts + counts, counts) - members - 1
+        first = np.repeat(members, partners)
+        second = first + 1 + self._ranges(partners)
+        return np.column_stack((first, second))
+
+    def _pairs_between_cells(self, cells, neighbours):
+        """
+        Find pairs of sorted objects from two lists of cells.
+        """
+        counts = self._counts[cells]
+        neighbour_counts = self._counts[neighbours]
+        number = counts * neighbour_counts
+        offsets = self._ranges(number)
+        repeated = np.repeat(neighbour_counts, number)
+        first = np.repeat(self._starts[cells], number) + offsets // repeated
+        second = (
+            np.repeat(self._starts[neighbours], number) + offsets % repeated
+        )
+        return np.column_stack((first, second))
+
+    @staticmethod
+    def _ranges(lengths):
+        """
+        Concatenate ranges 0..length-1 for every given length.
+        """
+        total = int(lengths.sum())
+        return np.arange(total) - np.repeat(np.cumsum(lengths) - lengths,
+                                            lengths)
+
+
+def colliding_pairs(positions, radii, rows=None):
+    """
+    Find every pair of objects closer than sum of their radii.
+    Broad phase puts objects into SpatialHash with cells as wide as
+    the largest object, narrow phase compares distances with radii.
+    Arguments:
+        positions (numpy.ndarray): (N, 2) array with positions.
+        radii (numpy.ndarray): (N,) array with radii.
+        rows (tuple): start and stop of rows, only pairs whose lower
+            index is in [start, stop) are checked. default: all pairs.
+    Returns:
+        pairs (list): sorted list of tuples (i, j) with i < j.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    radii = np.asarray(radii, dtype=np.float64)
+    if len(positions) < 2:
+        return []
+    cell_size = 2 * radii.max()
+    if cell_size <= 0:
+        cell_size = 1.0
+    pairs = SpatialHash(positions, cell_size).candidate_pairs()
+    pairs = np.sort(pairs, axis=1)
+    if rows is not None:
+        pairs = pairs[(pairs[:, 0] >= rows[0]) & (pairs[:, 0] < rows[1])]
+    first, second = pairs[:, 0], pairs[:, 1]
+    dx = positions[first, 0] - positions[second, 0]
+    dy = positions[first, 1] - positions[second, 1]
+    touching = dx**2 + dy**2 <= (radii[first] + radii[second]) ** 2
+    pairs = pairs[touching]
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    return [(int(i), int(j)) for i, j in pairs]
+
+
+def closest_approach(start, end, first, second):
+    """
+    Find the moment of smallest distance of pairs of objects moving
+    along straight segments during a step.
+    Arguments:
+        start (numpy.ndarray): (N, 2) array with positions
+            at the beginning of the step.
+        end (numpy.ndarray): (N, 2) array with positions at its end.
+        first (numpy.ndarray): indexes of first objects of the pairs.
+        second (numpy.ndarray): indexes of second objects of the pairs.
+    Returns:
+        fractions (numpy.ndarray): part of the step passed before
+            the closest approach of every pair.
+        distances (numpy.ndarray): squared smallest distances.
+    """
+    offset = start[first] - start[second]
+    motion = (end[first] - start[first]) - (end[second] - start[second])
+    speed = np.sum(motion * motion, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fractions = -np.sum(offset * motion, axis=1) / speed
+    fractions = np.clip(np.nan_to_num(fractions, nan=0.0), 0.0, 1.0)
+    closest = offset + fractions[:, np.newaxis] * motion
+    return fractions, np.sum(closest * closest, axis=1)
+
+
+def first_contact(start, end, first, second, reach):
+    """
+    Find the first moment when pairs of objects moving along straight
+    segments during a step come within given distance.
+    Arguments:
+        start (numpy.ndarray): (N, 2) array with positions
+            at the beginning of the step.
+        end (numpy.ndarray): (N, 2) array with positions at its end.
+        first (numpy.ndarray): indexes of first objects of the pairs.
+        second (numpy.ndarray): indexes of second objects of the pairs.
+        reach (numpy.ndarray): distance of contact of every pair.
+    Returns:
+        fractions (numpy.ndarray): part of the step passed before
+            the contact of every pair, 0 if it started in contact,
+            NaN if there was no contact.
+    """
+    offset = start[first] - start[second]
+    motion = (end[first] - start[first]) - (end[second] - start[second])
+    a = np.sum(motion * motion, axis=1)
+    b = np.sum(offset * motion, axis=1)
+    c = np.sum(offset * offset, axis=1) - reach**2
+    discriminant = b * b - a * c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fractions = (-b - np.sqrt(discriminant)) / a
+    inside = c <= 0
+    fractions = np.where(inside, 0.0, fractions)
+    touching = inside | (
+        (a > 0) & (discriminant >= 0) & (fractions >= 0) & (fractions <= 1)
+    )
+    return np.where(touching, fractions, np.nan)
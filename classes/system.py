@@ -1,8 +1,29 @@
-from classes.central_object import CentralObject
-from classes.object import Object
-import matplotlib.pyplot as plt
+from classes.central_bodies import create_central_bodies
+from classes.object import ObjectView
+from classes.engine import Engine
+from classes.particles import ParticleBlock
+from classes.gravity import create_gravity
+from classes.integrator import create_integrator
+from classes.event_log import create_event_log
+from classes.trajectory_sink import NullSink, TrajectorySink, create_sink
+from classes.snapshot import StepSnapshot
+from classes.renderer import RasterRenderer, create_renderer
+from classes.animation import create_animator
+from classes.profiler import NullProfiler
+from classes.diagnostics import NullDiagnostics, create_diagnostics
+from classes.executor import create_executor
+from classes.spatial_hash import first_contact
+from classes.checkpoint import load_checkpoint, split_state, join_state
+from iomodule import (
+    validate_columns,
+    validate_particles,
+    to_columns,
+    from_columns,
+    save_columnar,
+    unknown_fields,
+)
 import numpy as np
-import math
+import itertools
 import json
 
 
@@ -17,45 +38,173 @@ class System:
     def __init__(self, config):
         """
         Initialize the system with objects from the config dictionary.
+        Objects can be given as list of dictionaries or as dictionary
+        of column arrays (see iomodule.load_columnar). Columns are
+        validated and loaded straight into the engine, which is
+        the only storage of the objects. objects() gives ObjectView
+        instances reading and writing rows of the engine.
         Creates:
-            CentralObject: central object of the simulation.
-            Object: objects of the simulation.
+            CentralBodies: central bodies of the simulation.
+            Engine: objects of the simulation.
+            Particles: test particles, optional "particles" field
+                given as list of dictionaries or dictionary of column
+                arrays with x, y, vx, vy. They feel gravity but exert
+                none, see ParticleBlock.
             Scale: scale of the simulation.
             Time step: time step of the simulation.
             Image size: size of the image.
             G: gravitational constant.
+            Gravity: solver of mutual gravity of the objects,
+                chosen by optional "mutual_gravity" field.
+            Trajectory: description of the default trajectory sink,
+                optional "trajectory" field.
+            Integrator: numerical method, chosen by optional
+                "integrator" field.
+            Event log: destination of structured events, described by
+                optional "log" field. Disabled by default.
+            Executor: computes accelerations in chunks on a thread
+                pool, described by optional "parallel" field with
+                workers and chunk_size. Single-threaded by default.
+            Diagnostics: measurements of drift of energy and angular
+                momentum, described by optional "diagnostics" field,
+                see create_diagnostics. Disabled by default.
+            Swept collisions: optional "swept_collisions" field, if true
+                collisions are also found between ends of a step,
+                see simulate. Disabled by default.
+        Central object can be replaced by list of central bodies,
+        see create_central_bodies. Fields which are neither required
+        nor in iomodule.OPTIONAL_FIELDS are reported to the event log.
         """
-        self._central_object = CentralObject(
-            mass=config["central_mass"], radius=config["central_radius"]
+        self._central_bodies = create_central_bodies(config)
+        self._central_object = self._central_bodies.bodies()[0]
+        objects = config["objects"]
+        if not isinstance(objects, dict):
+            objects = to_columns(objects)
+        columns = validate_columns(objects)
+        self._engine = Engine(
+            np.column_stack((columns["x"], columns["y"])),
+            np.column_stack((columns["vx"], columns["vy"])),
+            columns["mass"],
+            columns["radius"],
         )
-        self._objects = []
-        for data in config["objects"]:
-            self._objects.append(
-                Object(
-                    pos_x=data["x"],
-                    pos_y=data["y"],
-                    mass=data["mass"],
-                    velocity_x=data.get("vx", 0),
-                    velocity_y=data.get("vy", 0),
-                )
-            )
+        self._particles = ParticleBlock.from_columns(
+            validate_particles(config.get("particles", []))
+        )
+        self._objects = None
+        self._tracked = {}
         self._scale = config["scale"]
         self._dt = config["time_step"]
         self._image_size = config["image_size"]
         self._G = 6.67430e-11
+        self._gravity = create_gravity(config)
+        self._trajectory = config.get("trajectory", {})
+        self._render = config.get("render", {})
+        self._animation = config.get("animation", {})
+        self._integrator = create_integrator(config)
+        self._time = 0.0
+        self._event_log = create_event_log(config.get("log", {}))
+        for field in unknown_fields(config):
+            self._event_log.log("info", "unknown_field", field=field)
+        self._parallel = config.get("parallel", {})
+        self._executor = create_executor(self._parallel)
+        self._progress = None
+        self._profiler = NullProfiler()
+        self._diagnostics = create_diagnostics(config.get("diagnostics", {}))
+        self._swept = bool(config.get("swept_collisions", False))
+
+    @classmethod
+    def from_checkpoint(cls, filename):
+        """
+        Create system from snapshot saved during simulate.
+        Next call of simulate continues the interrupted run from
+        the step the snapshot was taken at, with the same results
+        as if the run had never stopped.
+        Arguments:
+            filename (str): file of the snapshot.
+        Returns:
+            system (System): restored system.
+        """
+        meta, arrays = load_checkpoint(filename)
+        system = cls(meta["config"])
+        system._engine = Engine(
+            arrays["positions"],
+            arrays["velocities"],
+            arrays["masses"],
+            arrays["radii"],
+            arrays["ids"],
+        )
+        if "particle_positions" in arrays:
+            system._particles = ParticleBlock(
+                arrays["particle_positions"],
+                arrays["particle_velocities"],
+                arrays["particle_ids"],
+            )
+        system._objects = None
+        system._tracked = {}
+        system._time = meta["time"]
+        system.integrator().set_state(join_state("integrator", meta, arrays))
+        system.diagnostics().set_state(meta.get("diagnostics", {}))
+        system._progress = {
+            "step": meta["step"],
+            "collision_report": [
+                line if isinstance(line, str) else tuple(line)
+                for line in meta["collision_report"]
+            ],
+            "sink": join_state("sink", meta, arrays),
+        }
+        return system
 
     def central_object(self):
         """
-        Get central object of the simulation.
+        Get central object of the simulation, the first one
+        if there are several central bodies.
         """
         return self._central_object
 
+    def central_bodies(self):
+        """
+        Get all central bodies of the simulation.
+        """
+        return self._central_bodies
+
     def objects(self):
         """
         Get objects of the simulation.
         """
+        if self._objects is None:
+            self.sync_objects()
         return self._objects
 
+    def engine(self):
+        """
+        Get engine keeping objects of the simulation as numpy arrays.
+        """
+        return self._engine
+
+    def particles(self):
+        """
+        Get block of test particles of the simulation.
+        """
+        return self._particles
+
+    def sync_objects(self):
+        """
+        Update list of objects returned by objects() to objects
+        of the engine. Views of removed objects are dropped, views
+        are created for objects without one.
+        """
+        engine = self.engine()
+        objects = []
+        tracked = {}
+        for index in engine.ids().tolist():
+            obj = self._tracked.get(index)
+            if obj is None:
+                obj = ObjectView(engine, index)
+            tracked[index] = obj
+            objects.append(obj)
+        self._tracked = tracked
+        self._objects = objects
+
     def scale(self):
         """
         Get scale of the simulation.
@@ -80,58 +229,140 @@ class System:
         """
         return self._G
 
-    def create_image(self, trajectories):
+    def gravity(self):
         """
-        Create image with trajectories of the objects.
-        Method responsible for creating plot with trajecroties of the objects,
-        passed as arguments. It saves the plot as a png file.
-        To plot uses matplotlib library.
-        Arguments:
-            trajectories (dict): dictionary with x and y coordinates
-            of the objects.
+        Get solver of mutual gravity, None if objects attract
+        only central object.
         """
-        scale = self.scale()
+        return self._gravity
 
-        _, ax = plt.subplots(figsize=(8, 8))
-        if self.objects():
-            max_range = max(
-                max(abs(obj.pos_x()) for obj in self.objects()),
-                max(abs(obj.pos_y()) for obj in self.objects()),
-            )
-        else:
-            max_range = max(
-                max(abs(x) for x in trajectory["x"])
-                for trajectory in trajectories.values()
-            )
-        ax.set_xlim(-1.5 * max_range / scale, 1.5 * max_range / scale)
-        ax.set_ylim(-1.5 * max_range / scale, 1.5 * max_range / scale)
+    def integrator(self):
+        """
+        Get numerical method used to advance the objects.
+        """
+        return self._integrator
 
-        ax.scatter(0, 0, color="yellow", s=200, label="Obiekt centralny")
+    def event_log(self):
+        """
+        Get log receiving structured events of the simulation.
+        """
+        return self._event_log
 
-        for i, trajectory in trajectories.items():
-            trajectory_x = np.array(trajectory["x"]) / scale
-            trajectory_y = np.array(trajectory["y"]) / scale
+    def set_event_log(self, event_log):
+        """
+        Set log receiving structured events of the simulation.
+        """
+        self._event_log = event_log
 
-            ax.plot(
-                trajectory_x,
-                trajectory_y,
-                linestyle="--",
-                alpha=0.7,
-                label=f"Trajektoria {i + 1}",
-            )
+    def executor(self):
+        """
+        Get executor computing accelerations in chunks.
+        """
+        return self._executor
+
+    def set_executor(self, executor):
+        """
+        Set executor computing accelerations in chunks.
+        The previous executor is closed.
+        """
+        self._executor.close()
+        self._executor = executor
+        self._parallel = executor.config()["parallel"]
 
-        for i, obj in enumerate(self.objects()):
-            current_x = obj.pos_x() / scale
-            current_y = obj.pos_y() / scale
-            ax.scatter(current_x, current_y, s=50, label=f"Obiekt {i + 1}")
+    def profiler(self):
+        """
+        Get profiler measuring phases of the steps.
+        """
+        return self._profiler
+
+    def set_profiler(self, profiler):
+        """
+        Set profiler measuring phases of the steps,
+        None disables profiling.
+        """
+        self._profiler = profiler if profiler is not None else NullProfiler()
+
+    def diagnostics(self):
+        """
+        Get diagnostics measuring drift of conserved quantities.
+        """
+        return self._diagnostics
+
+    def set_diagnostics(self, diagnostics):
+        """
+        Set diagnostics measuring drift of conserved quantities,
+        None disables them.
+        """
+        if diagnostics is None:
+            diagnostics = NullDiagnostics()
+        self._diagnostics = diagnostics
+
+    def time(self):
+        """
+        Get simulated time in seconds.
+        """
+        return self._time
+
+    def create_image(self, trajectories, **options):
+        """
+        Create image with trajectories of the objects.
+        Method responsible for creating plot with trajecroties of the objects,
+        passed as arguments. It saves the plot as a png file.
+        To plot uses matplotlib library, see Renderer.
+        Arguments:
+            trajectories (dict | TrajectorySink): dictionary with x and y
+            coordinates of the objects or sink they were recorded to.
+            options: fields of the "render" configuration overriding
+                it, e.g. output, headless, legend or decimate.
+        Raster sink passed as trajectories saves its own image.
+        """
+        if isinstance(trajectories, RasterRenderer):
+            trajectories.save(options.get("output"))
+            return
+        if isinstance(trajectories, TrajectorySink):
+            trajectories = trajectories.trajectories()
+        config = dict(self._render)
+        config.update(
+            (name, value) for name, value in options.items()
+            if value is not None
+        )
+        renderer = create_renderer(config, self.scale(), self.image_size())
+        renderer.render(
+            trajectories, self._engine.positions(),
+            self.central_bodies().positions(),
+        )
 
-        ax.set_title("Symulacja ruchu grawitacyjnego")
-        ax.set_xlabel("Odległość (km) / skala")
-        ax.set_ylabel("Odległość (km) / skala")
-        ax.legend()
+    def create_sink(self):
+        """
+        Create trajectory sink described by "trajectory" field
+        of the config. Sink "raster" draws positions straight into
+        an image with options from "render" field.
+        Returns:
+            sink (TrajectorySink): new sink.
+        """
+        if self._trajectory.get("sink") == "raster":
+            config = dict(self._render, backend="raster")
+            return create_renderer(
+                config, self.scale(), self.image_size(),
+                stride=self._trajectory.get("stride", 1),
+            )
+        return create_sink(self._trajectory)
 
-        plt.savefig("simulation_result.png")
-        plt.show()
+    def create_animator(self, **options):
+        """
+        Create animator described by "animation" field of the config.
+        Arguments:
+            options: fields of the "animation" configuration
+                overriding it, e.g. path or every.
+        Returns:
+            animator (Animator): new animator.
+        """
+        config = dict(self._animation)
+        config.update(
+            (name, value) for name, value in options.items()
+            if value is not None
+        )
+        return create_animator(config, self.scale(), self.image_size())
 
     def save_collision_report(
         self, collision_report, filename="collision_report.txt"
@@ -147,163 +378,577 @@ class System:
             if collision_report:
                 f.write("Raport kolizji:\n")
                 for line in collision_report:
-                    f.write(line + "\n")
+                    f.write(str(line) + "\n")
             else:
                 f.write("Brak kolizji w czasie symulacji.\n")
 
-    def simulate(self, steps):
+    def checkpoint(self, step, sink, collision_report):
+        """
+        Collect everything needed to continue the run after given step.
+        Arguments:
+            step (int): number of steps already done.
+            sink (TrajectorySink): destination of trajectories.
+            collision_report (list): collision report so far.
+        Returns:
+            meta (dict): JSON serializable values.
+            arrays (dict): dictionary of numpy arrays.
+        """
+        engine = self.engine()
+        config = self.state(columnar=True)
+        config["objects"] = []
+        config.pop("particles", None)
+        meta = {
+            "config": config,
+            "step": step,
+            "time": self._time,
+            "collision_report": collision_report,
+        }
+        if self._diagnostics.enabled():
+            meta["diagnostics"] = self._diagnostics.state()
+        arrays = {
+            "positions": engine.positions(),
+            "velocities": engine.velocities(),
+            "masses": engine.masses(),
+            "radii": engine.radii(),
+            "ids": engine.ids(),
+            "particle_positions": self._particles.positions(),
+            "particle_velocities": self._particles.velocities(),
+            "particle_ids": self._particles.ids(),
+        }
+        split_state("integrator", self.integrator().state(), meta, arrays)
+        split_state("sink", sink.state(), meta, arrays)
+        return meta, arrays
+
+    def simulate(self, steps, sink=None, checkpointer=None):
         """
         Simulate the movement of the objects. Check for collisions.
         Creates trajectories of object and calculate forces for each object,
-        coming from central object. Updates positions, velocities.
+        coming from central object and, if mutual gravity is enabled,
+        from other objects. Updates positions, velocities.
         Creates raport of collisions.
+        All objects are advanced together on arrays of the engine,
+        Objects are views of rows of the engine, so they need
+        no copying. Test particles are advanced with the objects,
+        are not recorded to the sink and are removed when they hit
+        a central body, with one report line per step.
+        Objects touching each other or a central body after a step
+        are merged in one batch, see resolve_collisions, with a report
+        line for every colliding pair.
+        Positions are recorded to trajectory sink, by default created
+        from "trajectory" field of the config.
+        System created by from_checkpoint continues from the step
+        of the snapshot. Phases of the steps are measured by
+        the profiler, see set_profiler. Drift of energy and angular
+        momentum is measured by the diagnostics, which may halve
+        the time step or stop the run early, see set_diagnostics.
+        With swept collisions, objects and test particles are also
+        removed when they passed through a central body during a step,
+        and objects which passed through each other during a step
+        are merged, with time of the impact in the report line.
+        Arguments:
+            steps (int): number of steps to simulate.
+            sink (TrajectorySink): destination of trajectories.
+            checkpointer (Checkpointer): saves snapshots of the run.
+        Returns:
+            trajectories (dict): dictionary with x and y coordinates
+                read from the sink.
+            collision_report (list): list of strings with collision report.
+        """
+        run = self._run(steps, sink, checkpointer)
+        while True:
+            try:
+                next(run)
+            except StopIteration as stop:
+                return stop.value
+
+    def run(self, steps, sink=None, checkpointer=None, every=1,
+            energy=True):
+        """
+        Simulate like simulate, reporting progress while running.
+        Generator yields after every given number of steps and after
+        the last one, so the caller can show progress, hand control
+        to other work or stop the run by closing the generator.
+        A closed run closes the sink.
         Arguments:
             steps (int): number of steps to simulate.
+            sink (TrajectorySink): destination of trajectories.
+            checkpointer (Checkpointer): saves snapshots of the run.
+            every (int): steps between progress reports.
+            energy (bool): include total energy, see energy().
+        Yields:
+            progress (dict): number of done steps, number of all steps,
+                simulated time, number of objects and test particles,
+                number of collision report entries and, if requested,
+                total energy.
+        Returns:
+            trajectories (dict): dictionary with x and y coordinates
+                read from the sink.
+            collision_report (list): list of strings with collision report.
+        """
+        run = self._run(steps, sink, checkpointer)
+        collisions = 0
+        while True:
+            try:
+                step, reported = next(run)
+            except StopIteration as stop:
+                return stop.value
+            collisions += len(reported)
+            if (step + 1) % every == 0 or step + 1 == steps:
+                progress = {
+                    "step": step + 1,
+                    "steps": steps,
+                    "time": self._time,
+                    "objects": self._engine.count(),
+                    "particles": self._particles.count(),
+                    "collisions": collisions,
+                }
+                if energy:
+                    progress["energy"] = self.energy()
+                yield progress
+
+    def iter_steps(self, steps=None, sink=None, checkpointer=None):
+        """
+        Simulate like simulate, yielding snapshot after every step.
+        Snapshots hold arrays of the engine instead of copies and
+        collision report entries of their step, so consumers can
+        analyse, render or stop the run at any step without keeping
+        its history.
+        Trajectories are not kept unless sink is given.
+        Arguments:
+            steps (int): number of steps to simulate. If None,
+                the run continues until the generator is closed.
+            sink (TrajectorySink): destination of trajectories.
+                default: NullSink
+            checkpointer (Checkpointer): saves snapshots of the run.
+        Yields:
+            snapshot (StepSnapshot): state after the step.
         Returns:
-            trajectories (dict): dictionary with x and y coordinates.
+            trajectories (dict): dictionary with x and y coordinates
+                read from the sink.
             collision_report (list): list of strings with collision report.
         """
+        if sink is None:
+            sink = NullSink()
+        run = self._run(steps, sink, checkpointer)
+        while True:
+            try:
+                step, collisions = next(run)
+            except StopIteration as stop:
+                return stop.value
+            yield StepSnapshot(
+                step + 1, self._time, self._engine, self._particles,
+                collisions,
+            )
 
-        objects = self.objects()
-        trajectories = {i: {"x": [], "y": []} for i in range(len(objects))}
+    def _run(self, steps, sink, checkpointer):
+        """
+        Generator doing the work of simulate. It yields number
+        of every finished step and collision report entries added
+        in it, and returns trajectories and the collision report.
+        If steps is None, it never returns.
+        """
+        engine = self.engine()
+        particles = self.particles()
+        central_bodies = self.central_bodies()
+        G = self.G()
+        dt = self.dt()
+        gravity = self.gravity()
+        integrator = self.integrator()
+        log = self.event_log()
+        profiler = self.profiler()
+        diagnostics = self.diagnostics()
+        swept = self._swept
+        previous = None
+        if sink is None:
+            sink = self.create_sink()
+        rows = None if steps is None else -(-steps // sink.stride())
+        sink.open(engine.ids(), rows=rows)
         collision_report = []
+        start = 0
+        if self._progress is not None:
+            start = self._progress["step"]
+            collision_report = list(self._progress["collision_report"])
+            sink.set_state(self._progress["sink"])
+            self._progress = None
+        if start == 0 and diagnostics.enabled():
+            diagnostics.measure(self, 0)
+
+        if steps is None:
+            numbers = itertools.count(start)
+        else:
+            numbers = range(start, steps)
+        for step in numbers:
+            profiler.begin_step(step, engine.count())
+            reported = len(collision_report)
+            if log.enabled("debug"):
+                log.log("debug", "step", step=step, objects=engine.count())
+
+            profiler.start("collide")
+            hits = central_bodies.hits(
+                engine.positions(), np.nan_to_num(engine.radii())
+            )
+            profiler.stop("collide")
+            self._remove_central_hits(step, hits, collision_report)
+
+            if particles.count():
+                profiler.start("collide")
+                hits = central_bodies.hits(particles.positions(), 0.0)
+                profiler.stop("collide")
+                self._cull_particles(step, hits >= 0, collision_report)
+
+            if swept:
+                previous = engine.positions()
+                previous_particles = particles.positions()
+                previous_centres = central_bodies.positions()
+                before = self._time
+            profiler.start("integrate")
+            self._time += engine.step(
+                dt, central_bodies, G, gravity, integrator, profiler,
+                particles, self._executor,
+            )
+            profiler.stop("integrate")
 
-        for step in range(steps):
-
-            for step in range(steps):
-                print(f"Krok {step}: liczba obiektów: {len(objects)}")
-                to_remove = []
-
-                for i, obj in enumerate(objects):
-
-                    r = self.calculate_distance(obj, self.central_object())
-
-                    if r < self.central_object().radius():
-                        print(
-                            f"Krok {step}: Obiekt {i+1} w kolizji z "
-                            f"centralnym!"
-                        )
-                        collision_report.append(
-                            f"Krok {step}: Obiekt {i+1} w kolizji z "
-                            f"centralnym!"
-                        )
-                        to_remove.append(i)
-                        continue
-
-                    dx = self.central_object().pos_x() - obj.pos_x()
-                    dy = self.central_object().pos_y() - obj.pos_y()
-                    distance = math.sqrt(dx**2 + dy**2)
-                    force = (
-                        self.G()
-                        * self.central_object().mass()
-                        * obj.mass()
-                        / distance**2
+            if swept:
+                profiler.start("collide")
+                hits, fractions = central_bodies.swept_hits(
+                    previous, engine.positions(),
+                    np.nan_to_num(engine.radii()), previous_centres,
+                )
+                profiler.stop("collide")
+                times = before + fractions * (self._time - before)
+                self._remove_central_hits(
+                    step, hits, collision_report, times
+                )
+                previous = previous[hits < 0]
+                if particles.count():
+                    profiler.start("collide")
+                    hits, _ = central_bodies.swept_hits(
+                        previous_particles, particles.positions(), 0.0,
+                        previous_centres,
                     )
+                    profiler.stop("collide")
+                    self._cull_particles(step, hits >= 0, collision_report)
 
-                    ax = force * dx / distance / obj.mass()
-                    ay = force * dy / distance / obj.mass()
+            profiler.start("collide")
+            times = None
+            if swept:
+                collisions, fractions = self.swept_collisions(previous)
+                times = before + fractions * (self._time - before)
+            else:
+                collisions = self.check_collisions()
+            profiler.stop("collide")
+            self._merge_collisions(step, collisions, collision_report, times)
 
-                    print(f"Krok {step}: Obiekt {i+1} - ax: {ax}, ay: {ay}")
+            profiler.start("record")
+            sink.record(step, engine.ids(), engine.positions())
+            profiler.stop("record")
 
-                    new_vx = obj.velocity_x() + ax * self.dt()
-                    new_vy = obj.velocity_y() + ay * self.dt()
-                    obj.set_vel_x(new_vx)
-                    obj.set_vel_y(new_vy)
+            if log.enabled("trace"):
+                profiler.start("log")
+                for i, (x, y), (vx, vy) in zip(
+                    engine.ids(), engine.positions(), engine.velocities()
+                ):
+                    log.log(
+                        "trace", "object", step=step, object=int(i),
+                        x=float(x), y=float(y), vx=float(vx), vy=float(vy),
+                    )
+                profiler.stop("log")
 
-                    print(f"Krok {step}: Obiekt {i+1} - vx: {new_vx}, "
-                          f"vy: {new_vy}")
+            record = None
+            if diagnostics.due(step + 1):
+                profiler.start("diagnose")
+                record = diagnostics.measure(self, step + 1)
+                profiler.stop("diagnose")
+            if record is not None and record["action"] is not None:
+                log.log(
+                    "info", "drift", step=step + 1,
+                    energy_drift=record["energy_drift"],
+                    momentum_drift=record["momentum_drift"],
+                    action=record["action"],
+                )
+                if record["action"] == "halve":
+                    self._dt = dt = dt / 2
+                    integrator.halve()
+                    integrator.reset()
 
-                    new_x = obj.pos_x() + new_vx * self.dt()
-                    new_y = obj.pos_y() + new_vy * self.dt()
-                    obj.set_pos_x(new_x)
-                    obj.set_pos_y(new_y)
+            if checkpointer is not None and checkpointer.due(step + 1):
+                checkpointer.save(
+                    *self.checkpoint(step + 1, sink, collision_report)
+                )
+                log.log(
+                    "info", "checkpoint", step=step + 1,
+                    path=checkpointer.path(),
+                )
+            profiler.end_step()
+            try:
+                yield step, collision_report[reported:]
+            except GeneratorExit:
+                sink.close()
+                self._objects = None
+                profiler.finish()
+                raise
+            if record is not None and record["action"] == "abort":
+                break
+
+        sink.close()
+        self._objects = None
+        profiler.finish()
 
-                    print(f"Krok {step}: Obiekt {i+1} - x: {new_x}, "
-                          f"y: {new_y}")
+        return sink.trajectories(), collision_report
 
-                    trajectories[i]["x"].append(new_x)
-                    trajectories[i]["y"].append(new_y)
+    def _remove_central_hits(self, step, hits, collision_report,
+                             times=None):
+        """
+        Report objects hitting central bodies and remove them.
+        Arguments:
+            step (int): number of the step.
+            hits (numpy.ndarray): (N,) array with number of the body
+                hit by every object, -1 if none.
+            collision_report (list): report receiving the lines.
+            times (numpy.ndarray): (N,) array with times of impacts,
+                None if they are not known.
+        """
+        engine = self.engine()
+        central_bodies = self.central_bodies()
+        log = self.event_log()
+        inside = hits >= 0
+        for row in np.flatnonzero(inside):
+            i, body = engine.ids()[row], hits[row]
+            message = f"Krok {step}: Obiekt {i+1} w kolizji z centralnym"
+            if central_bodies.count() > 1:
+                message += f" {body+1}"
+            details = {}
+            if times is not None:
+                message += f" w chwili {times[row]:.6g} s"
+                details["time"] = float(times[row])
+            message += "!"
+            collision_report.append(message)
+            log.log(
+                "info", "central_collision", step=step, object=int(i),
+                body=int(body), message=message, **details,
+            )
+        if inside.any():
+            profiler = self.profiler()
+            profiler.start("merge")
+            engine.remove(inside)
+            self.integrator().reset()
+            profiler.stop("merge")
 
-                for index in sorted(to_remove, reverse=True):
-                    objects.pop(index)
+    def _merge_collisions(self, step, collisions, collision_report,
+                          times=None):
+        """
+        Report colliding objects and merge them in one batch.
+        Arguments:
+            step (int): number of the step.
+            collisions (list): list of tuples with rows of colliding
+                objects, see check_collisions.
+            collision_report (list): report receiving the lines.
+            times (numpy.ndarray): times of the collisions, None if
+                they are not known.
+        """
+        if not collisions:
+            return
+        ids = self.engine().ids()
+        several = self.central_bodies().count() > 1
+        log = self.event_log()
+        for number, (i, j) in enumerate(collisions):
+            first = int(ids[i])
+            message = f"Krok {step}: Obiekt {first+1} w kolizji z "
+            if j < 0:
+                message += "centralnym"
+                if several:
+                    message += f" {-j}"
+                details = {"object": first, "body": -1 - j}
+            else:
+                second = int(ids[j])
+                message += f"obiektem {second+1}"
+                details = {"first": first, "second": second}
+            if times is not None:
+                message += f" w chwili {times[number]:.6g} s"
+                details["time"] = float(times[number])
+            message += "!"
+            collision_report.append(message)
+            log.log(
+                "info", "central_collision" if j < 0 else "collision",
+                step=step, message=message, **details,
+            )
+        profiler = self.profiler()
+        profiler.start("merge")
+        self.resolve_collisions(collisions)
+        profiler.stop("merge")
 
-            collisions = self.check_collisions()
-            if collisions:
-                for i, j in collisions:
-                    if j == -1:
-                        self.central_object().set_mass(
-                            self.central_object().mass() +
-                            self._objects[i].mass()
-                        )
-                        self._objects.pop(i)
-                    else:
-                        self.merge_objects(i, j)
-                collision_report.extend(collisions)
+    def _cull_particles(self, step, culled, collision_report):
+        """
+        Remove test particles which hit central bodies, with one
+        report line for all of them.
+        Arguments:
+            step (int): number of the step.
+            culled (numpy.ndarray): (P,) boolean array, True for
+                particles to remove.
+            collision_report (list): report receiving the line.
+        """
+        if not culled.any():
+            return
+        profiler = self.profiler()
+        profiler.start("merge")
+        number = int(np.count_nonzero(culled))
+        message = f"Krok {step}: {number} cząstek w kolizji z centralnym!"
+        collision_report.append(message)
+        self.event_log().log(
+            "info", "particle_collision", step=step, particles=number,
+            message=message,
+        )
+        self.particles().remove(culled)
+        self.integrator().reset()
+        profiler.stop("merge")
 
-            return trajectories, collision_report
+    def energy(self):
+        """
+        Calculate total energy of the objects, and of central bodies
+        if they move. Potential energy of pairs of objects is included
+        only with mutual gravity and is computed by its solver.
+        Test particles have no mass and no energy.
+        Returns:
+            energy (float): kinetic and potential energy.
+        """
+        engine = self.engine()
+        central_bodies = self.central_bodies()
+        energy = engine.kinetic_energy() + engine.potential_energy(
+            central_bodies, self.G(), self.gravity()
+        )
+        if central_bodies.moving():
+            energy += central_bodies.energy(self.G())
+        return energy
 
-    def check_collisions(self):
+    def check_collisions(self, previous=None):
         """
         Check for collisions between objects and central object.
-        Creates dictionary with pixels and checks for collisions.
+        Objects are put into a spatial hash, then every pair from
+        the same or neighbouring cells is checked against sum of radii.
+        With process executor, every worker checks pairs starting
+        in its partition of the objects.
+        Objects without radius are treated as one pixel (scale) wide
+        when hitting each other and as points when hitting
+        central object.
+        Arguments:
+            previous (numpy.ndarray): (N, 2) array with positions
+                at the beginning of the last step, pairs which passed
+                through each other during it are also found,
+                see swept_collisions. default: None
         Returns:
-            collisions (list): list of tuples with indexs of objects colliding.
+            collisions (list): list of tuples with indexs of objects colliding,
+                index -1 means central object, -k-1 means k-th
+                central body.
         """
-        pixels = {}
-        collisions = []
+        if previous is not None:
+            return self.swept_collisions(previous)[0]
+        collisions = self._executor.colliding_pairs(
+            self.engine().positions(), self._sizes()
+        )
+        return collisions + self._central_contacts()
+
+    def swept_collisions(self, previous):
+        """
+        Check for collisions like check_collisions, also finding objects
+        which passed through each other during the last step.
+        The spatial hash gets middles of the segments with radii widened
+        by half of their length, then every pair is solved for
+        the first moment its distance equals sum of the radii.
+        Arguments:
+            previous (numpy.ndarray): (N, 2) array with positions
+                at the beginning of the last step.
+        Returns:
+            collisions (list): list of tuples with indexes of objects
+                colliding, see check_collisions.
+            fractions (numpy.ndarray): part of the step passed before
+                every collision, 1 for objects touching a central body
+                at its end.
+        """
+        sizes = self._sizes()
+        end = self.engine().positions()
+        half = 0.5 * np.sqrt(np.sum((end - previous)**2, axis=1))
+        pairs = np.array(
+            self._executor.colliding_pairs(
+                0.5 * (previous + end), sizes + half
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        first, second = pairs[:, 0], pairs[:, 1]
+        fractions = first_contact(
+            previous, end, first, second, sizes[first] + sizes[second]
+        )
+        touching = ~np.isnan(fractions)
+        collisions = [(int(i), int(j)) for i, j in pairs[touching]]
+        central = self._central_contacts()
+        fractions = np.concatenate(
+            (fractions[touching], np.ones(len(central)))
+        )
+        return collisions + central, fractions
 
-        for i, obj in enumerate(self.objects()):
-            pixel_x = int(obj.pos_x() / self.scale())
-            pixel_y = int(obj.pos_y() / self.scale())
+    def _sizes(self):
+        """
+        Get radii of the objects used for collisions between them,
+        half of the scale for objects without radius.
+        """
+        radii = self.engine().radii()
+        return np.where(np.isnan(radii), self.scale() / 2, radii)
 
-            pixel_key = (pixel_x, pixel_y)
-            if pixel_key in pixels:
-                collisions.append((pixels[pixel_key], i))
-            else:
-                pixels[pixel_key] = i
+    def _central_contacts(self):
+        """
+        Get list of tuples with indexes of objects touching central
+        bodies and numbers of the bodies, see check_collisions.
+        """
+        engine = self.engine()
+        hits = self.central_bodies().hits(
+            engine.positions(), np.nan_to_num(engine.radii()), inclusive=True
+        )
+        return [
+            (int(i), -1 - int(hits[i])) for i in np.flatnonzero(hits >= 0)
+        ]
 
-            if (
-                self.calculate_distance(obj, self.central_object())
-                <= self.central_object().radius()
-            ):
-                collisions.append((i, -1))
-        return collisions
+    def resolve_collisions(self, collisions):
+        """
+        Merge all colliding objects at once.
+        Colliding objects are grouped into connected components,
+        so chains and clusters are merged in one operation,
+        conserving mass and momentum. Groups touching a central
+        body are absorbed, increasing its mass.
+        Indexes refer to rows of the engine before the call.
+        Arguments:
+            collisions (list): list of tuples with indexes of objects
+                colliding, index -1 means central object, -k-1 means
+                k-th central body.
+        """
+        engine = self.engine()
+        pairs = np.array(
+            [(i, j) for i, j in collisions if j >= 0], dtype=np.int64
+        ).reshape(-1, 2)
+        absorbed = np.full(engine.count(), -1, dtype=np.int64)
+        for i, j in collisions:
+            if j < 0:
+                absorbed[i] = -1 - j
+        _, masses, momenta = engine.merge(
+            pairs[:, 0], pairs[:, 1], absorbed
+        )
+        self.central_bodies().absorb(masses, momenta)
+        self.integrator().reset()
+        self._objects = None
 
     def merge_objects(self, i, j):
         """
         Method responsible for merging two objects.
         Creates new object with mass, position and velocity calculated
-        with conservation of momentum.
+        with conservation of momentum. Volume of the objects is kept,
+        if both radii are known.
         If one of the objects is central object, it increases its mass,
         without creating new object and changing its velocity.
         Arguments:
             i (int): index of the first object.
-            j (int): index of the second object."""
-        obj1 = self._objects[i]
-        obj2 = self._objects[j]
-
-        new_mass = obj1.mass() + obj2.mass()
-
-        new_x = (
-            (
-                obj1.pos_x() * obj1.mass() + obj2.pos_x() * obj2.mass()
-            ) / new_mass
-        )
-        new_y = (
-            obj1.pos_y() * obj1.mass() + obj2.pos_y() * obj2.mass()
-        ) / new_mass
-
-        new_vx = (
-            obj1.velocity_x() * obj1.mass() + obj2.velocity_x() * obj2.mass()
-        ) / new_mass
-        new_vy = (
-            obj1.velocity_y() * obj1.mass() + obj2.velocity_y() * obj2.mass()
-        ) / new_mass
-
-        new_obj = Object(new_x, new_y, new_mass, new_vx, new_vy)
-
-        self._objects[i] = new_obj
-        self._objects.pop(j)
+            j (int): index of the second object, -1 means central
+                object, -k-1 means k-th central body."""
+        if i < 0:
+            i, j = j, i
+        self.resolve_collisions([(i, j)])
 
     def calculate_distance(self, obj1, obj2):
         """
@@ -318,31 +963,71 @@ class System:
         dy = obj1.pos_y() - obj2.pos_y()
         return (dx**2 + dy**2) ** 0.5
 
+    def state(self, columnar=False):
+        """
+        Get state of the simulation as a config dictionary.
+        State is read from the engine, so no Object instances are needed.
+        Test particles, if any, are given as dictionary of columns,
+        lists of numbers unless columnar.
+        Arguments:
+            columnar (bool): give objects as dictionary of column arrays
+                instead of list of dictionaries.
+        Returns:
+            state (dict): dictionary in format accepted by System.
+        """
+        engine = self.engine()
+        columns = {
+            "x": engine.positions()[:, 0].copy(),
+            "y": engine.positions()[:, 1].copy(),
+            "vx": engine.velocities()[:, 0].copy(),
+            "vy": engine.velocities()[:, 1].copy(),
+            "mass": engine.masses().copy(),
+            "radius": engine.radii().copy(),
+        }
+        state = self.central_bodies().config()
+        state.update({
+            "scale": float(self.scale()),
+            "image_size": self.image_size(),
+            "time_step": float(self.dt()),
+            "objects": columns if columnar else from_columns(columns),
+        })
+        if self._particles.count():
+            particles = self._particles.columns()
+            if not columnar:
+                particles = {
+                    column: values.tolist()
+                    for column, values in particles.items()
+                }
+            state["particles"] = particles
+        if self.gravity() is not None:
+            state.update(self.gravity().config())
+        if self.integrator().name != "euler":
+            state.update(self.integrator().config())
+        if self._trajectory:
+            state["trajectory"] = self._trajectory
+        if self._render:
+            state["render"] = self._render
+        if self._animation:
+            state["animation"] = self._animation
+        if self._parallel:
+            state["parallel"] = self._parallel
+        state.update(self._diagnostics.config())
+        if self._swept:
+            state["swept_collisions"] = True
+        return state
+
     def save_state(self, filename="simulation_state.json"):
         """
         Save state of the simulation to a file.
         In format of json file to be able to load it
-        into the simulation later.
+        into the simulation later. Files ending with ".npz"
+        are saved in columnar binary format.
         Attributes:
             filename (str): name of the file to save the state.
                 default: "simulation_state.json"
         """
-        state = {
-            "central_mass": float(self.central_object().mass()),
-            "central_radius": float(self.central_object().radius()),
-            "scale": float(self.scale()),
-            "image_size": self.image_size(),
-            "time_step": float(self.dt()),
-            "objects": [
-                {
-                    "x": float(obj.pos_x()),
-                    "y": float(obj.pos_y()),
-                    "vx": float(obj.velocity_x()),
-                    "vy": float(obj.velocity_y()),
-                    "mass": float(obj.mass()),
-                }
-                for obj in self.objects()
-            ],
-        }
+        if str(filename).endswith(".npz"):
+            save_columnar(filename, self.state(columnar=True))
+            return
         with open(filename, "w") as f:
-            json.dump(state, f, indent=4)
+            json.dump(self.state(), f, indent=4)
@@ -0,0 +1,501 @@
+from errors import MalformedDataError
+import numpy as np
+import json
+import os
+
+
+class TrajectorySink:
+    """
+    Base class for destinations of recorded trajectories.
+    A sink is opened with indexes of all objects, then receives
+    positions of living objects after every step and keeps
+    every stride-th of them.
+    Attributes:
+        stride (int): only steps divisible by stride are recorded.
+    """
+
+    def __init__(self, stride=1):
+        """
+        Initialize the sink with given recording stride.
+        Raises:
+            ValueError: if stride is less than 1.
+        """
+        if stride < 1:
+            raise ValueError("Stride must be a positive integer")
+        self._stride = stride
+        self._ids = np.empty(0, dtype=np.int64)
+        self._offset = 0
+
+    def stride(self):
+        """
+        Get recording stride.
+        """
+        return self._stride
+
+    def ids(self):
+        """
+        Get indexes of objects recorded by the sink.
+        """
+        return self._ids
+
+    def offset(self):
+        """
+        Get number of rows recorded so far.
+        """
+        return self._offset
+
+    def open(self, ids, rows=None):
+        """
+        Prepare the sink for recording objects with given indexes.
+        Arguments:
+            ids (numpy.ndarray): sorted indexes of all recorded objects.
+            rows (int): expected number of recorded rows, if known.
+        """
+        self._ids = np.array(ids, dtype=np.int64)
+
+    def record(self, step, ids, positions):
+        """
+        Record positions after given step, if step is divisible by stride.
+        Arguments:
+            step (int): number of the step.
+            ids (numpy.ndarray): indexes of living objects.
+            positions (numpy.ndarray): (len(ids), 2) array with positions.
+        """
+        if step % self._stride:
+            return
+        row = np.full((len(self._ids), 2), np.nan)
+        row[np.searchsorted(self._ids, ids)] = positions
+        self._write(step, row)
+        self._offset += 1
+
+    def _write(self, step, row):
+        """
+        Store single row of positions, one for every recorded object.
+        """
+        pass
+
+    def flush(self):
+        """
+        Write data buffered by the sink.
+        """
+        pass
+
+    def close(self):
+        """
+        Flush data kept by the sink.
+        """
+        self.flush()
+
+    def state(self):
+        """
+        Get dictionary with values needed to continue recording.
+        """
+        return {"ids": self._ids.copy(), "offset": self._offset}
+
+    def set_state(self, state):
+        """
+        Restore values returned by state() in an opened sink.
+        """
+        self._ids = np.array(state["ids"], dtype=np.int64)
+        self._offset = int(state["offset"])
+
+    def trajectories(self):
+        """
+        Get recorded trajectories.
+        Returns:
+            trajectories (dict): dictionary with arrays of x and y
+                coordinates of every recorded object.
+        """
+        return {}
+
+
+class NullSink(TrajectorySink):
+    """
+    Sink discarding all trajectories.
+    """
+    pass
+
+
+class MemorySink(TrajectorySink):
+    """
+    Sink keeping trajectories in numpy ring buffer.
+    When buffer is full, the oldest rows are overwritten, so memory
+    does not grow with length of the simulation. By default
+    the buffer grows with the recording up to MAX_BYTES, so long
+    runs keep only their latest rows. Keeping every row
+    is requested with unbounded.
+    Attributes:
+        capacity (int): number of rows kept, the buffer is allocated
+            at once. default: None, as many rows as fit in MAX_BYTES.
+        stride (int): only steps divisible by stride are recorded.
+        unbounded (bool): keep every recorded row, growing the buffer
+            without limit. default: False
+    """
+
+    MAX_BYTES = 64 * 2**20
+    INITIAL_ROWS = 1024
+
+    def __init__(self, capacity=None, stride=1, unbounded=False):
+        """
+        Initialize the sink with given capacity and stride.
+        """
+        super().__init__(stride)
+        self._capacity = capacity
+        self._unbounded = unbounded
+        self._limit = capacity
+        self._buffer = np.empty((0, 0, 2))
+        self._steps = np.empty(0, dtype=np.int64)
+
+    def capacity(self):
+        """
+        Get largest number of rows kept by the sink, None if unbounded.
+        """
+        return self._limit
+
+    def unbounded(self):
+        """
+        Check if the sink keeps every recorded row.
+        """
+        return self._unbounded
+
+    def open(self, ids, rows=None):
+        """
+        Allocate ring buffer for objects with given indexes.
+        Buffer of given capacity is allocated at once, otherwise
+        it starts with expected number of rows, at most INITIAL_ROWS
+        if it is not known, and grows while recording.
+        """
+        super().open(ids, rows)
+        size = rows or self.INITIAL_ROWS
+        if self._capacity is not None:
+            self._limit = size = self._capacity
+        elif self._unbounded:
+            self._limit = None
+        else:
+            row_bytes = 16 * max(len(self._ids), 1)
+            self._limit = max(self.MAX_BYTES // row_bytes, 1)
+            size = min(size, self._limit)
+        self._allocate(max(size, 1))
+        self._offset = 0
+
+    def _allocate(self, size):
+        """
+        Resize ring buffer to given number of rows, keeping
+        rows recorded so far.
+        """
+        buffer = np.full((size, len(self._ids), 2), np.nan)
+        steps = np.zeros(size, dtype=np.int64)
+        kept = min(len(self._buffer), size, self._offset)
+        if kept and self._buffer.shape[1:] == buffer.shape[1:]:
+            buffer[:kept] = self._buffer[:kept]
+            steps[:kept] = self._steps[:kept]
+        self._buffer = buffer
+        self._steps = steps
+
+    def _write(self, step, row):
+        """
+        Store row in the ring buffer, growing it if it is full
+        and below its limit.
+        """
+        size = len(self._buffer)
+        if self._offset >= size and (
+            self._limit is None or size < self._limit
+        ):
+            size = 2 * size
+            if self._limit is not None:
+                size = min(size, self._limit)
+            self._allocate(size)
+        slot = self._offset % size
+        self._buffer[slot] = row
+        self._steps[slot] = step
+
+    def _order(self):
+        """
+        Get slots of the ring buffer in chronological order.
+        """
+        size = len(self._buffer)
+        if self._offset <= size:
+            return np.arange(self._offset)
+        start = self._offset % size
+        return (np.arange(size) + start) % size
+
+    def state(self):
+        state = super().state()
+        state["buffer"] = self._buffer.copy()
+        state["steps"] = self._steps.copy()
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self._buffer = np.array(state["buffer"], dtype=np.float64)
+        self._steps = np.array(state["steps"], dtype=np.int64)
+        if self._limit is not None:
+            self._limit = max(self._limit, len(self._buffer))
+
+    def steps(self):
+        """
+        Get numbers of recorded steps in chronological order.
+        """
+        return self._steps[self._order()]
+
+    def trajectories(self):
+        """
+        Get trajectories kept in the ring buffer.
+        """
+        return split_trajectories(self._ids, self._buffer[self._order()])
+
+
+class ChunkedFileSink(TrajectorySink):
+    """
+    Sink appending trajectories to binary files in a directory.
+    Rows are buffered in memory and written as numbered .npy chunks,
+    information about the recording is kept in meta.json file.
+    Attributes:
+        path (str): directory with chunks.
+        chunk_size (int): number of rows in a single chunk.
+    """
+
+    def __init__(self, path, chunk_size=1024, stride=1):
+        """
+        Initialize the sink writing to given directory.
+        """
+        super().__init__(stride)
+        self._path = path
+        self._chunk_size = chunk_size
+        self._rows = []
+        self._steps = []
+        self._chunks = 0
+
+    def path(self):
+        """
+        Get directory with chunks.
+        """
+        return self._path
+
+    def open(self, ids, rows=None):
+        """
+        Create directory and metadata file for the recording.
+        """
+        super().open(ids, rows)
+        os.makedirs(self._path, exist_ok=True)
+        self._rows = []
+        self._steps = []
+        self._chunks = 0
+        self._offset = 0
+        self._write_meta()
+
+    def _chunk_path(self, number, kind):
+        """
+        Get path of chunk file with given number.
+        """
+        return os.path.join(self._path, f"{kind}_{number:06d}.npy")
+
+    def _write_meta(self):
+        """
+        Save metadata describing recorded chunks.
+        """
+        meta = {
+            "ids": self._ids.tolist(),
+            "stride": self._stride,
+            "chunk_size": self._chunk_size,
+            "chunks": self._chunks,
+        }
+        with open(os.path.join(self._path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def _write(self, step, row):
+        """
+        Buffer the row, write a chunk when buffer is full.
+        """
+        self._rows.append(row)
+        self._steps.append(step)
+        if len(self._rows) >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered rows as a new chunk.
+        """
+        if not self._rows:
+            return
+        np.save(self._chunk_path(self._chunks, "positions"),
+                np.array(self._rows))
+        np.save(self._chunk_path(self._chunks, "steps"),
+                np.array(self._steps, dtype=np.int64))
+        self._chunks += 1
+        self._rows = []
+        self._steps = []
+        self._write_meta()
+
+    def state(self):
+        """
+        Get offset and number of chunks, buffered rows are written first.
+        """
+        self.flush()
+        state = super().state()
+        state["chunks"] = self._chunks
+        return state
+
+    def set_state(self, state):
+        """
+        Continue recording after given number of chunks.
+        Chunks written after the state was taken are removed.
+        """
+        super().set_state(state)
+        self._chunks = int(state["chunks"])
+        self._rows = []
+        self._steps = []
+        number = self._chunks
+        while os.path.exists(self._chunk_path(number, "positions")):
+            os.remove(self._chunk_path(number, "positions"))
+            if os.path.exists(self._chunk_path(number, "steps")):
+                os.remove(self._chunk_path(number, "steps"))
+            number += 1
+        self._write_meta()
+
+    def trajectories(self):
+        """
+        Read trajectories from all written chunks.
+        """
+        self.flush()
+        return read_chunks(self._path)
+
+
+class TeeSink(TrajectorySink):
+    """
+    Sink passing positions to several sinks, each with its own
+    stride. Trajectories are read from the first of them.
+    Attributes:
+        sinks (list): list of TrajectorySink.
+    """
+
+    def __init__(self, *sinks):
+        """
+        Initialize the sink with given sinks.
+        """
+        super().__init__()
+        self._sinks = list(sinks)
+
+    def sinks(self):
+        """
+        Get sinks the positions are passed to.
+        """
+        return self._sinks
+
+    def open(self, ids, rows=None):
+        super().open(ids, rows)
+        for sink in self._sinks:
+            sink.open(ids, None if rows is None else -(-rows // sink.stride()))
+
+    def record(self, step, ids, positions):
+        for sink in self._sinks:
+            sink.record(step, ids, positions)
+        self._offset += 1
+
+    def flush(self):
+        for sink in self._sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self._sinks:
+            sink.close()
+
+    def state(self):
+        state = super().state()
+        for number, sink in enumerate(self._sinks):
+            for name, value in sink.state().items():
+                state[f"{number}/{name}"] = value
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        for number, sink in enumerate(self._sinks):
+            sink.set_state(
+                {
+                    name[len(f"{number}/"):]: value
+                    for name, value in state.items()
+                    if name.startswith(f"{number}/")
+                }
+            )
+
+    def trajectories(self):
+        if not self._sinks:
+            return {}
+        return self._sinks[0].trajectories()
+
+
+def split_trajectories(ids, table):
+    """
+    Turn table of recorded rows into dictionary of trajectories.
+    Rows recorded after object was removed are skipped.
+    Arguments:
+        ids (numpy.ndarray): indexes of objects, one for every column.
+        table (numpy.ndarray): (rows, len(ids), 2) array with positions.
+    Returns:
+        trajectories (dict): dictionary with arrays of x and y
+            coordinates of every object.
+    """
+    trajectories = {}
+    for column, index in enumerate(ids):
+        points = table[:, column]
+        points = points[~np.isnan(points[:, 0])]
+        trajectories[int(index)] = {"x": points[:, 0], "y": points[:, 1]}
+    return trajectories
+
+
+def read_chunks(path):
+    """
+    Read trajectories written by ChunkedFileSink.
+    Arguments:
+        path (str): directory with chunks.
+    Returns:
+        trajectories (dict): dictionary with arrays of x and y
+            coordinates of every recorded object.
+    """
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        meta = json.load(f)
+    chunks = [
+        np.load(os.path.join(path, f"positions_{number:06d}.npy"),
+                mmap_mode="r")
+        for number in range(meta["chunks"])
+    ]
+    if chunks:
+        table = np.concatenate(chunks)
+    else:
+        table = np.empty((0, len(meta["ids"]), 2))
+    return split_trajectories(meta["ids"], table)
+
+
+def create_sink(config):
+    """
+    Create trajectory sink described by the config dictionary.
+    Uses fields:
+        sink (str): "memory", "file" or "none". default: "memory"
+        stride (int): record every stride-th step. default: 1
+        capacity (int): rows kept by memory sink. default: as many
+            as fit in MemorySink.MAX_BYTES.
+        unbounded (bool): memory sink keeps every row. default: False
+        path (str): directory of file sink. default: "trajectories"
+        chunk_size (int): rows in a chunk of file sink. default: 1024
+    Returns:
+        sink (TrajectorySink): new sink.
+    Raises:
+        MalformedDataError: if sink has unknown value.
+    """
+    kind = config.get("sink", "memory")
+    stride = config.get("stride", 1)
+    if kind == "memory":
+        return MemorySink(
+            capacity=config.get("capacity"),
+            stride=stride,
+            unbounded=config.get("unbounded", False),
+        )
+    if kind == "file":
+        return ChunkedFileSink(
+            path=config.get("path", "trajectories"),
+            chunk_size=config.get("chunk_size", 1024),
+            stride=stride,
+        )
+    if kind == "none":
+        return NullSink(stride=stride)
+    raise MalformedDataError(f"Unknown trajectory sink '{kind}'.")
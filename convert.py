@@ -0,0 +1,22 @@
+from iomodule import convert_state
+import argparse
+import sys
+
+
+def main(arguments):
+    """
+    Convert state file between JSON and columnar npz formats.
+    Format of every file is chosen by its extension.
+    Usage: python3 convert.py [source] [target]
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", type=str, help="File to convert")
+    parser.add_argument(
+        "target", type=str, help="Converted file, .npz or .json"
+    )
+    args = parser.parse_args(arguments)
+    convert_state(args.source, args.target)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,221 @@
+"""
+Ensemble runner for parameter sweeps over a configuration file.
+Usage: python3 ensemble.py -c [config_file] -g [grid_file] -s [steps]
+    -w [workers] -o [output_dir]
+Grid file is a JSON dictionary mapping fields of the configuration
+to lists of values. Nested fields are written with dots,
+e.g. "objects.0.vx", or "objects.vx.0" for columnar objects.
+Fields missing from the configuration are rejected, unless they
+are optional fields of System, see iomodule.OPTIONAL_FIELDS
+and iomodule.OPTIONAL_COLUMNS. Field
+"velocity_scale" multiplies velocities of all objects.
+"""
+from classes.system import System
+from classes.trajectory_sink import NullSink
+from iomodule import load_config, OPTIONAL_FIELDS, OPTIONAL_COLUMNS
+from errors import MalformedDataError
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import argparse
+import copy
+import itertools
+import json
+import os
+import sys
+import time
+
+
+def load_grid(file_path):
+    """
+    Load parameter grid from JSON file.
+    Raises:
+        MalformedDataError: if file is not a dictionary of lists.
+    """
+    try:
+        with open(file_path, "r") as f:
+            grid = json.load(f)
+    except json.JSONDecodeError:
+        raise MalformedDataError(
+            f"File {file_path} is not a valid JSON file"
+        )
+    if not isinstance(grid, dict) or not all(
+        isinstance(values, list) and values for values in grid.values()
+    ):
+        raise MalformedDataError(
+            f"Grid in {file_path} must map fields to lists of values."
+        )
+    return grid
+
+
+def set_field(config, field, value):
+    """
+    Set field of the configuration, given as dotted path.
+    Only fields from OPTIONAL_FIELDS, with sections they contain,
+    and fields from OPTIONAL_COLUMNS of single objects may be missing.
+    Raises:
+        MalformedDataError: if path does not exist in the configuration.
+    """
+    if field == "velocity_scale":
+        scale_velocities(config["objects"], value)
+        return
+    *parents, last = field.split(".")
+    optional = (parents or [last])[0] in OPTIONAL_FIELDS or (
+        len(parents) == 2 and parents[0] == "objects"
+        and last in OPTIONAL_COLUMNS
+    )
+    target = config
+    try:
+        for key in parents:
+            if isinstance(target, list):
+                target = target[int(key)]
+            elif optional and key in OPTIONAL_FIELDS:
+                target = target.setdefault(key, {})
+            else:
+                target = target[key]
+        if isinstance(target, list):
+            target[int(last)] = value
+        elif last in target or optional:
+            target[last] = value
+        else:
+            raise KeyError(last)
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise MalformedDataError(f"Field '{field}' not found in config.")
+
+
+def scale_velocities(objects, scale):
+    """
+    Multiply velocities of objects given as list of dictionaries
+    or as dictionary of columns.
+    """
+    if isinstance(objects, dict):
+        for key in ("vx", "vy"):
+            if key in objects:
+                column = np.multiply(objects[key], scale)
+                if isinstance(objects[key], list):
+                    column = column.tolist()
+                objects[key] = column
+        return
+    for data in objects:
+        for key in ("vx", "vy"):
+            data[key] = data.get(key, 0) * scale
+
+
+def expand_grid(config, grid):
+    """
+    Create configuration for every combination of grid values.
+    Arguments:
+        config (dict): base configuration.
+        grid (dict): dictionary mapping fields to lists of values.
+    Returns:
+        variants (list): list of tuples (parameters, config).
+    """
+    fields = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[field] for field in fields)):
+        parameters = dict(zip(fields, values))
+        variant = copy.deepcopy(config)
+        for field, value in parameters.items():
+            set_field(variant, field, value)
+        variants.append((parameters, variant))
+    return variants
+
+
+def run_variant(task):
+    """
+    Simulate single variant and save its state and collision report
+    in its own directory.
+    Arguments:
+        task (tuple): index, parameters, config, steps and output
+            directory of the ensemble.
+    Returns:
+        summary (dict): parameters, final state and collisions.
+    """
+    index, parameters, config, steps, output_dir = task
+    directory = os.path.join(output_dir, f"variant_{index:05d}")
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    system = System(config)
+    _, collision_report = system.simulate(steps, NullSink())
+    wall_time = time.perf_counter() - start
+    state_file = os.path.join(directory, "state.json")
+    report_file = os.path.join(directory, "collision_report.txt")
+    system.save_state(state_file)
+    system.save_collision_report(collision_report, report_file)
+    return {
+        "index": index,
+        "parameters": parameters,
+        "objects": len(system.objects()),
+        "central_mass": system.central_object().mass(),
+        "time": system.time(),
+        "wall_time": wall_time,
+        "collisions": [
+            line if isinstance(line, str) else list(line)
+            for line in collision_report
+        ],
+        "state_file": state_file,
+        "report_file": report_file,
+    }
+
+
+def run_ensemble(config, grid, steps, output_dir, workers=None):
+    """
+    Simulate every variant of the grid on a pool of processes.
+    Summary of all variants is saved to summary.json in output_dir.
+    Arguments:
+        config (dict): base configuration.
+        grid (dict): dictionary mapping fields to lists of values.
+        steps (int): number of steps of every simulation.
+        output_dir (str): directory for results of the variants.
+        workers (int): number of processes. default: number of CPUs.
+    Returns:
+        summary (list): list of summaries of the variants.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [
+        (index, parameters, variant, steps, output_dir)
+        for index, (parameters, variant) in enumerate(
+            expand_grid(config, grid)
+        )
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summary = list(executor.map(run_variant, tasks))
+    with open(os.path.join(output_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+
+def main(arguments):
+    """
+    Parse command line arguments and run the ensemble.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-c", "--config", type=str, required=True,
+        help="Path to the base configuration file"
+    )
+    parser.add_argument(
+        "-g", "--grid", type=str, required=True,
+        help="Path to the JSON file with parameter grid"
+    )
+    parser.add_argument(
+        "-s", "--steps", type=int, required=True,
+        help="Number of steps to simulate"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, required=False,
+        help="Number of worker processes, default: number of CPUs"
+    )
+    parser.add_argument(
+        "-o", "--output", type=str, required=False, default="ensemble",
+        help="Directory for results"
+    )
+    args = parser.parse_args(arguments)
+    summary = run_ensemble(
+        load_config(args.config), load_grid(args.grid), args.steps,
+        args.output, args.workers,
+    )
+    print(f"Zakończono {len(summary)} symulacji, wyniki w {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
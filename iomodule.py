@@ -1,8 +1,65 @@
 import json
-from errors import MalformedDataError
+import numpy as np
+from errors import MalformedDataError, NegativeMassError, NegativeRadiusError
+
+
+REQUIRED_FIELDS = [
+    "central_mass",
+    "central_radius",
+    "scale",
+    "image_size",
+    "time_step",
+    "objects",
+]
+
+CENTRAL_FIELDS = ["central_mass", "central_radius"]
+
+OPTIONAL_FIELDS = [
+    "central_bodies",
+    "central_moving",
+    "central_grid",
+    "particles",
+    "mutual_gravity",
+    "softening",
+    "opening_angle",
+    "integrator",
+    "tolerance",
+    "absolute_tolerance",
+    "max_time_step",
+    "max_level",
+    "accuracy",
+    "trajectory",
+    "render",
+    "animation",
+    "log",
+    "parallel",
+    "diagnostics",
+    "swept_collisions",
+]
+
+COLUMNS = ["x", "y", "vx", "vy", "mass", "radius"]
+
+REQUIRED_COLUMNS = ["x", "y", "mass"]
+
+OPTIONAL_COLUMNS = ["vx", "vy", "radius"]
+
+PARTICLE_COLUMNS = ["x", "y", "vx", "vy"]
+
+PARTICLE_PREFIX = "particle_"
 
 
 def load_config(file_path):
+    """
+    Load configuration of the simulation.
+    Files ending with ".npz" are read as columnar state, see
+    load_columnar, other files are read as JSON.
+    Raises:
+        FileNotFoundError: if file does not exist.
+        MalformedDataError: if file is not valid or misses
+            required fields.
+    """
+    if str(file_path).endswith(".npz"):
+        return load_columnar(file_path)
     try:
         with open(file_path, "r") as f:
             config = json.load(f)
@@ -12,17 +69,267 @@ def load_config(file_path):
         raise MalformedDataError(
             f"File {file_path} is not a valid JSON file"
         )
-    required_fields = [
-        "central_mass",
-        "central_radius",
-        "scale",
-        "image_size",
-        "time_step",
-        "objects",
-    ]
-    for field in required_fields:
+    check_required_fields(config)
+    return config
+
+
+def check_required_fields(config):
+    """
+    Check that configuration has all required fields.
+    Fields of the central object are not needed, if list
+    of central bodies is given.
+    Raises:
+        MalformedDataError: if a field is missing.
+    """
+    for field in REQUIRED_FIELDS:
+        if field in CENTRAL_FIELDS and "central_bodies" in config:
+            continue
         if field not in config:
             raise MalformedDataError(
                 f"Missing required field '{field}' in configuration file."
             )
+
+
+def unknown_fields(config):
+    """
+    Get fields of the configuration which are neither required
+    nor optional, so they are not read by System.
+    Returns:
+        fields (list): sorted names of unknown fields.
+    """
+    known = set(REQUIRED_FIELDS) | set(OPTIONAL_FIELDS)
+    return sorted(field for field in config if field not in known)
+
+
+def validate_columns(objects):
+    """
+    Check columns of objects with vectorized operations.
+    Columns vx, vy default to 0, radius defaults to NaN (unknown).
+    Arguments:
+        objects (dict): dictionary of arrays with columns x, y, mass
+            and optional vx, vy, radius.
+    Returns:
+        objects (dict): dictionary with all columns as float64 arrays.
+    Raises:
+        MalformedDataError: if a column is missing, columns have
+            different lengths or values are not finite. Message
+            lists offending indexes.
+        NegativeMassError: if mass is less or equal to 0.
+        NegativeRadiusError: if radius is less or equal to 0.
+    """
+    for column in REQUIRED_COLUMNS:
+        if column not in objects:
+            raise MalformedDataError(f"Missing column '{column}' of objects.")
+    try:
+        count = len(objects["mass"])
+        columns = {
+            column: np.asarray(objects[column], dtype=np.float64).reshape(-1)
+            for column in COLUMNS if column in objects
+        }
+    except (TypeError, ValueError):
+        raise MalformedDataError("Columns of objects must be numeric.")
+    columns.setdefault("vx", np.zeros(count))
+    columns.setdefault("vy", np.zeros(count))
+    columns.setdefault("radius", np.full(count, np.nan))
+    for column, values in columns.items():
+        if len(values) != count:
+            raise MalformedDataError(
+                f"Column '{column}' has {len(values)} values, "
+                f"expected {count}."
+            )
+        bad = ~np.isfinite(values)
+        if column == "radius":
+            bad &= ~np.isnan(values)
+        if bad.any():
+            raise MalformedDataError(
+                f"Column '{column}' has invalid values at indexes "
+                f"{_indexes(bad)}."
+            )
+    bad = columns["mass"] <= 0
+    if bad.any():
+        raise NegativeMassError(
+            f"Mass is not positive at indexes {_indexes(bad)}."
+        )
+    bad = columns["radius"] <= 0
+    if bad.any():
+        raise NegativeRadiusError(
+            f"Radius is not positive at indexes {_indexes(bad)}."
+        )
+    return columns
+
+
+def validate_particles(particles):
+    """
+    Check columns of test particles with vectorized operations.
+    Particles have no mass and no radius, columns vx, vy default to 0.
+    Arguments:
+        particles (dict | list): dictionary of arrays with columns x, y
+            and optional vx, vy, or list of dictionaries with them.
+    Returns:
+        particles (dict): dictionary with all columns as float64 arrays.
+    Raises:
+        MalformedDataError: if a column is missing, columns have
+            different lengths or values are not finite.
+    """
+    if isinstance(particles, list):
+        particles = {
+            column: [data.get(column, 0.0) for data in particles]
+            for column in PARTICLE_COLUMNS
+        }
+    for column in ("x", "y"):
+        if column not in particles:
+            raise MalformedDataError(
+                f"Missing column '{column}' of particles."
+            )
+    try:
+        count = len(particles["x"])
+        columns = {
+            column: np.asarray(particles[column], dtype=np.float64)
+            .reshape(-1)
+            for column in PARTICLE_COLUMNS if column in particles
+        }
+    except (TypeError, ValueError):
+        raise MalformedDataError("Columns of particles must be numeric.")
+    columns.setdefault("vx", np.zeros(count))
+    columns.setdefault("vy", np.zeros(count))
+    for column, values in columns.items():
+        if len(values) != count:
+            raise MalformedDataError(
+                f"Column '{column}' of particles has {len(values)} "
+                f"values, expected {count}."
+            )
+        bad = ~np.isfinite(values)
+        if bad.any():
+            raise MalformedDataError(
+                f"Column '{column}' of particles has invalid values "
+                f"at indexes {_indexes(bad)}."
+            )
+    return columns
+
+
+def _indexes(mask, limit=10):
+    """
+    Format indexes selected by mask, at most limit of them.
+    """
+    indexes = np.flatnonzero(mask)
+    text = ", ".join(str(index) for index in indexes[:limit])
+    if len(indexes) > limit:
+        text += f" and {len(indexes) - limit} more"
+    return text
+
+
+def load_columnar(file_path):
+    """
+    Load configuration from columnar npz file.
+    The file has one array per column of objects and "meta" array
+    with JSON of the other fields of the configuration. Columns
+    of test particles, if any, are stored with "particle_" prefix.
+    Returns:
+        config (dict): configuration with "objects" field, and
+            "particles" field if there are particles, being
+            dictionaries of validated column arrays.
+    Raises:
+        FileNotFoundError: if file does not exist.
+        MalformedDataError: if file is not valid.
+    """
+    try:
+        with np.load(file_path) as archive:
+            config = json.loads(str(archive["meta"]))
+            config["objects"] = {
+                column: archive[column]
+                for column in COLUMNS if column in archive.files
+            }
+            particles = {
+                column: archive[PARTICLE_PREFIX + column]
+                for column in PARTICLE_COLUMNS
+                if PARTICLE_PREFIX + column in archive.files
+            }
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File {file_path} not found")
+    except (OSError, ValueError, KeyError):
+        raise MalformedDataError(
+            f"File {file_path} is not a valid columnar state file"
+        )
+    check_required_fields(config)
+    config["objects"] = validate_columns(config["objects"])
+    if particles:
+        config["particles"] = validate_particles(particles)
     return config
+
+
+def to_columns(objects):
+    """
+    Turn list of object dictionaries into dictionary of column arrays.
+    Missing radius is stored as NaN.
+    """
+    columns = {column: np.empty(len(objects)) for column in COLUMNS}
+    defaults = {"vx": 0.0, "vy": 0.0, "radius": np.nan}
+    for index, data in enumerate(objects):
+        for column in COLUMNS:
+            value = data.get(column, defaults.get(column))
+            columns[column][index] = np.nan if value is None else value
+    return columns
+
+
+def from_columns(columns):
+    """
+    Turn dictionary of column arrays into list of object dictionaries.
+    Radius is left out where it is NaN.
+    """
+    objects = []
+    for index in range(len(columns["mass"])):
+        data = {
+            column: float(columns[column][index])
+            for column in ("x", "y", "vx", "vy", "mass")
+        }
+        radius = columns["radius"][index]
+        if not np.isnan(radius):
+            data["radius"] = float(radius)
+        objects.append(data)
+    return objects
+
+
+def save_columnar(file_path, config):
+    """
+    Save configuration as columnar npz file.
+    Arguments:
+        file_path (str): path of the file.
+        config (dict): configuration, objects given as list
+            of dictionaries or dictionary of columns.
+    """
+    objects = config["objects"]
+    if isinstance(objects, list):
+        objects = to_columns(objects)
+    columns = validate_columns(objects)
+    if "particles" in config:
+        particles = validate_particles(config["particles"])
+        columns.update(
+            (PARTICLE_PREFIX + column, values)
+            for column, values in particles.items()
+        )
+    meta = {
+        key: value for key, value in config.items()
+        if key not in ("objects", "particles")
+    }
+    with open(file_path, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **columns)
+
+
+def convert_state(source, target):
+    """
+    Convert state file between JSON and columnar npz formats.
+    Format of every file is chosen by its extension.
+    """
+    config = load_config(source)
+    if str(target).endswith(".npz"):
+        save_columnar(target, config)
+        return
+    if isinstance(config["objects"], dict):
+        config["objects"] = from_columns(config["objects"])
+    if "particles" in config:
+        config["particles"] = {
+            column: np.asarray(values).tolist()
+            for column, values in config["particles"].items()
+        }
+    with open(target, "w") as f:
+        json.dump(config, f, indent=4)
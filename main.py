@@ -1,6 +1,14 @@
 from classes.system import System
+from classes.integrator import INTEGRATORS
+from classes.event_log import EventLog, create_event_log
+from classes.checkpoint import Checkpointer
+from classes.trajectory_sink import TeeSink
+from classes.profiler import Profiler
+from classes.executor import create_executor
+from classes.diagnostics import Diagnostics
 from iomodule import load_config
 import argparse
+import os
 import sys
 
 
@@ -8,7 +16,14 @@ def main(arguments):
     """
     Main function of the program.
     It parses the command line arguments, loads the configuration file
-    Usage: python3 main.py -s [steps] -c [config_file]
+    Usage: python3 main.py -s [steps] -c [config_file] -i [integrator]
+        [--checkpoint file --checkpoint-every steps] [--resume file]
+        [--headless] [--image file] [--no-legend]
+        [--animate file --animate-every steps]
+        [--profile file --profile-window first last --profile-memory]
+        [--workers threads --chunk-size rows --processes]
+        [--diagnostics steps --drift-threshold value
+         --drift-action action --diagnostics-file file] [--swept]
     """
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -19,7 +34,7 @@ def main(arguments):
     parser.add_argument(
         "-c", "--config", type=str,
         help="Path to the configuration file",
-        required=True
+        required=False
     )
     parser.add_argument(
         "-o", "--output", type=str,
@@ -30,13 +45,198 @@ def main(arguments):
         "--state", type=str, help="State file", required=False,
         default="state.json"
     )
+    parser.add_argument(
+        "-i", "--integrator", type=str, required=False,
+        choices=sorted(INTEGRATORS),
+        help="Numerical method, overrides the configuration file"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true",
+        help="Do not write any log events"
+    )
+    parser.add_argument(
+        "--log-level", type=str, required=False,
+        choices=sorted(EventLog.LEVELS, key=EventLog.LEVELS.get),
+        help="Level of log events, overrides the configuration file"
+    )
+    parser.add_argument(
+        "--log-file", type=str, required=False,
+        help="File for log events, default: standard error"
+    )
+    parser.add_argument(
+        "--checkpoint", type=str, required=False,
+        help="Snapshot file, JSON if it ends with .json, binary otherwise"
+    )
+    parser.add_argument(
+        "--checkpoint-every", type=int, required=False,
+        help="Number of steps between snapshots"
+    )
+    parser.add_argument(
+        "--checkpoint-seconds", type=float, required=False,
+        help="Number of seconds between snapshots"
+    )
+    parser.add_argument(
+        "--resume", type=str, required=False,
+        help="Snapshot file to continue the simulation from"
+    )
+    parser.add_argument(
+        "--headless", action="store_true",
+        help="Save the image without displaying it"
+    )
+    parser.add_argument(
+        "--image", type=str, required=False,
+        help="Image file, overrides the configuration file"
+    )
+    parser.add_argument(
+        "--no-legend", action="store_true",
+        help="Do not draw the legend"
+    )
+    parser.add_argument(
+        "--animate", type=str, required=False,
+        help="Animation file (.gif) or directory for png frames"
+    )
+    parser.add_argument(
+        "--animate-every", type=int, required=False,
+        help="Number of steps between frames of the animation"
+    )
+    parser.add_argument(
+        "--profile", type=str, nargs="?", const="profile.json",
+        required=False,
+        help="Print time of phases and save counters to file"
+    )
+    parser.add_argument(
+        "--profile-window", type=int, nargs=2, required=False,
+        metavar=("FIRST", "LAST"),
+        help="Capture steps [FIRST, LAST) with cProfile"
+    )
+    parser.add_argument(
+        "--profile-memory", action="store_true",
+        help="Capture profiling window with tracemalloc"
+    )
+    parser.add_argument(
+        "--workers", type=int, required=False,
+        help="Number of threads computing accelerations"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, required=False,
+        help="Number of objects in a chunk computed by a thread"
+    )
+    parser.add_argument(
+        "--processes", action="store_true",
+        help="Split objects between processes sharing memory"
+    )
+    parser.add_argument(
+        "--diagnostics", type=int, nargs="?", const=100, required=False,
+        help="Number of steps between measurements of energy drift"
+    )
+    parser.add_argument(
+        "--drift-threshold", type=float, required=False,
+        help="Largest allowed relative drift of energy"
+    )
+    parser.add_argument(
+        "--drift-action", type=str, required=False, default="report",
+        choices=Diagnostics.ACTIONS,
+        help="What to do when drift exceeds the threshold"
+    )
+    parser.add_argument(
+        "--diagnostics-file", type=str, required=False,
+        help="File for drift time series, default: next to the report"
+    )
+    parser.add_argument(
+        "--swept", action="store_true",
+        help="Find collisions also between ends of a step"
+    )
     args = parser.parse_args(arguments)
-    config = load_config(args.config)
-    system = System(config)
-    trajectories, collision_report = system.simulate(args.steps)
-    system.create_image(trajectories)
+    if args.config is None and args.resume is None:
+        parser.error("one of the arguments -c/--config --resume is required")
+    if args.resume and (args.integrator or args.swept):
+        parser.error(
+            "arguments -i/--integrator and --swept are not allowed with "
+            "--resume, the run continues with its checkpoint configuration"
+        )
+    log_config = {}
+    if args.resume:
+        system = System.from_checkpoint(args.resume)
+    else:
+        config = load_config(args.config)
+        if args.integrator:
+            config["integrator"] = args.integrator
+        log_config = config.setdefault("log", {})
+        if args.swept:
+            config["swept_collisions"] = True
+    if args.log_level:
+        log_config["level"] = args.log_level
+    if args.log_file:
+        log_config["path"] = args.log_file
+    if args.quiet:
+        log_config["level"] = "off"
+    if args.resume:
+        system.set_event_log(create_event_log(log_config))
+    else:
+        system = System(config)
+    checkpointer = None
+    if args.checkpoint:
+        checkpointer = Checkpointer(
+            args.checkpoint, args.checkpoint_every, args.checkpoint_seconds
+        )
+    if args.profile:
+        system.set_profiler(
+            Profiler(args.profile_window, memory=args.profile_memory)
+        )
+    if args.workers or args.chunk_size or args.processes:
+        parallel = system.executor().config()["parallel"]
+        if args.workers:
+            parallel["workers"] = args.workers
+        if args.chunk_size:
+            parallel["chunk_size"] = args.chunk_size
+        if args.processes:
+            parallel["backend"] = "process"
+        system.set_executor(create_executor(parallel))
+    if args.diagnostics:
+        diagnostics = Diagnostics(
+            args.diagnostics, args.drift_threshold, action=args.drift_action
+        )
+        if args.resume:
+            diagnostics.set_state(system.diagnostics().state())
+        system.set_diagnostics(diagnostics)
+    sink = system.create_sink()
+    simulation_sink = sink
+    if args.animate:
+        simulation_sink = TeeSink(
+            sink,
+            system.create_animator(
+                path=args.animate, every=args.animate_every
+            ),
+        )
+    _, collision_report = system.simulate(
+        args.steps, simulation_sink, checkpointer=checkpointer
+    )
+    system.create_image(
+        sink,
+        output=args.image,
+        headless=args.headless or None,
+        legend=False if args.no_legend else None,
+    )
     system.save_collision_report(collision_report, args.output)
     system.save_state(args.state)
+    diagnostics = system.diagnostics()
+    if diagnostics.enabled():
+        diagnostics_file = args.diagnostics_file or (
+            os.path.splitext(args.output)[0] + "_diagnostics.json"
+        )
+        diagnostics.save(diagnostics_file)
+        summary = diagnostics.summary()
+        print(
+            f"Największy dryf energii: {summary['max_energy_drift']:.3e}, "
+            f"krok czasowy: {summary['time_step']}"
+        )
+        if summary["aborted"]:
+            print("Symulacja przerwana, dryf energii przekroczył próg!")
+    system.event_log().close()
+    system.executor().close()
+    if args.profile:
+        print(system.profiler().summary())
+        system.profiler().dump(args.profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""
+Simulation service reading JSON requests from standard input.
+Usage: python3 service.py [-w workers]
+Every line of input is a JSON dictionary with "command" field, see
+SimulationService.handle, e.g.
+    {"command": "submit", "config": "config.json", "steps": 10000,
+     "every": 500, "stream": true}
+    {"command": "status", "job": 1}
+    {"command": "cancel", "job": 1}
+Every reply is written as a single JSON line. Jobs submitted with
+"stream" also write their progress reports as they arrive.
+Service ends at the end of input, after running jobs finish.
+"""
+from classes.service import SimulationService
+import argparse
+import asyncio
+import json
+import sys
+
+
+def write(message, output=None):
+    """
+    Write message as a single JSON line.
+    """
+    output = output or sys.stdout
+    output.write(json.dumps(message) + "\n")
+    output.flush()
+
+
+def stream(job, progress):
+    """
+    Write progress report of a streamed job.
+    """
+    write({"job": job, "progress": progress})
+
+
+async def serve(service, lines):
+    """
+    Handle requests read by the lines coroutine until it returns
+    empty string, then wait for running jobs.
+    """
+    while True:
+        line = await lines()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            write({"error": "Request is not a valid JSON"})
+            continue
+        if not isinstance(request, dict):
+            write({"error": "Request must be a dictionary"})
+            continue
+        listener = stream if request.get("stream") else None
+        write(await service.handle(request, listener))
+    for job in service.jobs():
+        await service.wait(job)
+
+
+def main(arguments):
+    """
+    Parse command line arguments and serve requests from stdin.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-w", "--workers", type=int, required=False, default=2,
+        help="Number of threads computing simulations"
+    )
+    args = parser.parse_args(arguments)
+    service = SimulationService(args.workers)
+
+    async def lines():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, sys.stdin.readline)
+
+    try:
+        asyncio.run(serve(service, lines))
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
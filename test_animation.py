@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from PIL import Image
+from classes.animation import (
+    Animator,
+    FrameWriter,
+    GifWriter,
+    create_animator,
+)
+from classes.trajectory_sink import MemorySink, TeeSink
+from errors import MalformedDataError
+
+
+def record_orbit(sink, steps):
+    ids = np.array([0, 1])
+    sink.open(ids, rows=steps)
+    for step in range(steps):
+        angle = step / 10
+        positions = np.array(
+            [[np.cos(angle), np.sin(angle)], [2 * np.sin(angle), 0.5]]
+        ) * 1e6
+        sink.record(step, ids, positions)
+    sink.close()
+
+
+def test_gif_writer_streams_frames(tmp_path):
+    path = tmp_path / "frames.gif"
+    writer = GifWriter(str(path), duration=50)
+    for value in range(5):
+        image = np.zeros((8, 12, 3), dtype=np.uint8)
+        image[:, value] = (255, 0, 0)
+        writer.append(image)
+    writer.close()
+    assert writer.frames() == 5
+    with Image.open(path) as gif:
+        assert gif.size == (12, 8)
+        assert gif.n_frames == 5
+        assert gif.info["duration"] == 50
+        gif.seek(3)
+        assert gif.convert("RGB").getpixel((3, 0)) == (255, 0, 0)
+
+
+def test_animator_writes_frame_every_stride(tmp_path):
+    path = tmp_path / "orbit.gif"
+    animator = create_animator(
+        {"path": str(path), "every": 4, "trail": 3}, 1e4, [120, 100]
+    )
+    record_orbit(animator, 20)
+    assert animator.writer().frames() == 5
+    with Image.open(path) as gif:
+        assert gif.size == (120, 100)
+        assert gif.n_frames == 5
+
+
+def test_animator_raster_frames(tmp_path):
+    animator = Animator(
+        1e4, [40, 30], FrameWriter(str(tmp_path / "frames")),
+        backend="raster", stride=5,
+    )
+    record_orbit(animator, 10)
+    assert sorted(p.name for p in (tmp_path / "frames").iterdir()) == [
+        "frame_000000.png", "frame_000001.png",
+    ]
+
+
+def test_animator_unknown_backend(tmp_path):
+    with pytest.raises(MalformedDataError):
+        Animator(1.0, [10, 10], FrameWriter(str(tmp_path)), backend="svg")
+
+
+def test_tee_sink_passes_rows_with_own_strides(tmp_path):
+    memory = MemorySink()
+    animator = create_animator(
+        {"path": str(tmp_path / "orbit.gif"), "every": 5}, 1e4, [50, 50]
+    )
+    tee = TeeSink(memory, animator)
+    record_orbit(tee, 10)
+    assert len(tee.trajectories()[0]["x"]) == 10
+    assert animator.writer().frames() == 2
+    state = tee.state()
+    assert state["0/offset"] == 10 and state["1/offset"] == 2
@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+from classes.central_bodies import (
+    AccelerationGrid,
+    CentralBodies,
+    create_central_bodies,
+    field,
+)
+from classes.central_object import CentralObject
+from classes.engine import Engine
+from classes.integrator import RungeKutta4
+from errors import MalformedDataError
+
+
+G = 6.67430e-11
+
+
+def binary(moving=True):
+    speed = np.sqrt(G * 1e30 / 4e11)
+    return CentralBodies(
+        [
+            CentralObject(1e30, 1e9, pos_x=-1e11),
+            CentralObject(1e30, 1e9, pos_x=1e11),
+        ],
+        [(0, -speed), (0, speed)],
+        moving,
+    )
+
+
+def test_single_body_matches_central_object():
+    central = CentralObject(1e24, 1e6, pos_x=5.0, pos_y=-3.0)
+    bodies = CentralBodies([central])
+    positions = np.array([[1e8, 2e8], [-3e7, 1e7]])
+    assert not bodies.moving()
+    assert np.allclose(
+        bodies.accelerations(positions, G),
+        central.accelerations(positions, G),
+    )
+
+
+def test_field_is_sum_of_bodies():
+    bodies = binary()
+    positions = np.array([[0.0, 3e11], [5e11, 0.0]])
+    expected = sum(
+        body.accelerations(positions, G) for body in bodies.bodies()
+    )
+    assert np.allclose(bodies.accelerations(positions, G), expected)
+
+
+def test_no_bodies():
+    with pytest.raises(MalformedDataError):
+        CentralBodies([])
+
+
+def test_binary_orbit_keeps_centre_of_mass():
+    bodies = binary()
+    engine = Engine([[0.0, 5e12]], [[0.0, 0.0]], [1.0])
+    integrator = RungeKutta4()
+    period = 2 * np.pi * 1e11 / bodies.velocities()[1, 1]
+    steps = 400
+    for _ in range(steps):
+        engine.step(period / steps, bodies, G, integrator=integrator)
+    positions = bodies.positions()
+    assert np.allclose(positions.sum(axis=0), 0.0, atol=1e3)
+    assert positions[1] == pytest.approx([1e11, 0.0], abs=1e8)
+    assert np.allclose(bodies.velocities().sum(axis=0), 0.0, atol=1e-6)
+    assert engine.positions()[0, 1] < 5e12
+
+
+def test_static_bodies_do_not_move():
+    bodies = binary(moving=False)
+    engine = Engine([[0.0, 5e11]], [[0.0, 0.0]], [1.0])
+    engine.step(1000.0, bodies, G)
+    assert bodies.positions().tolist() == [[-1e11, 0.0], [1e11, 0.0]]
+
+
+def test_grid_interpolates_field():
+    bodies = binary(moving=False)
+    bodies.set_grid(1025, 1e12)
+    rng = np.random.default_rng(1)
+    positions = rng.uniform(-9e11, 9e11, (1000, 2))
+    positions = positions[np.abs(positions[:, 0]) > 2e11]
+    exact = field(positions, bodies.positions(), bodies.masses(), G)
+    interpolated = bodies.accelerations(positions, G)
+    error = np.linalg.norm(interpolated - exact, axis=1)
+    assert np.all(error < 1e-2 * np.linalg.norm(exact, axis=1))
+
+
+def test_grid_uses_exact_field_near_bodies_and_outside():
+    bodies = binary(moving=False)
+    grid = AccelerationGrid(
+        bodies.positions(), bodies.masses(), bodies.radii(), G, 1e12, 65
+    )
+    positions = np.array([[1e11 + 2e9, 0.0], [3e12, 0.0], [0.0, 5e11]])
+    _, valid = grid.accelerations(positions)
+    assert valid.tolist() == [False, False, True]
+    bodies.set_grid(65, 1e12)
+    exact = field(positions, bodies.positions(), bodies.masses(), G)
+    result = bodies.accelerations(positions, G)
+    assert result[:2].tolist() == exact[:2].tolist()
+
+
+def test_grid_is_rebuilt_when_mass_changes():
+    bodies = CentralBodies([CentralObject(1e30, 1e9)])
+    bodies.set_grid(129, 1e12)
+    positions = np.array([[5e11, 0.0]])
+    before = bodies.accelerations(positions, G)
+    bodies.absorb(np.array([1e30]), np.zeros((1, 2)))
+    assert bodies.accelerations(positions, G) == pytest.approx(2 * before)
+
+
+def test_hits_give_lowest_body():
+    bodies = CentralBodies(
+        [CentralObject(1.0, 2.0), CentralObject(1.0, 2.0, pos_x=1.0)]
+    )
+    hits = bodies.hits(
+        np.array([[0.5, 0.0], [2.5, 0.0], [10.0, 0.0], [4.0, 0.0]]),
+        np.array([0.0, 0.0, 0.0, 1.0]),
+    )
+    assert hits.tolist() == [0, 1, -1, -1]
+
+
+def test_swept_hits_find_bodies_crossed_during_step():
+    bodies = CentralBodies(
+        [CentralObject(1.0, 1.0), CentralObject(1.0, 1.0, pos_x=10.0)],
+        moving=False,
+    )
+    start = np.array(
+        [[-5.0, 0.0], [-5.0, 3.0], [20.0, 0.0], [0.5, 0.0], [-5.0, 0.0]]
+    )
+    end = np.array(
+        [[5.0, 0.0], [5.0, 3.0], [-20.0, 0.0], [0.6, 0.0], [-3.0, 0.0]]
+    )
+    hits, fractions = bodies.swept_hits(start, end, np.array([0, 0, 0, 0, 1]))
+    assert hits.tolist() == [0, -1, 1, 0, -1]
+    assert fractions[0] == pytest.approx(0.4)
+    assert np.isnan(fractions[1])
+    assert fractions[2] == pytest.approx(9 / 40)
+    assert fractions[3] == 0.0
+    assert bodies.hits(end[:1], 0.0).tolist() == [-1]
+
+
+def test_swept_hits_follow_moving_bodies():
+    bodies = binary()
+    start_centres = bodies.positions() + np.array([[0, -2e10], [0, 2e10]])
+    start = np.array([[-1e11, -1e10]])
+    end = np.array([[-1e11, -1e10]])
+    hits, fractions = bodies.swept_hits(start, end, 0.0, start_centres)
+    assert hits.tolist() == [0]
+    assert fractions[0] == pytest.approx((1e10 - 1e9) / 2e10)
+    hits, _ = bodies.swept_hits(start, end, 0.0)
+    assert hits.tolist() == [-1]
+
+
+def test_absorb_conserves_momentum_of_moving_body():
+    bodies = binary()
+    momentum = bodies.velocities()[0] * 1e30 + np.array([1e30, 0.0])
+    bodies.absorb(np.array([1e29, 0.0]), np.array([[1e30, 0.0], [0, 0]]))
+    assert bodies.masses().tolist() == [1.1e30, 1e30]
+    assert bodies.velocities()[0] * 1.1e30 == pytest.approx(momentum)
+
+
+def test_create_central_bodies_and_config():
+    config = {
+        "central_bodies": [
+            {"x": 1.0, "y": 2.0, "vx": 3.0, "mass": 5.0, "radius": 1.0},
+            {"x": -1.0, "y": 0.0, "mass": 6.0, "radius": 2.0},
+        ],
+        "central_grid": {"size": 64, "extent": 10.0},
+    }
+    bodies = create_central_bodies(config)
+    assert bodies.moving()
+    assert bodies.velocities().tolist() == [[3.0, 0.0], [0.0, 0.0]]
+    assert create_central_bodies(bodies.config()).config() == (
+        bodies.config()
+    )
+    single = create_central_bodies({"central_mass": 2, "central_radius": 1})
+    assert single.config() == {"central_mass": 2.0, "central_radius": 1.0}
@@ -0,0 +1,162 @@
+import numpy as np
+import pytest
+from classes.checkpoint import (
+    Checkpointer,
+    save_checkpoint,
+    load_checkpoint,
+    split_state,
+    join_state,
+)
+from classes.system import System
+from classes.trajectory_sink import MemorySink, ChunkedFileSink
+
+
+class Interrupted(Exception):
+    pass
+
+
+class InterruptingCheckpointer(Checkpointer):
+    def save(self, meta, arrays):
+        super().save(meta, arrays)
+        raise Interrupted
+
+
+@pytest.fixture
+def config():
+    return {
+        "central_mass": 1e22,
+        "central_radius": 1e6,
+        "scale": 1e5,
+        "image_size": [800, 800],
+        "time_step": 60.0,
+        "integrator": "verlet",
+        "mutual_gravity": "direct",
+        "objects": [
+            {"x": 1e8, "y": 0, "mass": 1e20, "vx": 0, "vy": 80},
+            {"x": -2e8, "y": 5e7, "mass": 2e20, "vx": 10, "vy": -40},
+            {"x": 1.2e6, "y": 0, "mass": 1e3, "vx": -9e3, "vy": 0},
+        ],
+    }
+
+
+@pytest.mark.parametrize("name", ["run.ckpt", "run.json"])
+def test_save_and_load_checkpoint(tmp_path, name):
+    path = str(tmp_path / name)
+    arrays = {"a": np.array([[1.0, np.pi]]), "b": np.arange(3)}
+    save_checkpoint(path, {"step": 3}, arrays)
+    meta, loaded = load_checkpoint(path)
+    assert meta == {"step": 3}
+    assert np.array_equal(loaded["a"], arrays["a"])
+    assert loaded["b"].dtype == arrays["b"].dtype
+    assert not (tmp_path / f"{name}.tmp").exists()
+
+
+def test_load_missing_checkpoint(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_checkpoint(str(tmp_path / "missing.ckpt"))
+
+
+def test_split_and_join_state():
+    meta, arrays = {}, {}
+    split_state("sink", {"offset": 3, "ids": np.arange(2)}, meta, arrays)
+    assert meta == {"sink/offset": 3}
+    state = join_state("sink", meta, arrays)
+    assert state["offset"] == 3
+    assert state["ids"].tolist() == [0, 1]
+
+
+def test_checkpointer_due_every_steps(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path / "run.ckpt"), every_steps=5)
+    assert [step for step in range(1, 16) if checkpointer.due(step)] == [
+        5, 10, 15
+    ]
+
+
+def test_checkpointer_due_every_seconds(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path / "run.ckpt"), every_seconds=0)
+    assert checkpointer.due(1)
+    assert not Checkpointer(str(tmp_path / "run.ckpt")).due(1)
+
+
+@pytest.mark.parametrize("name", ["run.ckpt", "run.json"])
+def test_resume_is_exact(config, tmp_path, name):
+    expected = System(config)
+    trajectories, report = expected.simulate(30)
+
+    path = str(tmp_path / name)
+    interrupted = System(config)
+    with pytest.raises(Interrupted):
+        interrupted.simulate(
+            30, checkpointer=InterruptingCheckpointer(path, every_steps=12)
+        )
+    resumed = System.from_checkpoint(path)
+    resumed_trajectories, resumed_report = resumed.simulate(30)
+
+    assert resumed_report == report
+    assert resumed.time() == expected.time()
+    assert np.array_equal(
+        resumed.engine().positions(), expected.engine().positions()
+    )
+    assert np.array_equal(
+        resumed.engine().velocities(), expected.engine().velocities()
+    )
+    assert resumed.central_object().mass() == expected.central_object().mass()
+    for index, trajectory in trajectories.items():
+        assert np.array_equal(
+            resumed_trajectories[index]["x"], trajectory["x"]
+        )
+
+
+def test_resume_file_sink(config, tmp_path):
+    expected = System(config)
+    expected_trajectories, _ = expected.simulate(
+        30, ChunkedFileSink(str(tmp_path / "expected"), chunk_size=7)
+    )
+    path = str(tmp_path / "run.ckpt")
+    directory = str(tmp_path / "resumed")
+    with pytest.raises(Interrupted):
+        System(config).simulate(
+            30, ChunkedFileSink(directory, chunk_size=7),
+            InterruptingCheckpointer(path, every_steps=12),
+        )
+    resumed = System.from_checkpoint(path)
+    trajectories, _ = resumed.simulate(
+        30, ChunkedFileSink(directory, chunk_size=7)
+    )
+    for index, trajectory in expected_trajectories.items():
+        assert np.array_equal(trajectories[index]["y"], trajectory["y"])
+
+
+def test_memory_sink_state_survives_checkpoint(config, tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    with pytest.raises(Interrupted):
+        System(config).simulate(
+            30, MemorySink(capacity=5),
+            InterruptingCheckpointer(path, every_steps=12),
+        )
+    sink = MemorySink(capacity=5)
+    System.from_checkpoint(path).simulate(30, sink)
+    assert sink.steps().tolist() == [25, 26, 27, 28, 29]
+
+
+def test_resume_with_particles(config, tmp_path):
+    config["particles"] = {
+        "x": [1.5e8, 0.0, 1.1e6],
+        "y": [0.0, -1e8, 0.0],
+        "vx": [0.0, 70.0, -5e3],
+        "vy": [60.0, 0.0, 0.0],
+    }
+    expected = System(config)
+    _, report = expected.simulate(30)
+    path = str(tmp_path / "run.ckpt")
+    with pytest.raises(Interrupted):
+        System(config).simulate(
+            30, checkpointer=InterruptingCheckpointer(path, every_steps=12)
+        )
+    resumed = System.from_checkpoint(path)
+    _, resumed_report = resumed.simulate(30)
+    assert resumed_report == report
+    assert np.array_equal(
+        resumed.particles().positions(), expected.particles().positions()
+    )
+    assert resumed.particles().ids().tolist() == [0, 1]
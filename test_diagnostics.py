@@ -0,0 +1,162 @@
+import json
+import numpy as np
+import pytest
+from classes.checkpoint import Checkpointer
+from classes.diagnostics import (
+    Diagnostics,
+    NullDiagnostics,
+    create_diagnostics,
+    drift,
+)
+from classes.system import System
+from classes.trajectory_sink import NullSink
+from errors import MalformedDataError
+
+
+GM = 6.67430e-11 * 5.972e24
+
+
+def orbit_config(time_step=240, integrator="euler", diagnostics=None):
+    return {
+        "central_mass": 5.972e24,
+        "central_radius": 6.371e6,
+        "scale": 1e5,
+        "image_size": (100, 100),
+        "time_step": time_step,
+        "integrator": integrator,
+        "objects": [
+            {"x": 2e7, "y": 0, "vx": 0, "vy": np.sqrt(GM / 2e7),
+             "mass": 1000.0},
+            {"x": -3e7, "y": 0, "vx": 0, "vy": -1.1 * np.sqrt(GM / 3e7),
+             "mass": 500.0},
+        ],
+        "diagnostics": diagnostics or {"every": 10},
+    }
+
+
+def test_drift():
+    assert drift(1.1, 1.0) == pytest.approx(0.1)
+    assert drift(-0.9, -1.0) == pytest.approx(0.1)
+    assert drift(0.5, 0.0) == 0.5
+
+
+def test_create_diagnostics():
+    assert isinstance(create_diagnostics({}), NullDiagnostics)
+    diagnostics = create_diagnostics({"every": 5, "threshold": 1e-3})
+    assert diagnostics.enabled()
+    assert diagnostics.config() == {
+        "diagnostics": {"every": 5, "action": "report", "threshold": 1e-3}
+    }
+    with pytest.raises(MalformedDataError):
+        Diagnostics(every=0)
+    with pytest.raises(MalformedDataError):
+        Diagnostics(action="explode")
+
+
+def test_records_every_steps():
+    system = System(orbit_config())
+    system.simulate(50, NullSink())
+    records = system.diagnostics().records()
+    assert [record["step"] for record in records] == [0, 10, 20, 30, 40, 50]
+    assert records[0]["energy_drift"] == 0.0
+    assert records[-1]["energy"] == pytest.approx(
+        system.energy(), rel=1e-12
+    )
+    assert records[-1]["kinetic"] + records[-1]["potential"] == (
+        pytest.approx(records[-1]["energy"])
+    )
+    assert max(record["momentum_drift"] for record in records) < 1e-12
+
+
+def test_smaller_time_step_drifts_less():
+    drifts = []
+    for time_step, steps in ((240, 100), (60, 400)):
+        system = System(orbit_config(time_step))
+        system.simulate(steps, NullSink())
+        drifts.append(system.diagnostics().summary()["max_energy_drift"])
+    assert drifts[1] < drifts[0] / 4
+
+
+def test_halve_time_step():
+    system = System(orbit_config(diagnostics={
+        "every": 10, "threshold": 1e-3, "action": "halve",
+    }))
+    system.simulate(400, NullSink())
+    summary = system.diagnostics().summary()
+    assert summary["halved"] > 0
+    assert system.dt() == 240 / 2 ** summary["halved"]
+    assert summary["time_step"] == system.dt()
+    assert system.state()["time_step"] == system.dt()
+
+
+@pytest.mark.parametrize(
+    "integrator", ["euler", "leapfrog", "verlet", "rk4", "rk45", "block"]
+)
+def test_halve_shortens_steps_of_every_integrator(integrator):
+    system = System(orbit_config(integrator=integrator, diagnostics={
+        "every": 10, "threshold": 0.0, "action": "halve",
+    }))
+    times = [0.0]
+    for snapshot in system.iter_steps(40, NullSink()):
+        times.append(snapshot.time())
+    lengths = np.diff(times)
+    halved = [
+        record["step"] for record in system.diagnostics().records()
+        if record["action"] == "halve"
+    ]
+    assert halved[:2] == [10, 30]
+    for step in halved[:2]:
+        assert max(lengths[step:step + 10]) <= lengths[step - 1] / 1.999
+
+
+def test_abort_stops_run():
+    system = System(orbit_config(diagnostics={
+        "every": 10, "threshold": 1e-3, "action": "abort",
+    }))
+    system.simulate(400, NullSink())
+    records = system.diagnostics().records()
+    assert records[-1]["action"] == "abort"
+    assert records[-1]["energy_drift"] > 1e-3
+    assert system.time() == pytest.approx(records[-1]["step"] * 240)
+
+
+def test_min_time_step_aborts():
+    system = System(orbit_config(diagnostics={
+        "every": 10, "threshold": 1e-3, "action": "halve",
+        "min_time_step": 100,
+    }))
+    system.simulate(400, NullSink())
+    actions = [record["action"] for record in system.diagnostics().records()]
+    assert actions.count("halve") == 1
+    assert actions[-1] == "abort"
+    assert system.dt() == 120
+
+
+def test_baseline_restarts_after_collision():
+    config = orbit_config()
+    config["objects"].append({"x": 0, "y": 8e6, "vy": -1e4, "mass": 1e3})
+    system = System(config)
+    system.simulate(20, NullSink())
+    records = system.diagnostics().records()
+    assert [record["objects"] for record in records] == [3, 2, 2]
+    assert records[1]["energy_drift"] == 0.0
+
+
+def test_save_and_checkpoint(tmp_path):
+    system = System(orbit_config())
+    path = tmp_path / "snapshot.npz"
+    system.simulate(30, NullSink(), Checkpointer(str(path), every_steps=20))
+    system.diagnostics().save(tmp_path / "diagnostics.json")
+    with open(tmp_path / "diagnostics.json") as f:
+        saved = json.load(f)
+    assert saved["config"] == {"every": 10, "action": "report"}
+    assert len(saved["records"]) == 4
+    assert saved["summary"]["measurements"] == 4
+
+    resumed = System.from_checkpoint(str(path))
+    resumed.simulate(30, NullSink())
+    records = resumed.diagnostics().records()
+    assert [record["step"] for record in records] == [0, 10, 20, 30]
+    assert records[-1]["energy"] == pytest.approx(
+        system.diagnostics().records()[-1]["energy"], rel=1e-12
+    )
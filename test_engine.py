@@ -0,0 +1,138 @@
+import math
+import numpy as np
+import pytest
+from classes.engine import Engine, connected_components, forces
+from classes.gravity import DirectGravity
+from classes.central_object import CentralObject
+from classes.object import Object
+
+
+G = 6.67430e-11
+
+
+def euler_step(obj, central_object, dt):
+    dx = central_object.pos_x() - obj.pos_x()
+    dy = central_object.pos_y() - obj.pos_y()
+    distance = math.sqrt(dx**2 + dy**2)
+    force = G * central_object.mass() * obj.mass() / distance**2
+    ax = force * dx / distance / obj.mass()
+    ay = force * dy / distance / obj.mass()
+    obj.set_vel_x(obj.velocity_x() + ax * dt)
+    obj.set_vel_y(obj.velocity_y() + ay * dt)
+    obj.set_pos_x(obj.pos_x() + obj.velocity_x() * dt)
+    obj.set_pos_y(obj.pos_y() + obj.velocity_y() * dt)
+
+
+@pytest.fixture
+def objects():
+    return [
+        Object(1e8, 0, 1e3, 0, 80),
+        Object(-2e8, 5e7, 2e3, 10, -40),
+        Object(3e7, -9e7, 5e2, -120, 5),
+    ]
+
+
+def test_engine_from_objects(objects):
+    engine = Engine.from_objects(objects)
+    assert engine.count() == 3
+    assert engine.positions()[1].tolist() == [-2e8, 5e7]
+    assert engine.velocities()[2].tolist() == [-120, 5]
+    assert engine.masses().tolist() == [1e3, 2e3, 5e2]
+    assert engine.ids().tolist() == [0, 1, 2]
+
+
+def test_engine_step_matches_per_object_euler(objects):
+    central_object = CentralObject(1e22, 1e3)
+    engine = Engine.from_objects(objects)
+    for _ in range(100):
+        engine.step(60.0, central_object, G)
+        for obj in objects:
+            euler_step(obj, central_object, 60.0)
+    for row, obj in enumerate(objects):
+        assert engine.positions()[row, 0] == pytest.approx(obj.pos_x())
+        assert engine.positions()[row, 1] == pytest.approx(obj.pos_y())
+        assert engine.velocities()[row, 0] == pytest.approx(obj.velocity_x())
+        assert engine.velocities()[row, 1] == pytest.approx(obj.velocity_y())
+
+
+def test_engine_distances_to(objects):
+    engine = Engine.from_objects(objects)
+    central_object = CentralObject(1e22, 1e3, 1e8, 0)
+    distances = engine.distances_to(central_object)
+    assert distances[0] == 0
+    assert distances[1] == pytest.approx(math.hypot(3e8, 5e7))
+
+
+def test_engine_remove_keeps_ids(objects):
+    engine = Engine.from_objects(objects)
+    engine.remove(np.array([False, True, False]))
+    assert engine.count() == 2
+    assert engine.ids().tolist() == [0, 2]
+    assert engine.masses().tolist() == [1e3, 5e2]
+
+
+def test_connected_components_chain_and_isolated():
+    labels = connected_components(
+        7, np.array([5, 1, 3]), np.array([6, 3, 5])
+    )
+    assert labels.tolist() == [0, 1, 2, 1, 4, 1, 1]
+
+
+def test_connected_components_large_cluster():
+    rng = np.random.default_rng(0)
+    order = rng.permutation(100000)
+    labels = connected_components(100000, order[:-1], order[1:])
+    assert np.all(labels == 0)
+
+
+def test_merge_conserves_mass_and_momentum():
+    engine = Engine(
+        [[0, 0], [1, 0], [2, 0], [10, 10]],
+        [[1, 0], [0, 1], [-1, 0], [5, 5]],
+        [1.0, 2.0, 1.0, 3.0],
+        radii=[1.0, 1.0, 1.0, 1.0],
+        ids=[10, 11, 12, 13],
+    )
+    momentum = (engine.masses()[:, None] * engine.velocities()).sum(axis=0)
+    merged, absorbed_masses, _ = engine.merge([1, 0], [2, 1])
+    assert merged.tolist() == [10]
+    assert absorbed_masses.tolist() == []
+    assert engine.ids().tolist() == [10, 13]
+    assert engine.masses().tolist() == [4.0, 3.0]
+    assert engine.positions()[0].tolist() == [1.0, 0.0]
+    assert engine.velocities()[0].tolist() == [0.0, 0.5]
+    assert engine.radii()[0] == pytest.approx(3 ** (1 / 3))
+    new_momentum = (
+        engine.masses()[:, None] * engine.velocities()
+    ).sum(axis=0)
+    assert new_momentum.tolist() == momentum.tolist()
+
+
+def test_merge_absorbs_whole_group():
+    engine = Engine(
+        [[0, 0], [1, 0], [5, 5], [9, 9]],
+        [[1, 0], [0, 1], [0, 0], [2, 0]],
+        [1.0, 2.0, 4.0, 1.0],
+    )
+    merged, absorbed_masses, absorbed_momenta = engine.merge(
+        [0], [1], np.array([-1, 0, -1, 1])
+    )
+    assert merged.tolist() == []
+    assert absorbed_masses.tolist() == [3.0, 1.0]
+    assert absorbed_momenta.tolist() == [[1.0, 2.0], [2.0, 0.0]]
+    assert engine.ids().tolist() == [2]
+
+
+def test_forces_of_targets_match_rows():
+    generator = np.random.default_rng(3)
+    positions = generator.uniform(1e7, 1e9, size=(50, 2))
+    masses = generator.uniform(1e20, 1e22, size=40)
+    central = CentralObject(1e24, 1e6)
+    targets = np.array([45, 2, 39, 0, 41])
+    for gravity in (None, DirectGravity()):
+        expected = forces(positions, masses, 40, central, 6.674e-11, gravity)
+        result = forces(
+            positions, masses, 40, central, 6.674e-11, gravity,
+            targets=targets,
+        )
+        assert np.allclose(result, expected[targets], rtol=1e-12, atol=0)
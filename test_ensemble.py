@@ -0,0 +1,100 @@
+import json
+import numpy as np
+import pytest
+from ensemble import expand_grid, load_grid, run_ensemble, set_field
+from errors import MalformedDataError
+
+
+@pytest.fixture
+def config():
+    return {
+        "central_mass": 1e22,
+        "central_radius": 1e3,
+        "scale": 1e5,
+        "image_size": [800, 800],
+        "time_step": 60.0,
+        "objects": [
+            {"x": 1e8, "y": 0, "mass": 1e3, "vx": 0, "vy": 80},
+            {"x": 0, "y": 500, "mass": 1e3},
+        ],
+    }
+
+
+def test_set_field(config):
+    set_field(config, "objects.0.vx", 5.0)
+    set_field(config, "time_step", 10.0)
+    assert config["objects"][0]["vx"] == 5.0
+    assert config["time_step"] == 10.0
+
+
+def test_set_field_velocity_scale(config):
+    set_field(config, "velocity_scale", 2.0)
+    assert config["objects"][0]["vy"] == 160
+    assert config["objects"][1]["vx"] == 0
+
+
+def test_set_field_missing(config):
+    with pytest.raises(MalformedDataError):
+        set_field(config, "objects.5.vx", 1.0)
+
+
+def test_set_field_typo(config):
+    with pytest.raises(MalformedDataError):
+        set_field(config, "time_stpe", 10.0)
+    with pytest.raises(MalformedDataError):
+        expand_grid(config, {"central_mas": [1e22, 2e22]})
+    assert "time_stpe" not in config
+
+
+def test_set_field_optional(config):
+    set_field(config, "integrator", "rk4")
+    set_field(config, "diagnostics.threshold", 1e-3)
+    set_field(config, "objects.1.vy", 7.0)
+    assert config["integrator"] == "rk4"
+    assert config["diagnostics"] == {"threshold": 1e-3}
+    assert config["objects"][1]["vy"] == 7.0
+    with pytest.raises(MalformedDataError):
+        set_field(config, "objects.1.vz", 7.0)
+
+
+def test_set_field_columnar(config):
+    config["objects"] = {
+        "x": [1e8, 0], "y": [0, 500], "mass": [1e3, 1e3],
+        "vx": [0.0, 1.0], "vy": np.array([80.0, 0.0]),
+    }
+    set_field(config, "velocity_scale", 2.0)
+    set_field(config, "objects.x.1", 10.0)
+    assert config["objects"]["vx"] == [0.0, 2.0]
+    assert config["objects"]["vy"].tolist() == [160.0, 0.0]
+    assert config["objects"]["x"] == [1e8, 10.0]
+
+
+def test_expand_grid(config):
+    grid = {"time_step": [10.0, 20.0], "central_mass": [1e22, 2e22, 3e22]}
+    variants = expand_grid(config, grid)
+    assert len(variants) == 6
+    parameters, variant = variants[-1]
+    assert parameters == {"time_step": 20.0, "central_mass": 3e22}
+    assert variant["central_mass"] == 3e22
+    assert config["central_mass"] == 1e22
+
+
+def test_load_grid_not_lists(tmp_path):
+    path = tmp_path / "grid.json"
+    path.write_text(json.dumps({"time_step": 10.0}))
+    with pytest.raises(MalformedDataError):
+        load_grid(str(path))
+
+
+def test_run_ensemble(config, tmp_path):
+    grid = {"time_step": [10.0, 60.0], "velocity_scale": [1.0, 2.0]}
+    summary = run_ensemble(config, grid, 5, str(tmp_path), workers=2)
+    assert [variant["index"] for variant in summary] == [0, 1, 2, 3]
+    assert len({variant["state_file"] for variant in summary}) == 4
+    with open(tmp_path / "summary.json") as f:
+        assert json.load(f) == summary
+    assert summary[0]["collisions"] == [
+        "Krok 0: Obiekt 2 w kolizji z centralnym!"
+    ]
+    with open(summary[3]["state_file"]) as f:
+        assert json.load(f)["time_step"] == 60.0
@@ -0,0 +1,53 @@
+import json
+import pytest
+from classes.event_log import EventLog, create_event_log
+from errors import MalformedDataError
+
+
+def read_events(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_event_log_off_by_default(capsys):
+    log = create_event_log({})
+    assert log.level() == "off"
+    assert not log.enabled("info")
+    log.log("info", "step", step=1)
+    log.close()
+    assert capsys.readouterr().err == ""
+
+
+def test_event_log_to_file(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(level="info", path=str(path))
+    log.log("info", "collision", step=3, first=1, second=2)
+    log.log("debug", "step", step=3)
+    log.close()
+    assert read_events(path) == [
+        {"level": "info", "event": "collision", "step": 3, "first": 1,
+         "second": 2}
+    ]
+
+
+def test_event_log_levels():
+    log = EventLog(level="debug")
+    assert log.enabled("info")
+    assert log.enabled("debug")
+    assert not log.enabled("trace")
+
+
+def test_event_log_rate_limit(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(level="info", path=str(path), rate_limit=3)
+    for step in range(10):
+        log.log("info", "step", step=step)
+    log.close()
+    events = read_events(path)
+    assert [event["step"] for event in events[:3]] == [0, 1, 2]
+    assert events[3] == {"level": "info", "event": "suppressed", "count": 7}
+
+
+def test_event_log_unknown_level():
+    with pytest.raises(MalformedDataError):
+        EventLog(level="loud")
@@ -0,0 +1,159 @@
+import json
+import numpy as np
+import pytest
+from classes.executor import (
+    ProcessExecutor,
+    SerialExecutor,
+    ThreadExecutor,
+    create_executor,
+)
+from classes.central_bodies import CentralBodies
+from classes.central_object import CentralObject
+from classes.engine import Engine, forces
+from classes.spatial_hash import colliding_pairs
+from classes.system import System
+from classes.gravity import BarnesHutGravity, DirectGravity
+from errors import MalformedDataError
+
+
+G = 6.67430e-11
+
+
+@pytest.fixture
+def engine():
+    generator = np.random.default_rng(5)
+    return Engine(
+        generator.uniform(-1e9, 1e9, size=(3000, 2)),
+        np.zeros((3000, 2)),
+        generator.uniform(1e20, 1e22, size=3000),
+    )
+
+
+def test_chunks_cover_rows():
+    executor = SerialExecutor(chunk_size=4)
+    assert executor.chunks(10) == [(0, 4), (4, 8), (8, 10)]
+    assert executor.chunks(10, chunk_size=6) == [(0, 6), (6, 10)]
+    assert executor.chunks(0) == []
+
+
+def test_rows_are_written_in_place_of_chunks():
+    executor = ThreadExecutor(3, chunk_size=2)
+    result = executor.rows(
+        5, lambda start, stop: np.arange(start, stop)[:, None] * [1, -1]
+    )
+    executor.close()
+    assert result.tolist() == [[0, 0], [1, -1], [2, -2], [3, -3], [4, -4]]
+
+
+@pytest.mark.parametrize(
+    "gravity", [None, DirectGravity(chunk_size=100), BarnesHutGravity()]
+)
+def test_results_do_not_depend_on_workers(engine, gravity):
+    central = CentralObject(1e30, 1e6)
+    expected = engine.accelerations(central, G, gravity)
+    for workers in (1, 2, 4, 8):
+        executor = ThreadExecutor(workers, chunk_size=500)
+        result = engine.accelerations(
+            central, G, gravity, executor=executor
+        )
+        executor.close()
+        assert np.array_equal(result, expected)
+
+
+def test_grid_is_built_once_for_threads(engine):
+    bodies = CentralBodies(
+        [CentralObject(1e30, 1e6, pos_x=-1e8), CentralObject(1e30, 1e6)],
+        moving=False,
+    )
+    bodies.set_grid(129, 2e9)
+    expected = engine.central_accelerations(bodies, G)
+    executor = ThreadExecutor(4, chunk_size=300)
+    result = engine.central_accelerations(bodies, G, executor=executor)
+    executor.close()
+    assert np.array_equal(result, expected)
+
+
+def test_create_executor():
+    assert isinstance(create_executor({}), SerialExecutor)
+    executor = create_executor({"workers": 4, "chunk_size": 1000})
+    assert isinstance(executor, ThreadExecutor)
+    assert executor.config() == {
+        "parallel": {"workers": 4, "chunk_size": 1000}
+    }
+    with pytest.raises(MalformedDataError):
+        create_executor({"workers": 0})
+    with pytest.raises(MalformedDataError):
+        SerialExecutor(chunk_size=0)
+    with pytest.raises(MalformedDataError, match="backend"):
+        create_executor({"backend": "gpu"})
+
+
+def test_process_executor_matches_serial(engine):
+    central = CentralObject(1e30, 1e6)
+    particles = np.random.default_rng(2).uniform(-1e9, 1e9, (700, 2))
+    positions = np.concatenate((engine.positions(), particles))
+    executor = ProcessExecutor(3, chunk_size=400)
+    try:
+        assert executor.partitions(10) == [(0, 3), (3, 6), (6, 10)]
+        for gravity in (None, DirectGravity(), BarnesHutGravity()):
+            expected = forces(
+                positions, engine.masses(), engine.count(), central, G,
+                gravity,
+            )
+            result = executor.forces(
+                positions, engine.masses(), engine.count(), central, G,
+                gravity,
+            )
+            assert np.array_equal(result, expected)
+        radii = np.full(engine.count(), 3e7)
+        assert executor.colliding_pairs(engine.positions(), radii) == (
+            colliding_pairs(engine.positions(), radii)
+        )
+    finally:
+        executor.close()
+    assert executor.config()["parallel"]["backend"] == "process"
+
+
+def test_process_simulation_matches_single_process(tmp_path):
+    config = {
+        "central_mass": 1e24,
+        "central_radius": 1e6,
+        "scale": 1e6,
+        "image_size": [100, 100],
+        "time_step": 10.0,
+        "mutual_gravity": "barnes_hut",
+        "integrator": "rk4",
+        "objects": [
+            {"x": 1e8 + 2e6 * i, "y": 1e6 * (i % 3), "vy": 800,
+             "mass": 1e15, "radius": 1.5e6}
+            for i in range(40)
+        ],
+        "particles": {"x": [5e7, 1e6], "y": [0.0, 0.0]},
+    }
+    single = System(config)
+    _, expected_report = single.simulate(4)
+    single.save_state(str(tmp_path / "single.json"))
+    config["parallel"] = {"workers": 2, "backend": "process"}
+    split = System(config)
+    _, report = split.simulate(4)
+    split.executor().close()
+    split.save_state(str(tmp_path / "split.json"))
+    assert report == expected_report
+    with open(tmp_path / "single.json") as f:
+        expected_state = json.load(f)
+    with open(tmp_path / "split.json") as f:
+        state = json.load(f)
+    del state["parallel"]
+    assert state == expected_state
+
+
+def test_process_executor_returns_many_candidate_pairs():
+    positions = np.random.default_rng(5).uniform(0.0, 1.0, (1500, 2))
+    radii = np.full(1500, 0.2)
+    expected = colliding_pairs(positions, radii)
+    assert len(expected) > 50000
+    executor = ProcessExecutor(2, timeout=60)
+    try:
+        assert executor.colliding_pairs(positions, radii) == expected
+    finally:
+        executor.close()
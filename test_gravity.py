@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+from classes.gravity import DirectGravity, BarnesHutGravity, create_gravity
+from errors import MalformedDataError
+
+
+G = 6.67430e-11
+
+
+@pytest.fixture
+def bodies():
+    generator = np.random.default_rng(7)
+    positions = generator.uniform(-1e9, 1e9, size=(500, 2))
+    masses = generator.uniform(1e20, 1e22, size=500)
+    return positions, masses
+
+
+def test_direct_two_bodies():
+    positions = np.array([[0.0, 0.0], [10.0, 0.0]])
+    masses = np.array([1e10, 2e10])
+    accelerations = DirectGravity().accelerations(positions, masses, G)
+    assert accelerations[0, 0] == pytest.approx(G * 2e10 / 100)
+    assert accelerations[1, 0] == pytest.approx(-G * 1e10 / 100)
+    assert accelerations[0, 1] == 0
+    assert accelerations[1, 1] == 0
+
+
+def test_direct_coincident_bodies_do_not_produce_nan():
+    positions = np.zeros((2, 2))
+    masses = np.array([1.0, 1.0])
+    accelerations = DirectGravity().accelerations(positions, masses, G)
+    assert np.all(accelerations == 0)
+
+
+def test_direct_chunks_give_same_result(bodies):
+    positions, masses = bodies
+    whole = DirectGravity(chunk_size=1000).accelerations(positions, masses, G)
+    chunked = DirectGravity(chunk_size=7).accelerations(positions, masses, G)
+    assert np.allclose(whole, chunked, rtol=1e-12, atol=0)
+
+
+def test_direct_targets(bodies):
+    positions, masses = bodies
+    gravity = DirectGravity()
+    full = gravity.accelerations(positions, masses, G)
+    part = gravity.accelerations(positions, masses, G, targets=[3, 10])
+    assert np.allclose(part, full[[3, 10]], rtol=1e-12, atol=0)
+
+
+def test_barnes_hut_zero_angle_is_exact(bodies):
+    positions, masses = bodies
+    direct = DirectGravity().accelerations(positions, masses, G)
+    tree = BarnesHutGravity(opening_angle=0.0).accelerations(
+        positions, masses, G
+    )
+    assert np.allclose(tree, direct, rtol=1e-9, atol=0)
+
+
+def test_barnes_hut_close_to_direct(bodies):
+    positions, masses = bodies
+    direct = DirectGravity().accelerations(positions, masses, G)
+    tree = BarnesHutGravity(opening_angle=0.5).accelerations(
+        positions, masses, G
+    )
+    error = np.linalg.norm(tree - direct, axis=1)
+    scale = np.linalg.norm(direct, axis=1)
+    assert np.median(error / scale) < 1e-2
+
+
+def test_barnes_hut_coincident_bodies():
+    positions = np.array([[1.0, 1.0], [1.0, 1.0], [5.0, 1.0]])
+    masses = np.array([1.0, 1.0, 1.0])
+    tree = BarnesHutGravity().accelerations(positions, masses, G)
+    assert np.all(np.isfinite(tree))
+    assert tree[0, 0] == pytest.approx(G / 16)
+    assert tree[2, 0] == pytest.approx(-2 * G / 16)
+
+
+def test_create_gravity():
+    assert create_gravity({}) is None
+    assert isinstance(
+        create_gravity({"mutual_gravity": "direct"}), DirectGravity
+    )
+    gravity = create_gravity(
+        {"mutual_gravity": "barnes_hut", "opening_angle": 0.3}
+    )
+    assert isinstance(gravity, BarnesHutGravity)
+    assert gravity.opening_angle() == 0.3
+
+
+def test_create_gravity_unknown_mode():
+    with pytest.raises(MalformedDataError):
+        create_gravity({"mutual_gravity": "magic"})
+
+
+def test_direct_field_at_points(bodies):
+    positions, masses = bodies
+    points = np.array([[2e9, 0.0], [0.0, -3e9], [1e8, 1e8]])
+    solver = DirectGravity(chunk_size=2)
+    field = solver.field(points, positions, masses, G)
+    together = DirectGravity().accelerations(
+        np.concatenate((positions, points)),
+        np.concatenate((masses, np.zeros(3))),
+        G,
+        targets=np.arange(500, 503),
+    )
+    assert np.allclose(field, together, rtol=1e-12)
+
+
+def test_barnes_hut_field_close_to_direct(bodies):
+    positions, masses = bodies
+    points = np.random.default_rng(3).uniform(-2e9, 2e9, size=(200, 2))
+    exact = DirectGravity().field(points, positions, masses, G)
+    assert np.allclose(
+        BarnesHutGravity(opening_angle=0.0).field(
+            points, positions, masses, G
+        ),
+        exact,
+        rtol=1e-9,
+    )
+    approximate = BarnesHutGravity(opening_angle=0.5).field(
+        points, positions, masses, G
+    )
+    error = np.linalg.norm(approximate - exact, axis=1)
+    assert np.median(error / np.linalg.norm(exact, axis=1)) < 2e-2
+
+
+def pair_energy(positions, masses):
+    energy = 0.0
+    for first in range(len(masses)):
+        for second in range(first + 1, len(masses)):
+            distance = np.linalg.norm(positions[first] - positions[second])
+            energy -= G * masses[first] * masses[second] / distance
+    return energy
+
+
+def test_direct_potential_energy(bodies):
+    positions, masses = bodies
+    expected = pair_energy(positions, masses)
+    for chunk_size in (1024, 7):
+        energy = DirectGravity(chunk_size=chunk_size).potential_energy(
+            positions, masses, G
+        )
+        assert energy == pytest.approx(expected, rel=1e-12)
+
+
+def test_direct_potential_energy_coincident_bodies():
+    positions = np.array([[0.0, 0.0], [0.0, 0.0], [2.0, 0.0]])
+    masses = np.array([1.0, 1.0, 1.0])
+    energy = DirectGravity().potential_energy(positions, masses, G)
+    assert energy == pytest.approx(-G)
+
+
+def test_barnes_hut_potential_energy(bodies):
+    positions, masses = bodies
+    direct = DirectGravity().potential_energy(positions, masses, G)
+    exact = BarnesHutGravity(opening_angle=0.0).potential_energy(
+        positions, masses, G
+    )
+    tree = BarnesHutGravity(opening_angle=0.5).potential_energy(
+        positions, masses, G
+    )
+    assert exact == pytest.approx(direct, rel=1e-9)
+    assert tree == pytest.approx(direct, rel=1e-2)
@@ -0,0 +1,207 @@
+import numpy as np
+import pytest
+from classes.integrator import (
+    SemiImplicitEuler,
+    VelocityVerlet,
+    Leapfrog,
+    RungeKutta4,
+    RungeKutta45,
+    BlockTimeSteps,
+    create_integrator,
+)
+from errors import MalformedDataError
+
+
+GM = 1.0
+
+
+def acceleration(positions, rows=None):
+    if rows is not None:
+        positions = positions[rows]
+    distance = np.linalg.norm(positions, axis=1, keepdims=True)
+    return -GM * positions / distance**3
+
+
+def energy(positions, velocities):
+    kinetic = 0.5 * np.sum(velocities**2)
+    potential = -GM * np.sum(1 / np.linalg.norm(positions, axis=1))
+    return kinetic + potential
+
+
+def orbit(integrator, dt, duration):
+    positions = np.array([[1.0, 0.0]])
+    velocities = np.array([[0.0, 1.0]])
+    time = 0.0
+    while time < duration:
+        positions, velocities, taken = integrator.step(
+            positions, velocities, dt, acceleration
+        )
+        time += taken
+    return positions, velocities
+
+
+def test_euler_matches_manual_update():
+    positions = np.array([[1.0, 0.0]])
+    velocities = np.array([[0.0, 1.0]])
+    new_positions, new_velocities, dt = SemiImplicitEuler().step(
+        positions, velocities, 0.1, acceleration
+    )
+    assert new_velocities.tolist() == [[-0.1, 1.0]]
+    assert new_positions[0].tolist() == pytest.approx([0.99, 0.1])
+    assert dt == 0.1
+
+
+@pytest.mark.parametrize(
+    "integrator, limit",
+    [
+        (VelocityVerlet(), 1e-4),
+        (Leapfrog(), 1e-4),
+        (RungeKutta4(), 1e-7),
+        (RungeKutta45(tolerance=1e-10), 1e-8),
+        (BlockTimeSteps(), 1e-4),
+    ],
+)
+def test_circular_orbit_energy(integrator, limit):
+    positions, velocities = orbit(integrator, 0.01, 2 * np.pi)
+    assert abs(energy(positions, velocities) + 0.5) < limit
+    assert np.linalg.norm(positions) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_higher_order_beats_euler():
+    euler = orbit(SemiImplicitEuler(), 0.01, 2 * np.pi)
+    verlet = orbit(VelocityVerlet(), 0.01, 2 * np.pi)
+    assert abs(energy(*verlet) + 0.5) < abs(energy(*euler) + 0.5)
+
+
+def test_rk45_adapts_time_step():
+    integrator = RungeKutta45(tolerance=1e-6)
+    assert integrator.next_dt() is None
+    orbit(integrator, 1e-4, 1.0)
+    assert integrator.next_dt() > 1e-4
+
+
+def test_rk45_max_time_step():
+    integrator = RungeKutta45(tolerance=1e-3, max_dt=0.05)
+    orbit(integrator, 0.01, 1.0)
+    assert integrator.next_dt() <= 0.05
+
+
+def test_rk45_shrinks_step_with_non_finite_error():
+    calls = []
+
+    def singular(positions, rows=None):
+        calls.append(len(calls))
+        if len(calls) <= 7:
+            return np.full_like(positions, np.nan)
+        return acceleration(positions, rows)
+
+    integrator = RungeKutta45(tolerance=1e-6)
+    positions, velocities, taken = integrator.step(
+        np.array([[1.0, 0.0]]), np.array([[0.0, 1.0]]), 0.1, singular
+    )
+    assert taken == pytest.approx(0.02)
+    assert np.all(np.isfinite(positions))
+    assert integrator.next_dt() <= 5 * taken
+
+
+def test_rk45_gives_up_on_non_finite_error():
+    def singular(positions, rows=None):
+        return np.full_like(positions, np.inf)
+
+    with pytest.raises(RuntimeError):
+        RungeKutta45().step(
+            np.array([[1.0, 0.0]]), np.array([[0.0, 1.0]]), 0.1, singular
+        )
+
+
+def test_rk45_clamp():
+    integrator = RungeKutta45(tolerance=1e-3)
+    orbit(integrator, 0.01, 0.5)
+    integrator.clamp(1e-3)
+    _, _, taken = integrator.step(
+        np.array([[1.0, 0.0]]), np.array([[0.0, 1.0]]), 0.1, acceleration
+    )
+    assert taken == 1e-3
+    verlet = VelocityVerlet()
+    verlet.clamp(1e-3)
+    assert verlet.step(
+        np.array([[1.0, 0.0]]), np.array([[0.0, 1.0]]), 0.1, acceleration
+    )[2] == 0.1
+
+
+def test_verlet_state():
+    integrator = VelocityVerlet()
+    orbit(integrator, 0.01, 0.1)
+    restored = VelocityVerlet()
+    restored.set_state(integrator.state())
+    assert np.array_equal(
+        restored.state()["acceleration"], integrator.state()["acceleration"]
+    )
+    integrator.reset()
+    assert integrator.state() == {}
+
+
+def test_block_time_steps_on_one_level_is_verlet():
+    block = orbit(BlockTimeSteps(max_level=0), 0.01, 1.0)
+    verlet = orbit(VelocityVerlet(), 0.01, 1.0)
+    assert np.allclose(block[0], verlet[0], rtol=0, atol=1e-12)
+    assert np.allclose(block[1], verlet[1], rtol=0, atol=1e-12)
+
+
+def test_block_time_steps_choose_levels():
+    integrator = BlockTimeSteps(max_level=4, accuracy=0.1)
+    levels = integrator.choose_levels(
+        np.array([[1.0, 0.0], [1.0, 0.0], [0.0, 0.0], [0.0, 0.0]]),
+        np.array([[0.5, 0.0], [4.0, 0.0], [1.0, 0.0], [0.0, 0.0]]),
+        0.1,
+    )
+    assert levels.tolist() == [0, 2, 4, 0]
+
+
+def test_block_time_steps_near_and_far_orbits():
+    positions = np.array([[1.0, 0.0], [16.0, 0.0]])
+    velocities = np.array([[0.0, 1.0], [0.0, 0.25]])
+    integrator = BlockTimeSteps()
+    for _ in range(50):
+        positions, velocities, _ = integrator.step(
+            positions, velocities, 4.0, acceleration
+        )
+    assert integrator.levels().tolist() == [8, 2]
+    assert integrator.evaluations() == 2 + 50 * (2**8 + 2**2)
+    assert np.linalg.norm(positions, axis=1) == pytest.approx(
+        [1.0, 16.0], rel=1e-3
+    )
+    assert energy(positions[:1], velocities[:1]) == pytest.approx(
+        -0.5, rel=1e-4
+    )
+
+
+def test_block_time_steps_state():
+    integrator = BlockTimeSteps()
+    orbit(integrator, 0.01, 0.1)
+    restored = BlockTimeSteps()
+    restored.set_state(integrator.state())
+    assert np.array_equal(
+        restored.state()["acceleration"], integrator.state()["acceleration"]
+    )
+    integrator.reset()
+    assert integrator.state() == {}
+    with pytest.raises(MalformedDataError):
+        BlockTimeSteps(max_level=-1)
+    with pytest.raises(MalformedDataError):
+        BlockTimeSteps(accuracy=0)
+
+
+def test_create_integrator():
+    assert isinstance(create_integrator({}), SemiImplicitEuler)
+    assert isinstance(
+        create_integrator({"integrator": "leapfrog"}), Leapfrog
+    )
+    integrator = create_integrator({"integrator": "rk45", "tolerance": 1e-4})
+    assert integrator.tolerance() == 1e-4
+    integrator = create_integrator({"integrator": "block", "max_level": 3})
+    assert integrator.config() == {
+        "integrator": "block", "max_level": 3, "accuracy": 0.02,
+    }
+    with pytest.raises(MalformedDataError):
+        create_integrator({"integrator": "magic"})
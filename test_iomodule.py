@@ -1,7 +1,15 @@
 import pytest
 import json
-from iomodule import load_config
-from errors import MalformedDataError
+import numpy as np
+from iomodule import (
+    load_config,
+    validate_columns,
+    convert_state,
+    check_required_fields,
+    validate_particles,
+    save_columnar,
+)
+from errors import MalformedDataError, NegativeMassError, NegativeRadiusError
 
 
 def test_load_config_valid(tmp_path):
@@ -51,3 +59,105 @@ def test_load_config_missing_required_field(tmp_path):
 
     with pytest.raises(MalformedDataError):
         load_config(config_file)
+
+
+def columnar_config():
+    return {
+        "central_mass": 1e22,
+        "central_radius": 1e3,
+        "scale": 1e5,
+        "image_size": [800, 800],
+        "time_step": 60.0,
+        "objects": [
+            {"x": 1e8, "y": 0.0, "vx": 0.0, "vy": 80.0, "mass": 1e3},
+            {"x": -2e8, "y": 5e7, "vx": 10.0, "vy": -40.0, "mass": 2e3,
+             "radius": 5.0},
+        ],
+    }
+
+
+def test_columnar_round_trip(tmp_path):
+    config = columnar_config()
+    npz_file = tmp_path / "state.npz"
+    json_file = tmp_path / "state.json"
+    with open(tmp_path / "source.json", "w") as f:
+        json.dump(config, f)
+    convert_state(tmp_path / "source.json", npz_file)
+    loaded = load_config(npz_file)
+    assert loaded["objects"]["x"].tolist() == [1e8, -2e8]
+    assert np.isnan(loaded["objects"]["radius"][0])
+    convert_state(npz_file, json_file)
+    assert load_config(json_file) == config
+
+
+def test_validate_columns_defaults():
+    columns = validate_columns({"x": [1, 2], "y": [3, 4], "mass": [1, 1]})
+    assert columns["vx"].tolist() == [0, 0]
+    assert np.isnan(columns["radius"]).all()
+
+
+def test_validate_columns_negative_mass_indexes():
+    with pytest.raises(NegativeMassError, match="indexes 1, 3"):
+        validate_columns(
+            {"x": np.zeros(4), "y": np.zeros(4), "mass": [1, -1, 2, 0]}
+        )
+
+
+def test_validate_columns_negative_radius():
+    with pytest.raises(NegativeRadiusError, match="indexes 0"):
+        validate_columns(
+            {"x": [0], "y": [0], "mass": [1], "radius": [-2.0]}
+        )
+
+
+def test_validate_columns_malformed():
+    with pytest.raises(MalformedDataError, match="'y'"):
+        validate_columns({"x": [0, 1], "mass": [1, 1]})
+    with pytest.raises(MalformedDataError, match="has 1 values"):
+        validate_columns({"x": [0, 1], "y": [0], "mass": [1, 1]})
+    with pytest.raises(MalformedDataError, match="indexes 1"):
+        validate_columns({"x": [0, np.inf], "y": [0, 0], "mass": [1, 1]})
+
+
+def test_load_columnar_not_valid(tmp_path):
+    config_file = tmp_path / "broken.npz"
+    config_file.write_bytes(b"not a zip file")
+    with pytest.raises(MalformedDataError):
+        load_config(config_file)
+
+
+def test_check_required_fields_with_central_bodies():
+    config = {
+        "central_bodies": [],
+        "scale": 1,
+        "image_size": [1, 1],
+        "time_step": 1,
+        "objects": [],
+    }
+    check_required_fields(config)
+    del config["central_bodies"]
+    with pytest.raises(MalformedDataError, match="central_mass"):
+        check_required_fields(config)
+
+
+def test_validate_particles():
+    columns = validate_particles([{"x": 1, "y": 2}, {"x": 3, "y": 4}])
+    assert columns["y"].tolist() == [2, 4]
+    assert columns["vx"].tolist() == [0, 0]
+    with pytest.raises(MalformedDataError, match="'y' of particles"):
+        validate_particles({"x": [1]})
+    with pytest.raises(MalformedDataError, match="indexes 1"):
+        validate_particles({"x": [1, np.inf], "y": [0, 0]})
+
+
+def test_columnar_round_trip_with_particles(tmp_path):
+    config = columnar_config()
+    config["particles"] = {"x": [1.0, 2.0], "y": [3.0, 4.0]}
+    npz_file = tmp_path / "state.npz"
+    save_columnar(npz_file, config)
+    loaded = load_config(npz_file)
+    assert loaded["particles"]["y"].tolist() == [3.0, 4.0]
+    assert loaded["particles"]["vy"].tolist() == [0.0, 0.0]
+    json_file = tmp_path / "state.json"
+    convert_state(npz_file, json_file)
+    assert load_config(json_file)["particles"]["x"] == [1.0, 2.0]
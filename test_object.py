@@ -1,5 +1,7 @@
-from classes.object import Object
-from errors import NegativeMassError
+from classes.object import Object, ObjectView
+from classes.engine import Engine
+from errors import NegativeMassError, NegativeRadiusError
+import numpy as np
 import pytest
 
 
@@ -40,3 +42,59 @@ def test_object_vel_setters():
     object1.set_vel_y(50000.65)
     assert object1.velocity_x() == -100.65
     assert object1.velocity_y() == 50000.65
+
+
+def test_object_radius():
+    object1 = Object(10, 10, 1e10, 200, 300)
+    assert object1.radius() is None
+    object2 = Object(10, 10, 1e10, radius=5.0)
+    assert object2.radius() == 5.0
+    object2.set_radius(None)
+    assert object2.radius() is None
+
+
+def test_object_negative_radius():
+    with pytest.raises(NegativeRadiusError):
+        Object(10, 10, 1e10, radius=-1)
+    object1 = Object(10, 10, 1e10)
+    with pytest.raises(NegativeRadiusError):
+        object1.set_radius(0)
+
+
+def test_object_has_no_dict():
+    object1 = Object(10, 10, 1e10, 200, 300)
+    assert not hasattr(object1, "__dict__")
+    with pytest.raises(AttributeError):
+        object1.colour = "red"
+
+
+def test_object_view_reads_and_writes_engine():
+    engine = Engine(
+        [[1, 2], [3, 4]], [[5, 6], [7, 8]], [9, 10], [np.nan, 2.0]
+    )
+    view = ObjectView(engine, 1)
+    assert isinstance(view, Object)
+    assert (view.pos_x(), view.pos_y()) == (3.0, 4.0)
+    assert (view.velocity_x(), view.velocity_y()) == (7.0, 8.0)
+    assert view.mass() == 10.0
+    assert view.radius() == 2.0
+    assert ObjectView(engine, 0).radius() is None
+    view.set_pos_x(-1.5)
+    view.set_vel_y(0.25)
+    view.set_radius(None)
+    assert engine.positions()[1, 0] == -1.5
+    assert engine.velocities()[1, 1] == 0.25
+    assert np.isnan(engine.radii()[1])
+    with pytest.raises(NegativeRadiusError):
+        view.set_radius(-1)
+
+
+def test_object_view_follows_its_row():
+    engine = Engine(np.zeros((3, 2)), np.zeros((3, 2)), [1.0, 2.0, 3.0])
+    view = ObjectView(engine, 2)
+    assert view.mass() == 3.0
+    engine.remove(np.array([True, False, False]))
+    assert view.mass() == 3.0
+    engine.remove(np.array([False, True]))
+    with pytest.raises(KeyError):
+        view.mass()
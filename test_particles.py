@@ -0,0 +1,51 @@
+import numpy as np
+from classes.particles import ParticleBlock
+from classes.central_object import CentralObject
+from classes.engine import Engine
+from classes.gravity import DirectGravity
+from classes.integrator import RungeKutta4
+
+
+G = 6.67430e-11
+
+
+def test_from_columns_and_remove():
+    block = ParticleBlock.from_columns(
+        {"x": [1, 2, 3], "y": [4, 5, 6], "vx": [0, 0, 1], "vy": [1, 1, 0]}
+    )
+    assert block.count() == 3
+    block.remove(np.array([False, True, False]))
+    assert block.ids().tolist() == [0, 2]
+    assert block.columns()["x"].tolist() == [1, 3]
+    assert block.velocities().tolist() == [[0, 1], [1, 0]]
+
+
+def test_particles_move_like_light_objects():
+    central = CentralObject(1e24, 1e6)
+    positions = [[1e8, 0.0], [0.0, 2e8]]
+    velocities = [[0.0, 800.0], [-500.0, 0.0]]
+    particles = ParticleBlock(positions, velocities)
+    engine = Engine([[-3e8, 0.0]], [[0.0, -600.0]], [1e22])
+    reference = Engine(
+        [[-3e8, 0.0]] + positions, [[0.0, -600.0]] + velocities,
+        [1e22, 1e-30, 1e-30],
+    )
+    gravity = DirectGravity()
+    for _ in range(20):
+        engine.step(60.0, central, G, gravity, RungeKutta4(), None,
+                    particles)
+        reference.step(60.0, central, G, gravity, RungeKutta4())
+    assert np.allclose(particles.positions(), reference.positions()[1:])
+    assert np.allclose(engine.positions(), reference.positions()[:1])
+
+
+def test_particles_exert_no_gravity():
+    central = CentralObject(1e24, 1e6)
+    engine = Engine([[1e8, 0.0]], [[0.0, 800.0]], [1e20])
+    alone = Engine([[1e8, 0.0]], [[0.0, 800.0]], [1e20])
+    particles = ParticleBlock([[1.01e8, 0.0]] * 5, [[0.0, 0.0]] * 5)
+    for _ in range(10):
+        engine.step(60.0, central, G, DirectGravity(), particles=particles)
+        alone.step(60.0, central, G, DirectGravity())
+    assert np.array_equal(engine.positions(), alone.positions())
+    assert particles.positions()[0, 0] < 1.01e8
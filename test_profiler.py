@@ -0,0 +1,72 @@
+import json
+import pytest
+from classes.profiler import NullProfiler, Profiler
+
+
+def test_null_profiler_wrap_returns_function():
+    def function(x):
+        return x * 2
+
+    assert NullProfiler().wrap("force", function) is function
+    assert not NullProfiler().enabled()
+
+
+def test_nested_phases_are_exclusive(monkeypatch):
+    ticks = iter([0.0, 0.0, 1.0, 3.0, 10.0, 10.0])
+    monkeypatch.setattr(
+        "classes.profiler.time.perf_counter", lambda: next(ticks)
+    )
+    profiler = Profiler()
+    profiler.begin_step(0, 5)
+    profiler.start("integrate")
+    profiler.wrap("force", lambda: None)()
+    profiler.stop("integrate")
+    profiler.end_step()
+    assert profiler.totals()["force"] == 2.0
+    assert profiler.totals()["integrate"] == 8.0
+    assert profiler.last_step() == {"force": 2.0, "integrate": 8.0}
+    assert profiler.throughput() == (0.1, 0.5)
+
+
+def test_hooks_are_called_around_phases():
+    profiler = Profiler()
+    events = []
+    profiler.add_hook(
+        before=lambda phase, step: events.append(("before", phase, step)),
+        after=lambda phase, step, seconds: events.append(
+            ("after", phase, step)
+        ),
+    )
+    profiler.begin_step(7, 1)
+    profiler.start("record")
+    profiler.stop("record")
+    profiler.end_step()
+    assert events == [("before", "record", 7), ("after", "record", 7)]
+    assert profiler.calls()["record"] == 1
+
+
+def test_empty_window():
+    with pytest.raises(ValueError):
+        Profiler(window=(3, 3))
+
+
+def test_window_capture_and_dump(tmp_path):
+    profiler = Profiler(window=(1, 3), memory=True)
+    for step in range(5):
+        profiler.begin_step(step, 2)
+        profiler.start("force")
+        data = [0] * 1000
+        profiler.stop("force")
+        profiler.end_step()
+    profiler.finish()
+    path = tmp_path / "profile.json"
+    profiler.dump(str(path))
+    with open(path) as f:
+        stats = json.load(f)
+    assert stats["steps"] == 5
+    assert stats["calls"]["force"] == 5
+    assert stats["window"] == [1, 3]
+    assert stats["memory_peak"] > 0
+    assert (tmp_path / "profile.prof").exists()
+    assert "force" in profiler.summary()
+    assert data
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from classes.quad_tree import QuadTree
+
+
+G = 6.67430e-11
+
+
+def test_quad_tree_depth_of_four_corners():
+    positions = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    tree = QuadTree(positions, np.ones(4))
+    assert tree.depth() == 1
+
+
+def test_quad_tree_single_object():
+    tree = QuadTree(np.array([[3.0, 4.0]]), np.array([5.0]))
+    assert tree.depth() == 0
+    assert np.all(tree.accelerations(G) == 0)
+
+
+def test_quad_tree_targets_and_batches():
+    generator = np.random.default_rng(3)
+    positions = generator.normal(size=(300, 2))
+    masses = generator.uniform(1, 2, size=300)
+    tree = QuadTree(positions, masses, batch_size=17)
+    full = QuadTree(positions, masses).accelerations(G, 0.7)
+    assert np.array_equal(tree.accelerations(G, 0.7), full)
+    part = tree.accelerations(G, 0.7, targets=[5, 250])
+    assert np.array_equal(part, full[[5, 250]])
+
+
+def test_quad_tree_softening():
+    positions = np.array([[0.0, 0.0], [3.0, 0.0]])
+    tree = QuadTree(positions, np.array([1.0, 1.0]))
+    accelerations = tree.accelerations(G, softening=4.0)
+    assert accelerations[0, 0] == pytest.approx(G * 3 / 125)
+
+
+def test_quad_tree_potentials_in_batches():
+    generator = np.random.default_rng(5)
+    positions = generator.normal(size=(300, 2))
+    masses = generator.uniform(1, 2, size=300)
+    tree = QuadTree(positions, masses, batch_size=17)
+    full = QuadTree(positions, masses).potentials(G, 0.0)
+    assert np.array_equal(tree.potentials(G, 0.0), full)
+    distance = np.linalg.norm(positions[1:] - positions[0], axis=1)
+    assert full[0] == pytest.approx(-G * np.sum(masses[1:] / distance))
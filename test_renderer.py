@@ -0,0 +1,114 @@
+import numpy as np
+import matplotlib
+import pytest
+from classes.renderer import (
+    Renderer,
+    RasterRenderer,
+    create_renderer,
+    decimate,
+)
+from errors import MalformedDataError
+
+
+def test_decimate_short_trajectory_unchanged():
+    x = np.arange(10.0)
+    y = -x
+    result_x, result_y = decimate(x, y, 100)
+    assert result_x.tolist() == x.tolist()
+    assert result_y.tolist() == y.tolist()
+
+
+def test_decimate_keeps_extremes_and_ends():
+    angle = np.linspace(0, 20 * np.pi, 100000)
+    x = np.cos(angle)
+    y = np.sin(angle)
+    x[12345] = 5.0
+    y[54321] = -7.0
+    result_x, result_y = decimate(x, y, 100)
+    assert len(result_x) <= 600
+    assert result_x[0] == x[0] and result_x[-1] == x[-1]
+    assert result_x.max() == 5.0
+    assert result_y.min() == -7.0
+    assert result_x.min() == x.min()
+    assert result_y.max() == y.max()
+
+
+def test_decimate_keeps_order():
+    x = np.arange(5000.0)
+    y = np.sin(x)
+    result_x, _ = decimate(x, y, 10)
+    assert np.all(np.diff(result_x) > 0)
+
+
+def test_create_renderer_defaults():
+    renderer = create_renderer({}, 1, [800, 800])
+    assert renderer.output() == "simulation_result.png"
+    assert not renderer.headless()
+
+
+def test_headless_render_saves_image(tmp_path, monkeypatch):
+    import matplotlib.pyplot as plt
+
+    shown = []
+    monkeypatch.setattr(plt, "show", lambda: shown.append(True))
+    output = tmp_path / "image.png"
+    renderer = Renderer(
+        1e3, [200, 200], output=str(output), headless=True, legend=False
+    )
+    trajectories = {
+        i: {"x": np.linspace(0, 1e5, 5000), "y": np.full(5000, i * 1e3)}
+        for i in range(50)
+    }
+    renderer.render(trajectories, np.array([[1e5, 0.0], [0.0, 1e5]]))
+    assert output.exists()
+    assert not shown
+    assert matplotlib.image.imread(str(output)).shape[:2] == (800, 800)
+
+
+def test_raster_counts_points_in_pixels():
+    renderer = RasterRenderer(10.0, [4, 2])
+    renderer.rasterize(np.array([[0.0, 0.0], [5.0, 5.0], [-15.0, -5.0]]))
+    renderer.rasterize(np.array([[1.0, 1.0], [100.0, 0.0], [np.nan, 0]]))
+    assert renderer.buffer().tolist() == [[0, 0, 2, 0], [1, 0, 1, 0]]
+
+
+def test_raster_many_points_match_single_points():
+    rng = np.random.default_rng(3)
+    points = rng.normal(0, 30, (5000, 2))
+    batch = RasterRenderer(1.0, [20, 10])
+    batch.rasterize(points)
+    single = RasterRenderer(1.0, [20, 10])
+    for point in points:
+        single.rasterize(point)
+    assert np.array_equal(batch.buffer(), single.buffer())
+    assert batch.buffer().sum() == np.sum(
+        (np.abs(points[:, 0]) < 10) & (np.abs(points[:, 1]) < 5)
+    )
+
+
+def test_raster_age_keeps_last_step():
+    renderer = RasterRenderer(1.0, [2, 2], mode="age")
+    renderer.rasterize_trajectory([0.5, -0.5, 0.5], [0.5, 0.5, 0.5])
+    assert renderer.buffer()[0].tolist() == [1.0, 2.0]
+    assert np.isinf(renderer.buffer()[1]).all()
+
+
+def test_raster_unknown_mode():
+    with pytest.raises(MalformedDataError):
+        RasterRenderer(1.0, [2, 2], mode="colour")
+
+
+def test_raster_saves_image_of_image_size(tmp_path):
+    output = tmp_path / "density.png"
+    renderer = create_renderer(
+        {"backend": "raster", "output": str(output)}, 1.0, [30, 20]
+    )
+    renderer.render({0: {"x": np.arange(10.0), "y": np.zeros(10)}},
+                    np.zeros((1, 2)))
+    image = matplotlib.image.imread(str(output))
+    assert image.shape[:2] == (20, 30)
+
+
+def test_create_renderer_unknown_backend():
+    with pytest.raises(MalformedDataError):
+        create_renderer({"backend": "svg"}, 1.0, [2, 2])
@@ -0,0 +1,184 @@
+import asyncio
+import copy
+import io
+import json
+import pytest
+import service
+from classes.service import AsyncSimulation, SimulationService
+from classes.system import System
+from classes.trajectory_sink import NullSink
+
+
+@pytest.fixture
+def config():
+    return {
+        "central_mass": 5.972e24,
+        "central_radius": 6.371e6,
+        "scale": 1e6,
+        "image_size": (800, 800),
+        "time_step": 10,
+        "objects": [
+            {"x": 7e6 + 1e6 * i, "y": 0, "mass": 1000.0,
+             "velocity_x": 0, "velocity_y": 7000.0}
+            for i in range(5)
+        ],
+    }
+
+
+def test_async_simulation_matches_simulate(config):
+    expected = System(config)
+    _, expected_report = expected.simulate(50, NullSink())
+    simulation = AsyncSimulation(System(config), 50, every=10,
+                                 sink=NullSink())
+    updates = []
+
+    async def collect():
+        async for progress in simulation.updates():
+            updates.append(progress)
+
+    asyncio.run(collect())
+    assert [update["step"] for update in updates] == [10, 20, 30, 40, 50]
+    assert simulation.state() == "done"
+    assert simulation.result()[1] == expected_report
+    assert simulation.system().state() == expected.state()
+
+
+def test_async_simulations_share_loop(config):
+    simulations = [
+        AsyncSimulation(System(config), 30, every=5, sink=NullSink())
+        for _ in range(3)
+    ]
+
+    async def main():
+        return await asyncio.gather(
+            *(simulation.run() for simulation in simulations)
+        )
+
+    results = asyncio.run(main())
+    assert len(results) == 3
+    assert all(simulation.state() == "done" for simulation in simulations)
+    states = [simulation.system().state() for simulation in simulations]
+    assert states[0] == states[1] == states[2]
+
+
+def test_async_simulation_cancel(config):
+    simulation = AsyncSimulation(System(config), 1000, every=10,
+                                 sink=NullSink())
+
+    async def main():
+        async for progress in simulation.updates():
+            if progress["step"] == 20:
+                simulation.cancel()
+
+    asyncio.run(main())
+    assert simulation.state() == "cancelled"
+    assert simulation.result() is None
+    assert simulation.progress()["step"] == 20
+    assert simulation.system().time() == pytest.approx(200)
+
+
+def test_async_simulation_task_cancelled(config):
+    simulation = AsyncSimulation(System(config), 100000, every=10,
+                                 sink=NullSink())
+
+    async def main():
+        task = asyncio.create_task(simulation.run())
+        while simulation.progress() is None:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert simulation.state() == "cancelled"
+    assert simulation.system().time() < 100000 * 10
+
+
+def test_service_handles_commands(config):
+    service = SimulationService(2)
+    streamed = []
+
+    async def main():
+        first = await service.handle(
+            {"command": "submit", "config": config, "steps": 20,
+             "every": 10},
+            lambda job, progress: streamed.append((job, progress["step"])),
+        )
+        second = await service.handle(
+            {"command": "submit", "config": config, "steps": 10000,
+             "every": 10}
+        )
+        await service.handle({"command": "cancel", "job": second["job"]})
+        await service.handle({"command": "wait", "job": first["job"]})
+        await service.handle({"command": "wait", "job": second["job"]})
+        return (
+            first, second,
+            await service.handle({"command": "result", "job": 1}),
+            await service.handle({"command": "list"}),
+        )
+
+    first, second, result, jobs = asyncio.run(main())
+    service.close()
+    assert (first, second) == ({"job": 1}, {"job": 2})
+    assert streamed == [(1, 10), (1, 20)]
+    assert result["state"] == "done"
+    assert result["collision_report"] == []
+    assert len(result["system"]["objects"]) == 5
+    assert jobs["jobs"]["2"]["state"] == "cancelled"
+    json.dumps(result)
+
+
+def test_service_reports_errors(config):
+    service = SimulationService(1)
+    negative_mass = copy.deepcopy(config)
+    negative_mass["objects"][0]["mass"] = -5
+    negative_radius = copy.deepcopy(config)
+    negative_radius["objects"][0]["radius"] = -1
+
+    async def main():
+        replies = [
+            await service.handle({"command": "status", "job": 7}),
+            await service.handle({"command": "fly"}),
+            await service.handle({"command": "submit", "config": {}}),
+        ]
+        for invalid in (negative_mass, negative_radius):
+            replies.append(await service.handle(
+                {"command": "submit", "config": invalid, "steps": 5}
+            ))
+        job = (await service.handle(
+            {"command": "submit", "config": config, "steps": 5}
+        ))["job"]
+        replies.append(await service.handle({"command": "wait", "job": job}))
+        return replies
+
+    replies = asyncio.run(main())
+    service.close()
+    assert all("error" in reply for reply in replies[:-1])
+    assert "Mass" in replies[3]["error"]
+    assert "Radius" in replies[4]["error"]
+    assert replies[-1]["state"] == "done"
+
+
+def test_serve_writes_json_lines(config, monkeypatch):
+    output = io.StringIO()
+    monkeypatch.setattr("sys.stdout", output)
+    requests = iter([
+        json.dumps({"command": "submit", "config": config, "steps": 10,
+                    "every": 5, "stream": True}) + "\n",
+        "not json\n",
+        json.dumps({"command": "list"}) + "\n",
+        "",
+    ])
+
+    async def lines():
+        return next(requests)
+
+    simulation_service = SimulationService(1)
+    asyncio.run(service.serve(simulation_service, lines))
+    simulation_service.close()
+    replies = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert replies[0] == {"job": 1}
+    assert "error" in replies[1]
+    assert "jobs" in replies[2]
+    assert [reply["progress"]["step"] for reply in replies
+            if "progress" in reply] == [5, 10]
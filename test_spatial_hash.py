@@ -0,0 +1,77 @@
+import numpy as np
+from classes.spatial_hash import (
+    SpatialHash,
+    closest_approach,
+    first_contact,
+    colliding_pairs,
+)
+
+
+def brute_force_pairs(positions, radii):
+    pairs = []
+    for i in range(len(positions)):
+        for j in range(i + 1, len(positions)):
+            distance = np.hypot(*(positions[i] - positions[j]))
+            if distance <= radii[i] + radii[j]:
+                pairs.append((i, j))
+    return pairs
+
+
+def test_three_objects_in_one_cell():
+    positions = np.array([[0.1, 0.1], [0.2, 0.2], [0.3, 0.1]])
+    pairs = colliding_pairs(positions, np.full(3, 0.5))
+    assert pairs == [(0, 1), (0, 2), (1, 2)]
+
+
+def test_objects_touching_across_cell_boundary():
+    positions = np.array([[0.99, 0.0], [1.01, 0.0], [5.0, 5.0]])
+    pairs = colliding_pairs(positions, np.full(3, 0.5))
+    assert pairs == [(0, 1)]
+
+
+def test_candidate_pairs_are_unique():
+    positions = np.array([[0.5, 0.5], [1.5, 0.5], [0.5, 1.5], [1.5, 1.5]])
+    pairs = SpatialHash(positions, 1.0).candidate_pairs()
+    assert len(pairs) == 6
+    assert len({tuple(sorted(pair)) for pair in pairs.tolist()}) == 6
+
+
+def test_colliding_pairs_match_brute_force():
+    generator = np.random.default_rng(11)
+    positions = generator.uniform(0, 100, size=(400, 2))
+    radii = generator.uniform(0.5, 3, size=400)
+    assert colliding_pairs(positions, radii) == brute_force_pairs(
+        positions, radii
+    )
+
+
+def test_colliding_pairs_extreme_coordinates():
+    positions = np.array([[1e12, 1e12], [1e12 + 0.5, 1e12], [-1e12, 0]])
+    assert colliding_pairs(positions, np.full(3, 0.5)) == [(0, 1)]
+
+
+def test_colliding_pairs_few_objects():
+    assert colliding_pairs(np.zeros((1, 2)), np.ones(1)) == []
+    assert colliding_pairs(np.zeros((0, 2)), np.ones(0)) == []
+
+
+def test_closest_approach_of_crossing_pairs():
+    start = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 5.0], [3.0, 3.0]])
+    end = np.array([[10.0, 0.0], [0.0, 0.0], [0.0, 5.0], [3.0, 3.0]])
+    fractions, distances = closest_approach(
+        start, end, np.array([0, 0, 2]), np.array([1, 2, 3])
+    )
+    assert fractions.tolist() == [0.5, 0.0, 0.0]
+    assert distances.tolist() == [0.0, 25.0, 13.0]
+
+
+def test_first_contact_of_crossing_pairs():
+    start = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 5.0], [3.0, 3.0]])
+    end = np.array([[10.0, 0.0], [0.0, 0.0], [0.0, 5.0], [3.0, 3.0]])
+    fractions = first_contact(
+        start, end, np.array([0, 0, 2]), np.array([1, 2, 3]),
+        np.array([2.0, 5.0, 3.0]),
+    )
+    assert abs(fractions[0] - 0.4) < 1e-12
+    assert fractions[1] == 0.0
+    assert np.isnan(fractions[2])
@@ -1,7 +1,12 @@
+import numpy as np
+import json
 import pytest
 from classes.system import System
 from classes.central_object import CentralObject
 from classes.object import Object
+from classes.trajectory_sink import MemorySink
+from classes.profiler import Profiler
+from iomodule import load_config, unknown_fields
 
 
 @pytest.fixture
@@ -181,3 +186,539 @@ def test_objects_collide_and_move_as_combined(config):
         and combined_object.pos_y() != initial_positions[0][1]
     )
     assert combined_object.mass() == 2.0
+
+
+def test_simulate_syncs_objects_with_engine():
+    config = {
+        "central_mass": 1e22,
+        "central_radius": 1e3,
+        "scale": 1e5,
+        "image_size": (800, 800),
+        "time_step": 60.0,
+        "objects": [
+            {"x": 1e8, "y": 0, "mass": 1e3, "vx": 0, "vy": 80},
+            {"x": -2e8, "y": 5e7, "mass": 2e3, "vx": 10, "vy": -40},
+        ],
+    }
+    system = System(config)
+    trajectories, _ = system.simulate(5)
+    engine = system.engine()
+    for row, obj in enumerate(system.objects()):
+        assert obj.pos_x() == engine.positions()[row, 0]
+        assert obj.velocity_y() == engine.velocities()[row, 1]
+        assert trajectories[row]["x"][-1] == obj.pos_x()
+        assert len(trajectories[row]["y"]) == 5
+
+
+@pytest.mark.parametrize("mode", ["direct", "barnes_hut"])
+def test_mutual_gravity_attracts_objects(mode):
+    config = {
+        "central_mass": 1.0,
+        "central_radius": 1.0,
+        "scale": 1.0,
+        "image_size": (800, 800),
+        "time_step": 0.1,
+        "mutual_gravity": mode,
+        "objects": [
+            {"x": 1e6, "y": 0, "mass": 1e15},
+            {"x": 1e6 + 100, "y": 0, "mass": 1e15},
+        ],
+    }
+    system = System(config)
+    system.simulate(10)
+    first, second = system.objects()
+    assert first.velocity_x() > 0
+    assert second.velocity_x() < 0
+    assert first.velocity_x() == pytest.approx(-second.velocity_x())
+
+
+def test_check_collisions_every_pair_in_one_pixel():
+    config = {
+        "central_mass": 1.0,
+        "central_radius": 1.0,
+        "scale": 10.0,
+        "image_size": (800, 800),
+        "time_step": 0.1,
+        "objects": [
+            {"x": 100, "y": 100, "mass": 1.0},
+            {"x": 101, "y": 100, "mass": 1.0},
+            {"x": 100, "y": 102, "mass": 1.0},
+            {"x": 500, "y": 500, "mass": 1.0, "radius": 2.0},
+            {"x": 503, "y": 500, "mass": 1.0, "radius": 2.0},
+        ],
+    }
+    system = System(config)
+    assert system.check_collisions() == [(0, 1), (0, 2), (1, 2), (3, 4)]
+
+
+def test_check_collisions_with_central_uses_radius():
+    config = {
+        "central_mass": 1.0,
+        "central_radius": 10.0,
+        "scale": 1.0,
+        "image_size": (800, 800),
+        "time_step": 0.1,
+        "objects": [
+            {"x": 12, "y": 0, "mass": 1.0, "radius": 3.0},
+            {"x": 0, "y": 12, "mass": 1.0},
+        ],
+    }
+    system = System(config)
+    assert system.check_collisions() == [(0, -1)]
+
+
+def test_simulate_with_sink_stride(config):
+    system = System(config)
+    sink = MemorySink(stride=4)
+    trajectories, _ = system.simulate(10, sink)
+    assert sink.steps().tolist() == [0, 4, 8]
+    assert len(trajectories[2]["x"]) == 3
+
+
+@pytest.mark.parametrize(
+    "integrator", ["verlet", "leapfrog", "rk4", "rk45", "block"]
+)
+def test_simulate_with_integrator(integrator):
+    config = {
+        "central_mass": 1e22,
+        "central_radius": 1e3,
+        "scale": 1e5,
+        "image_size": (800, 800),
+        "time_step": 60.0,
+        "integrator": integrator,
+        "objects": [{"x": 1e8, "y": 0, "mass": 1e3, "vx": 0, "vy": 80}],
+    }
+    system = System(config)
+    system.simulate(20)
+    obj = system.objects()[0]
+    assert obj.pos_x() < 1e8
+    assert obj.pos_y() > 0
+    assert system.time() > 0
+
+
+def test_simulate_is_silent_by_default(config, capsys):
+    system = System(config)
+    system.simulate(10)
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err == ""
+
+
+def test_simulate_logs_central_collisions(config, tmp_path):
+    path = tmp_path / "events.jsonl"
+    config["log"] = {"level": "info", "path": str(path)}
+    system = System(config)
+    _, collision_report = system.simulate(10)
+    system.event_log().close()
+    with open(path) as f:
+        events = [json.loads(line) for line in f]
+    messages = [
+        event["message"] for event in events
+        if event["event"] == "central_collision"
+    ]
+    assert len(messages) == 2
+    assert messages == collision_report[:2]
+
+
+def test_system_from_columns_matches_list(tmp_path):
+    config = {
+        "central_mass": 1e22,
+        "central_radius": 1e3,
+        "scale": 1e5,
+        "image_size": (800, 800),
+        "time_step": 60.0,
+        "objects": [
+            {"x": 1e8, "y": 0, "mass": 1e3, "vx": 0, "vy": 80},
+            {"x": -2e8, "y": 5e7, "mass": 2e3, "vx": 10, "vy": -40},
+        ],
+    }
+    expected = System(config)
+    expected.simulate(5)
+    state_file = str(tmp_path / "state.npz")
+    System(config).save_state(state_file)
+    system = System(load_config(state_file))
+    assert system._objects is None
+    system.simulate(5)
+    assert len(system.objects()) == 2
+    for obj, expected_obj in zip(system.objects(), expected.objects()):
+        assert obj.pos_x() == expected_obj.pos_x()
+        assert obj.velocity_y() == expected_obj.velocity_y()
+
+
+def test_create_image_headless(config, tmp_path):
+    system = System(config)
+    trajectories, _ = system.simulate(5)
+    output = tmp_path / "result.png"
+    system.create_image(trajectories, output=str(output), headless=True)
+    assert output.exists()
+
+
+def test_raster_sink_streams_positions(config, tmp_path):
+    output = tmp_path / "density.png"
+    config["trajectory"] = {"sink": "raster"}
+    config["render"] = {"output": str(output)}
+    system = System(config)
+    sink = system.create_sink()
+    trajectories, _ = system.simulate(10, sink)
+    assert trajectories == {}
+    assert sink.buffer().sum() > 0
+    system.create_image(sink)
+    assert output.exists()
+
+
+def test_simulate_with_animation(config, tmp_path):
+    path = tmp_path / "simulation.gif"
+    system = System(config)
+    animator = system.create_animator(path=str(path), every=2)
+    system.simulate(6, animator)
+    assert animator.writer().frames() == 3
+    assert path.exists()
+
+
+def test_simulate_with_profiler(config):
+    system = System(config)
+    profiler = Profiler()
+    system.set_profiler(profiler)
+    system.simulate(10)
+    assert profiler.steps() == 10
+    assert profiler.calls()["integrate"] == 10
+    assert profiler.calls()["force"] >= 10
+    assert profiler.calls()["record"] == 10
+    assert profiler.calls()["collide"] == 20
+
+
+def test_resolve_collisions_merges_chain_and_feeds_central():
+    config = {
+        "central_mass": 10.0,
+        "central_radius": 1.0,
+        "scale": 1.0,
+        "image_size": (800, 800),
+        "time_step": 0.1,
+        "objects": [
+            {"x": 100, "y": 0, "mass": 1.0, "vx": 1.0, "radius": 1.0},
+            {"x": 101, "y": 0, "mass": 1.0, "radius": 1.0},
+            {"x": 103, "y": 0, "mass": 2.0, "vx": -1.0, "radius": 1.0},
+            {"x": 0.5, "y": 0, "mass": 3.0, "radius": 0.1},
+            {"x": 300, "y": 300, "mass": 5.0, "radius": 1.0},
+        ],
+    }
+    system = System(config)
+    collisions = system.check_collisions()
+    assert collisions == [(0, 1), (1, 2), (3, -1)]
+    system.resolve_collisions(collisions)
+    assert system.central_object().mass() == 13.0
+    merged, untouched = system.objects()
+    assert merged.mass() == 4.0
+    assert merged.pos_x() == pytest.approx(101.75)
+    assert merged.velocity_x() == pytest.approx(-0.25)
+    assert merged.radius() == pytest.approx(3 ** (1 / 3))
+    assert untouched.mass() == 5.0
+    assert system.engine().ids().tolist() == [0, 4]
+
+
+def test_system_with_moving_central_bodies(tmp_path):
+    config = {
+        "central_bodies": [
+            {"x": -1e11, "y": 0, "vy": -18000, "mass": 1e30, "radius": 1e9},
+            {"x": 1e11, "y": 0, "vy": 18000, "mass": 1e30, "radius": 1e9},
+        ],
+        "scale": 1e9,
+        "image_size": (100, 100),
+        "time_step": 3600.0,
+        "objects": [
+            {"x": 0, "y": 4e11, "vx": 25000, "mass": 1.0, "radius": 1.0},
+            {"x": 1e11, "y": 5e8, "mass": 2.0, "radius": 1.0},
+        ],
+    }
+    system = System(config)
+    assert system.check_collisions() == [(1, -2)]
+    system.resolve_collisions(system.check_collisions())
+    assert system.central_bodies().masses().tolist() == [1e30, 1e30 + 2.0]
+    system.simulate(10)
+    assert system.central_bodies().positions()[1, 1] > 0
+    state = system.state()
+    assert state["central_bodies"][1]["mass"] == 1e30 + 2.0
+    assert "central_mass" not in state
+    restored = System(state)
+    assert np.allclose(
+        restored.central_bodies().positions(),
+        system.central_bodies().positions(),
+    )
+    output = tmp_path / "binary.png"
+    system.create_image({}, output=str(output), headless=True)
+    assert output.exists()
+
+
+def test_particles_are_culled_by_central_object():
+    config = {
+        "central_mass": 1e24,
+        "central_radius": 1e6,
+        "scale": 1e6,
+        "image_size": [100, 100],
+        "time_step": 10.0,
+        "objects": [{"x": 1e8, "y": 0, "vy": 800, "mass": 1e3}],
+        "particles": {
+            "x": [2e6, 1e8, 0.0],
+            "y": [0.0, 1e6, 1.5e6],
+            "vx": [-1e5, 0.0, 0.0],
+            "vy": [0.0, 800.0, 0.0],
+        },
+    }
+    system = System(config)
+    trajectories, report = system.simulate(3)
+    assert list(trajectories) == [0]
+    assert report == ["Krok 1: 1 cząstek w kolizji z centralnym!"]
+    assert system.particles().ids().tolist() == [1, 2]
+    assert system.engine().count() == 1
+    _, report = system.simulate(100)
+    assert system.particles().ids().tolist() == [1]
+    state = system.state()
+    assert state["particles"]["x"] == system.particles().positions()[
+        :, 0
+    ].tolist()
+    assert System(state).particles().count() == 1
+    columnar = System(config).state(columnar=True)
+    assert columnar["particles"]["x"].shape == (3,)
+
+
+def test_parallel_simulation_matches_serial():
+    config = {
+        "central_mass": 1e24,
+        "central_radius": 1e6,
+        "scale": 1e6,
+        "image_size": [100, 100],
+        "time_step": 10.0,
+        "mutual_gravity": "direct",
+        "integrator": "rk4",
+        "objects": [
+            {"x": 1e8 + 1e6 * i, "y": 0, "vy": 800, "mass": 1e15}
+            for i in range(50)
+        ],
+    }
+    serial = System(config)
+    serial.simulate(5)
+    config["parallel"] = {"workers": 3, "chunk_size": 7}
+    parallel = System(config)
+    parallel.simulate(5)
+    parallel.executor().close()
+    assert parallel.executor().workers() == 3
+    assert np.array_equal(
+        parallel.engine().positions(), serial.engine().positions()
+    )
+    assert parallel.state()["parallel"] == config["parallel"]
+
+
+def test_run_reports_progress(config):
+    expected = System(config)
+    expected_result = expected.simulate(10)
+    system = System(config)
+    run = system.run(10, every=4)
+    updates = []
+    while True:
+        try:
+            updates.append(next(run))
+        except StopIteration as stop:
+            result = stop.value
+            break
+    assert [update["step"] for update in updates] == [4, 8, 10]
+    assert updates[-1]["time"] == pytest.approx(1.0)
+    assert all("energy" in update for update in updates)
+    assert result[1] == expected_result[1]
+    assert system.state() == expected.state()
+
+
+def test_run_closed_early(config):
+    system = System(config)
+    sink = MemorySink()
+    run = system.run(100, sink, every=5, energy=False)
+    progress = next(run)
+    run.close()
+    assert progress["step"] == 5
+    assert "energy" not in progress
+    assert system.time() == pytest.approx(0.5)
+
+
+def test_iter_steps_yields_views_and_collisions(config):
+    system = System(config)
+    snapshots = system.iter_steps(5)
+    first = next(snapshots)
+    assert first.step() == 1
+    assert first.time() == pytest.approx(0.1)
+    assert first.collisions() == [
+        "Krok 0: Obiekt 1 w kolizji z centralnym!",
+        "Krok 0: Obiekt 2 w kolizji z centralnym!",
+    ]
+    assert first.positions() is system.engine().positions()
+    assert list(first.ids()) == [2]
+    rest = list(snapshots)
+    assert [snapshot.step() for snapshot in rest] == [2, 3, 4, 5]
+    assert all(not snapshot.collisions() for snapshot in rest)
+
+
+def test_iter_steps_matches_simulate(config):
+    expected = System(config)
+    _, expected_report = expected.simulate(20)
+    system = System(config)
+    report = []
+    for snapshot in system.iter_steps(20):
+        report.extend(snapshot.collisions())
+    assert report == expected_report
+    assert system.state() == expected.state()
+
+
+def test_iter_steps_unbounded_stops_early(config):
+    system = System(config)
+    for snapshot in system.iter_steps():
+        if snapshot.time() > 0.55:
+            break
+    assert snapshot.step() == 6
+    assert system.time() == pytest.approx(0.6)
+
+
+def test_iter_steps_reports_merge_in_its_step():
+    system = System(
+        {
+            "central_mass": 1.0,
+            "central_radius": 1.0,
+            "scale": 1.0,
+            "image_size": (800, 800),
+            "time_step": 0.1,
+            "objects": [
+                {"x": 10, "y": 0, "mass": 1.0, "radius": 1.0},
+                {"x": 11, "y": 0, "mass": 1.0, "radius": 1.0},
+            ],
+        }
+    )
+    snapshots = list(system.iter_steps(2))
+    assert [snapshot.step() for snapshot in snapshots] == [1, 2]
+    assert snapshots[0].collisions() == [
+        "Krok 0: Obiekt 1 w kolizji z obiektem 2!"
+    ]
+    assert snapshots[0].count() == 1
+    assert snapshots[1].collisions() == []
+
+
+def head_on_config(steps_apart=100.0):
+    return {
+        "central_mass": 1.0,
+        "central_radius": 1.0,
+        "scale": 1.0,
+        "image_size": (800, 800),
+        "time_step": 1.0,
+        "objects": [
+            {"x": -steps_apart / 2, "y": 1e6, "vx": 10.0, "mass": 1.0,
+             "radius": 5.0},
+            {"x": steps_apart / 2, "y": 1e6, "vx": -10.0, "mass": 3.0,
+             "radius": 5.0},
+            {"x": 0.0, "y": -1e6, "mass": 1.0, "radius": 5.0},
+        ],
+    }
+
+
+@pytest.mark.parametrize("steps", [5, 20])
+def test_objects_merge_in_step_they_collide(steps):
+    system = System(head_on_config())
+    _, report = system.simulate(steps)
+    assert report == ["Krok 4: Obiekt 1 w kolizji z obiektem 2!"]
+    assert system.engine().count() == 2
+    assert system.engine().ids().tolist() == [0, 2]
+    merged = system.objects()[0]
+    assert merged.mass() == 4.0
+    assert merged.velocity_x() == pytest.approx(-5.0)
+    assert merged.pos_x() == pytest.approx(-5.0 * (steps - 5), abs=1e-6)
+
+
+def test_object_hitting_several_others_in_one_step():
+    config = head_on_config()
+    config["objects"][2] = {
+        "x": 0.0, "y": 1e6 + 55.0, "vy": -10.0, "mass": 2.0,
+        "radius": 5.0,
+    }
+    system = System(config)
+    _, report = system.simulate(20)
+    assert report == [
+        "Krok 4: Obiekt 1 w kolizji z obiektem 2!",
+        "Krok 4: Obiekt 1 w kolizji z obiektem 3!",
+        "Krok 4: Obiekt 2 w kolizji z obiektem 3!",
+    ]
+    assert system.engine().count() == 1
+    assert system.objects()[0].mass() == 6.0
+
+
+def fast_config(swept):
+    return {
+        "central_mass": 5.972e24,
+        "central_radius": 6.371e6,
+        "scale": 1e5,
+        "image_size": (800, 800),
+        "time_step": 600.0,
+        "swept_collisions": swept,
+        "objects": [
+            {"x": -3e7, "y": 0, "vx": 1e5, "mass": 1e3},
+            {"x": -1e6, "y": 1e9, "vx": 2e4, "mass": 1e3, "radius": 1e5},
+            {"x": 1e6, "y": 1e9, "vx": -2e4, "mass": 1e3, "radius": 1e5},
+        ],
+        "particles": [{"x": 3e7, "y": 0, "vx": -1e5, "vy": 0}],
+    }
+
+
+def test_fast_objects_pass_through_without_swept_collisions():
+    system = System(fast_config(False))
+    _, report = system.simulate(1)
+    assert report == []
+    assert system.engine().count() == 3
+    assert system.particles().count() == 1
+
+
+def test_swept_collisions_find_impacts_inside_step():
+    system = System(fast_config(True))
+    _, report = system.simulate(1)
+    assert report[0].startswith("Krok 0: Obiekt 1 w kolizji z centralnym")
+    impact = float(report[0].split("w chwili ")[1].split(" s")[0])
+    assert impact == pytest.approx((3e7 - 6.371e6) / 1e5, rel=1e-2)
+    assert report[1:] == [
+        "Krok 0: 1 cząstek w kolizji z centralnym!",
+        "Krok 0: Obiekt 2 w kolizji z obiektem 3 w chwili 45 s!",
+    ]
+    assert system.engine().count() == 1
+    assert system.particles().count() == 0
+    assert system.state()["swept_collisions"] is True
+
+
+@pytest.mark.parametrize("swept", [False, True])
+def test_swept_collisions_catch_pass_through_in_early_step(swept):
+    config = head_on_config()
+    config["time_step"] = 4.0
+    config["swept_collisions"] = swept
+    system = System(config)
+    _, report = system.simulate(20)
+    if not swept:
+        assert report == []
+        assert system.engine().count() == 3
+        return
+    assert report == [
+        "Krok 1: Obiekt 1 w kolizji z obiektem 2 w chwili 4.5 s!"
+    ]
+    assert system.engine().ids().tolist() == [0, 2]
+    assert system.objects()[0].velocity_x() == pytest.approx(-5.0)
+
+
+def test_state_fields_are_known(tmp_path):
+    config = head_on_config()
+    config.update({
+        "mutual_gravity": "barnes_hut",
+        "integrator": "rk45",
+        "trajectory": {"stride": 2},
+        "parallel": {"workers": 2},
+        "diagnostics": {"every": 5},
+        "swept_collisions": True,
+        "particles": [{"x": 1e7, "y": 0.0}],
+        "time_stpe": 1.0,
+        "log": {"level": "info", "path": str(tmp_path / "events.jsonl")},
+    })
+    system = System(config)
+    system.event_log().close()
+    assert unknown_fields(system.state()) == []
+    with open(tmp_path / "events.jsonl") as f:
+        events = [json.loads(line) for line in f]
+    assert [event["field"] for event in events] == ["time_stpe"]
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from classes.trajectory_sink import (
+    MemorySink,
+    ChunkedFileSink,
+    NullSink,
+    create_sink,
+    read_chunks,
+)
+from errors import MalformedDataError
+
+
+def record_steps(sink, steps):
+    ids = np.array([0, 1, 2])
+    sink.open(ids, rows=steps)
+    for step in range(steps):
+        alive = ids if step < 5 else ids[[0, 2]]
+        positions = np.column_stack((alive * 10.0 + step, -alive - step))
+        sink.record(step, alive, positions)
+    sink.close()
+
+
+def test_memory_sink_keeps_all_rows():
+    sink = MemorySink()
+    record_steps(sink, 8)
+    trajectories = sink.trajectories()
+    assert sorted(trajectories) == [0, 1, 2]
+    assert trajectories[0]["x"].tolist() == list(range(8))
+    assert trajectories[2]["y"].tolist() == [-2.0 - s for s in range(8)]
+    assert len(trajectories[1]["x"]) == 5
+    assert sink.offset() == 8
+
+
+def test_memory_sink_ring_buffer():
+    sink = MemorySink(capacity=3)
+    record_steps(sink, 8)
+    assert sink.steps().tolist() == [5, 6, 7]
+    trajectories = sink.trajectories()
+    assert trajectories[0]["x"].tolist() == [5.0, 6.0, 7.0]
+    assert len(trajectories[1]["x"]) == 0
+
+
+def test_memory_sink_default_is_bounded(monkeypatch):
+    monkeypatch.setattr(MemorySink, "MAX_BYTES", 16 * 3 * 4)
+    sink = MemorySink()
+    record_steps(sink, 8)
+    assert sink.capacity() == 4
+    assert sink.steps().tolist() == [4, 5, 6, 7]
+    assert sink.trajectories()[0]["x"].tolist() == [4.0, 5.0, 6.0, 7.0]
+
+
+def test_memory_sink_long_run_memory_is_flat():
+    sink = MemorySink()
+    sink.open(np.arange(1000), rows=10**6)
+    assert sink.capacity() * 1000 * 16 <= MemorySink.MAX_BYTES
+    positions = np.zeros((1000, 2))
+    for step in range(3 * sink.capacity()):
+        sink.record(step, sink.ids(), positions + step)
+        assert sink._buffer.nbytes <= MemorySink.MAX_BYTES
+    assert sink.steps()[-1] == 3 * sink.capacity() - 1
+
+
+def test_memory_sink_grows_while_recording():
+    sink = MemorySink()
+    sink.open(np.array([0]))
+    assert len(sink._buffer) == MemorySink.INITIAL_ROWS
+    for step in range(MemorySink.INITIAL_ROWS + 5):
+        sink.record(step, sink.ids(), np.array([[step, 0.0]]))
+    assert len(sink._buffer) == 2 * MemorySink.INITIAL_ROWS
+    assert sink.trajectories()[0]["x"].tolist() == list(
+        range(MemorySink.INITIAL_ROWS + 5)
+    )
+
+
+def test_memory_sink_unbounded(monkeypatch):
+    monkeypatch.setattr(MemorySink, "MAX_BYTES", 16 * 3 * 4)
+    sink = MemorySink(unbounded=True)
+    sink.open(np.array([0, 1, 2]))
+    for step in range(10):
+        sink.record(step, sink.ids(), np.zeros((3, 2)) + step)
+    assert sink.capacity() is None
+    assert sink.steps().tolist() == list(range(10))
+    assert create_sink({"unbounded": True}).unbounded()
+
+
+def test_memory_sink_stride():
+    sink = MemorySink(stride=3)
+    record_steps(sink, 8)
+    assert sink.steps().tolist() == [0, 3, 6]
+    assert sink.trajectories()[0]["x"].tolist() == [0.0, 3.0, 6.0]
+
+
+def test_sink_invalid_stride():
+    with pytest.raises(ValueError):
+        MemorySink(stride=0)
+
+
+def test_chunked_file_sink(tmp_path):
+    path = tmp_path / "trajectories"
+    sink = ChunkedFileSink(str(path), chunk_size=3)
+    record_steps(sink, 8)
+    assert len(list(path.glob("positions_*.npy"))) == 3
+    expected = MemorySink()
+    record_steps(expected, 8)
+    trajectories = read_chunks(str(path))
+    for index, trajectory in expected.trajectories().items():
+        assert np.array_equal(trajectories[index]["x"], trajectory["x"])
+        assert np.array_equal(trajectories[index]["y"], trajectory["y"])
+
+
+def test_null_sink():
+    sink = NullSink()
+    record_steps(sink, 8)
+    assert sink.trajectories() == {}
+
+
+def test_create_sink(tmp_path):
+    assert isinstance(create_sink({}), MemorySink)
+    sink = create_sink({"sink": "file", "path": str(tmp_path), "stride": 2})
+    assert isinstance(sink, ChunkedFileSink)
+    assert sink.stride() == 2
+    assert isinstance(create_sink({"sink": "none"}), NullSink)
+    with pytest.raises(MalformedDataError):
+        create_sink({"sink": "tape"})